@@ -0,0 +1,155 @@
+"""
+Shared artifact writers for pipeline outputs.
+
+Every writer streams to a temporary file next to the target and renames
+it into place only once the write has finished, so a crash never leaves a
+half-written artifact behind.  Large collections can be passed as
+iterators/generators and are encoded one record at a time instead of
+being materialised as a single Python object first.
+
+Each writer returns the number of bytes written and can optionally emit
+precompressed siblings (``name.gz`` / ``name.br``) for static hosting.
+Brotli output requires the optional ``brotli`` package.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .instrumentation import record_bytes, span
+
+COMPRESSIONS = ("gz", "br")
+
+_encoder = json.JSONEncoder()
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = "w", **kwargs):
+    """Open a temp file beside ``path``; rename over ``path`` on clean exit."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; artifacts are served publicly
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _is_stream(value) -> bool:
+    return isinstance(value, Iterator)
+
+
+def _write_value(f, value):
+    """Encode one JSON value, streaming any iterator as an array."""
+    if _is_stream(value):
+        f.write("[")
+        for i, item in enumerate(value):
+            if i:
+                f.write(", ")
+            _write_value(f, item)
+        f.write("]")
+    else:
+        for chunk in _encoder.iterencode(value):
+            f.write(chunk)
+
+
+def compress_file(path: Path, formats: Iterable[str] = COMPRESSIONS) -> dict[str, int]:
+    """Write precompressed siblings of ``path``; return {format: bytes}."""
+    path = Path(path)
+    sizes = {}
+    for fmt in formats:
+        out = path.with_name(f"{path.name}.{fmt}")
+        if fmt == "gz":
+            with open(path, "rb") as src, atomic_open(out, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, 1 << 20)
+        elif fmt == "br":
+            try:
+                import brotli
+            except ImportError:
+                print(f"  [warn] brotli not installed, skipping {out.name}")
+                continue
+            compressor = brotli.Compressor(quality=11)
+            with open(path, "rb") as src, atomic_open(out, "wb") as dst:
+                while chunk := src.read(1 << 20):
+                    dst.write(compressor.process(chunk))
+                dst.write(compressor.finish())
+        else:
+            raise ValueError(f"Unknown compression format: {fmt!r}")
+        sizes[fmt] = out.stat().st_size
+    return sizes
+
+
+def _finish(path: Path, compress: Iterable[str]) -> int:
+    if compress:
+        compress_file(path, compress)
+    size = Path(path).stat().st_size
+    record_bytes(size)
+    return size
+
+
+def write_json(path: Path, obj, compress: Iterable[str] = ()) -> int:
+    """
+    Write ``obj`` as JSON.  Iterators anywhere in the top-level dict/list
+    (e.g. a generator of point records) are streamed as arrays.
+    """
+    with span("json_dump", file=Path(path).name):
+        with atomic_open(path, "w", encoding="utf-8") as f:
+            if isinstance(obj, dict) and any(_is_stream(v) for v in obj.values()):
+                f.write("{")
+                for i, (key, value) in enumerate(obj.items()):
+                    if i:
+                        f.write(", ")
+                    f.write(_encoder.encode(str(key)))
+                    f.write(": ")
+                    _write_value(f, value)
+                f.write("}")
+            else:
+                _write_value(f, obj)
+        return _finish(path, compress)
+
+
+def write_json_array(path: Path, records: Iterable, compress: Iterable[str] = ()) -> int:
+    """Stream an iterable of records as a single JSON array."""
+    return write_json(path, iter(records), compress)
+
+
+def write_ndjson(path: Path, records: Iterable, compress: Iterable[str] = ()) -> int:
+    """Stream an iterable of records as newline-delimited JSON."""
+    with atomic_open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(_encoder.encode(rec))
+            f.write("\n")
+    return _finish(path, compress)
+
+
+def write_binary(path: Path, chunks, compress: Iterable[str] = ()) -> int:
+    """
+    Write a raw binary artifact from an ndarray, bytes, or an iterable of
+    either (written in order, e.g. quantised vectors batch by batch).
+    """
+    import numpy as np  # only binary writers need it; JSON-only steps start faster
+
+    if isinstance(chunks, (np.ndarray, bytes, bytearray, memoryview)):
+        chunks = (chunks,)
+    with atomic_open(path, "wb") as f:
+        for chunk in chunks:
+            if isinstance(chunk, np.ndarray):
+                f.write(np.ascontiguousarray(chunk).data)
+            else:
+                f.write(chunk)
+    return _finish(path, compress)
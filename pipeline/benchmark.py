@@ -0,0 +1,335 @@
+"""
+Benchmark harness for the pipeline steps.
+
+Times each step on the real KJV corpus (data/verses.json, plus
+data/embeddings.npy when present) and on synthetic corpora scaled by
+replicating the verses N times with random unit embeddings, so no model,
+network or GPU is needed.  Without data/verses.json the base corpus is
+generated from a Zipfian vocabulary seeded with the entity dictionaries.
+
+Each (step, scale) runs in a forked child so peak RSS is that step's own
+high-water mark.  Results (wall time, peak RSS, verses/sec) are appended
+to a JSON history and compared against a stored baseline; anything slower
+or larger than baseline × (1 + tolerance) is flagged.
+
+    python -m pipeline.benchmark                       # all steps, 1×/4×
+    python -m pipeline.benchmark --scales 1,4,16       # larger corpora (neighbors is O(n²))
+    python -m pipeline.benchmark --steps metrics,entities --scales 1,4
+    python -m pipeline.benchmark --save-baseline       # accept current numbers
+    python -m pipeline.benchmark --fail-on-regression  # exit 1 on regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import write_json
+from .instrumentation import peak_rss_mb, reset_peak_rss
+from .config import BOOKS, EMBEDDINGS_FILE, GROUPS, PEOPLE, PLACES, VERSES_FILE
+
+BENCH_DIR = Path("benchmarks")
+HISTORY_FILE = "history.json"
+BASELINE_FILE = "baseline.json"
+DEFAULT_SCALES = (1, 4)  # neighbors is O(n²): 16× (~500k verses) takes hours
+DEFAULT_TOLERANCE = 0.20
+SYNTH_DIM = 768
+SYNTH_XREFS_PER_VERSE = 2
+
+
+# --- corpora -----------------------------------------------------------------
+
+def _generated_verses(n: int = 31102, seed: int = 0) -> list[dict]:
+    """KJV-shaped verses of Zipf-distributed words, for trees without data/."""
+    rng = np.random.default_rng(seed)
+    words = PEOPLE + PLACES + GROUPS + [f"w{i}" for i in range(12000)]
+    ranks = np.arange(1, len(words) + 1)
+    probs = (1.0 / ranks) / (1.0 / ranks).sum()
+    lengths = rng.integers(8, 40, size=n)
+    tokens = rng.choice(len(words), size=int(lengths.sum()), p=probs)
+    cuts = np.cumsum(lengths)[:-1]
+    texts = [" ".join(words[t] for t in chunk) + "." for chunk in np.split(tokens, cuts)]
+
+    per_book = -(-n // len(BOOKS))
+    verses = []
+    for i, text in enumerate(texts):
+        b = BOOKS[i // per_book]
+        j = i % per_book
+        ch, vn = j // 25 + 1, j % 25 + 1
+        verses.append({
+            "id": i, "book": b["name"], "book_num": b["num"], "book_abbrev": b["abbrev"],
+            "chapter": ch, "verse": vn, "text": text, "testament": b["testament"],
+            "genre": b["genre"], "ref": f"{b['name']} {ch}:{vn}",
+        })
+    return verses
+
+
+def load_base(data_dir: Path) -> tuple[list[dict], np.ndarray | None, str]:
+    """(verses, embeddings or None, label) for the unscaled corpus."""
+    vpath = data_dir / VERSES_FILE
+    if not vpath.exists():
+        return _generated_verses(), None, "generated"
+    with open(vpath) as f:
+        verses = json.load(f)
+    epath = data_dir / EMBEDDINGS_FILE
+    emb = np.load(epath).astype(np.float32) if epath.exists() else None
+    return verses, emb, "kjv"
+
+
+def scale_corpus(verses: list[dict], scale: int) -> list[dict]:
+    """
+    Replicate every book ``scale`` times in place, renumbering chapters so
+    each copy follows the original; book order and grouping are preserved.
+    """
+    if scale == 1:
+        return verses
+    out = []
+    start = 0
+    while start < len(verses):
+        book = verses[start]["book_num"]
+        end = start
+        while end < len(verses) and verses[end]["book_num"] == book:
+            end += 1
+        span = verses[start:end]
+        n_ch = max(v["chapter"] for v in span)
+        for k in range(scale):
+            for v in span:
+                ch = v["chapter"] + k * n_ch
+                out.append(dict(v, id=len(out), chapter=ch, ref=f"{v['book']} {ch}:{v['verse']}"))
+        start = end
+    return out
+
+
+def random_embeddings(n: int, dim: int = SYNTH_DIM, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((n, dim), dtype=np.float32)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def synthetic_xrefs(verses: list[dict], per_verse: int = SYNTH_XREFS_PER_VERSE,
+                    seed: int = 0) -> str:
+    """openbible.info-shaped cross-reference CSV over random verse pairs."""
+    rng = np.random.default_rng(seed)
+    n = len(verses)
+    src = rng.integers(0, n, size=n * per_verse)
+    tgt = rng.integers(0, n, size=n * per_verse)
+    votes = rng.geometric(0.08, size=n * per_verse)
+    out = io.StringIO()
+    out.write("From Book,From Chapter,From Verse number,To Verse start Book,"
+              "To Verse start Chapter,To Verse start number,Votes,"
+              "From Book Testament,To Book Testament\n")
+    for s, t, votes_ in zip(src.tolist(), tgt.tolist(), votes.tolist()):
+        a, b = verses[s], verses[t]
+        out.write(f"{a['book_abbrev']},{a['chapter']},{a['verse']},{b['book_abbrev']},"
+                  f"{b['chapter']},{b['verse']},{votes_},{a['testament']},{b['testament']}\n")
+    return out.getvalue()
+
+
+# --- steps -------------------------------------------------------------------
+
+def _step_entities(verses, emb, work: Path):
+    from . import extract_entities
+    extract_entities.run(verses, work)
+
+
+def _step_metrics(verses, emb, work: Path):
+    from . import compute_metrics
+    compute_metrics.run(verses, work)
+
+
+def _step_neighbors(verses, emb, work: Path):
+    from .compute_embeddings import _find_neighbors
+    from .embedding_store import EmbeddingStore
+    _find_neighbors(EmbeddingStore.build(emb, work), work / "neighbors.json")
+
+
+def _step_heatmap(verses, emb, work: Path):
+    from .compute_embeddings import _book_heatmap
+    from .embedding_store import EmbeddingStore
+    _book_heatmap(verses, EmbeddingStore.build(emb, work), work / "heatmap.json")
+
+
+def _step_sphere(verses, emb, work: Path):
+    """compute_sphere without UMAP or the download: projection, xrefs, arcs."""
+    from .compute_sphere import _build_vote_bins, _parse_xrefs, _project_to_sphere
+    sphere = _project_to_sphere(emb[:, :3].astype(np.float64))
+    lookup = {(v["book_abbrev"], v["chapter"], v["verse"]): i for i, v in enumerate(verses)}
+    arcs, *_ = _parse_xrefs(synthetic_xrefs(verses), lookup)
+    _build_vote_bins(arcs, sphere)
+
+
+def _step_search(verses, emb, work: Path):
+    from . import compute_search
+    np.save(work / EMBEDDINGS_FILE, emb)
+    compute_search.run(verses, work)
+
+
+STEPS = {
+    "entities": _step_entities,
+    "metrics": _step_metrics,
+    "neighbors": _step_neighbors,
+    "heatmap": _step_heatmap,
+    "sphere": _step_sphere,
+    "search": _step_search,
+}
+
+
+# --- measurement -------------------------------------------------------------
+
+def _measure(step: str, verses, emb, verbose: bool, conn):
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"bench_{step}_") as tmp:
+            reset_peak_rss()
+            sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with sink:
+                t0 = time.perf_counter()
+                STEPS[step](verses, emb, Path(tmp))
+                wall = time.perf_counter() - t0
+        conn.send({"wall_s": wall, "peak_rss_mb": peak_rss_mb()})
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_one(step: str, verses, emb, verbose: bool = False) -> dict:
+    """Run one step in a forked child; returns wall_s / peak_rss_mb or error."""
+    ctx = mp.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_measure, args=(step, verses, emb, verbose, child))
+    proc.start()
+    child.close()
+    result = parent.recv() if parent.poll(None) else {"error": "no result"}
+    proc.join()
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[dict]:
+    """Flag results slower or larger than their baseline entry by > tolerance."""
+    base = {(r["step"], r["corpus"], r["scale"]): r for r in baseline.get("results", [])}
+    flagged = []
+    for r in results:
+        b = base.get((r["step"], r["corpus"], r["scale"]))
+        if b is None or "error" in r or "error" in b:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            ratio = r[metric] / max(b[metric], 1e-9)
+            if ratio > 1 + tolerance:
+                flagged.append({"step": r["step"], "scale": r["scale"], "metric": metric,
+                                "baseline": b[metric], "current": r[metric],
+                                "ratio": round(ratio, 3)})
+    return flagged
+
+
+def _print_table(results: list[dict], flagged: list[dict]):
+    marks = {(f["step"], f["scale"], f["metric"]) for f in flagged}
+    print(f"  {'step':<10} {'scale':>5} {'verses':>9} {'wall s':>9} {'peak MB':>9} {'verses/s':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['step']:<10} {r['scale']:>4}× {r['n_verses']:>9}  error: {r['error']}")
+            continue
+        w = "!" if (r["step"], r["scale"], "wall_s") in marks else " "
+        m = "!" if (r["step"], r["scale"], "peak_rss_mb") in marks else " "
+        print(f"  {r['step']:<10} {r['scale']:>4}× {r['n_verses']:>9} {r['wall_s']:>8.2f}{w}"
+              f" {r['peak_rss_mb']:>8.0f}{m} {r['verses_per_s']:>10.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline steps on scaled corpora")
+    parser.add_argument("--data", type=Path, default=Path("data"))
+    parser.add_argument("--out", type=Path, default=BENCH_DIR)
+    parser.add_argument("--steps", default=",".join(STEPS))
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)))
+    parser.add_argument("--dim", type=int, default=SYNTH_DIM,
+                        help="embedding width for synthetic corpora")
+    parser.add_argument("--repeat", type=int, default=1, help="keep the fastest of N runs")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show step output")
+    args = parser.parse_args(argv)
+
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    unknown = [s for s in steps if s not in STEPS]
+    if unknown:
+        parser.error(f"unknown steps {unknown}; available: {', '.join(STEPS)}")
+    scales = [int(s) for s in args.scales.split(",")]
+
+    base_verses, base_emb, label = load_base(args.data)
+    print(f"[bench] Base corpus: {label}, {len(base_verses)} verses")
+
+    results = []
+    for scale in scales:
+        verses = scale_corpus(base_verses, scale)
+        if scale == 1 and base_emb is not None and len(base_emb) == len(verses):
+            emb, corpus = base_emb, label
+        else:
+            emb, corpus = random_embeddings(len(verses), args.dim, seed=scale), f"{label}-synthetic"
+        for step in steps:
+            runs = [run_one(step, verses, emb, args.verbose) for _ in range(args.repeat)]
+            ok = [r for r in runs if "error" not in r]
+            r = {"step": step, "corpus": corpus, "scale": scale, "n_verses": len(verses)}
+            if ok:
+                r["wall_s"] = round(min(x["wall_s"] for x in ok), 4)
+                r["peak_rss_mb"] = round(max(x["peak_rss_mb"] for x in ok), 1)
+                r["verses_per_s"] = round(len(verses) / max(r["wall_s"], 1e-9), 1)
+            else:
+                r["error"] = runs[0]["error"]
+            results.append(r)
+            print(f"  {step} @ {scale}×: " + (r.get("error") or f"{r['wall_s']:.2f} s"))
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    baseline_path = args.out / BASELINE_FILE
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    flagged = compare(results, baseline, args.tolerance)
+
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+        "regressions": flagged,
+    }
+    history_path = args.out / HISTORY_FILE
+    history = json.loads(history_path.read_text()) if history_path.exists() else []
+    history.append(record)
+    write_json(history_path, history)
+    if args.save_baseline:
+        write_json(baseline_path, record)
+        print(f"  baseline → {baseline_path}")
+
+    print()
+    _print_table(results, flagged)
+    if flagged:
+        print(f"\n  {len(flagged)} regression(s) beyond {args.tolerance:.0%} of baseline "
+              f"({baseline.get('commit') or 'unknown commit'}):")
+        for f in flagged:
+            print(f"    {f['step']} @ {f['scale']}× {f['metric']}: "
+                  f"{f['baseline']} → {f['current']} (×{f['ratio']})")
+    print(f"  history → {history_path}")
+    if flagged and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Representative-verse engine for arbitrary verse groupings.
+
+Every grouping is reduced to one of two shapes over a pre-normalised
+embedding matrix (float32 or float16, e.g. the embedding store's memmap;
+sums always accumulate in float32 or wider):
+  - ranges: (start, end) row spans, e.g. books, chapters, pericopes.
+    Back-to-back ranges reduce with np.add.reduceat over one slice; other
+    ranges use a single prefix sum, so they may overlap. No rows are copied.
+  - sets: arbitrary lists of row indices, e.g. entity mention sets.
+    Members are gathered once into a flat array and reduced per segment.
+
+For each group the representatives are the top-k rows by cosine
+similarity to the group's (normalised) mean direction — the usual cheap
+stand-in for the medoid.
+"""
+
+import numpy as np
+
+PREFIX_COLUMNS = 64
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalise rows as float32 so dot product == cosine similarity."""
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb / np.clip(norms, 1e-8, None)
+
+
+def run_starts(keys) -> np.ndarray:
+    """Start offsets of contiguous runs of equal keys (keys may be 1-D or rows)."""
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    diff = keys[1:] != keys[:-1]
+    if diff.ndim > 1:
+        diff = diff.any(axis=1)
+    return np.concatenate(([0], np.flatnonzero(diff) + 1)).astype(np.int64)
+
+
+def book_ranges(verses: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(book_nums, starts, ends) for each contiguous book in verse order."""
+    nums = np.fromiter((v["book_num"] for v in verses), dtype=np.int32, count=len(verses))
+    starts = run_starts(nums)
+    ends = np.append(starts[1:], len(nums))
+    return nums[starts], starts, ends
+
+
+def chapter_ranges(verses: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """((book_num, chapter) rows, starts, ends) for each contiguous chapter."""
+    keys = np.array([(v["book_num"], v["chapter"]) for v in verses], dtype=np.int32)
+    starts = run_starts(keys)
+    ends = np.append(starts[1:], len(keys))
+    return keys[starts], starts, ends
+
+
+def range_centroids(normed: np.ndarray, starts, ends) -> np.ndarray:
+    """Normalised mean direction of normed[start:end] for every range."""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts) and np.all(starts[1:] == ends[:-1]) and np.all(ends > starts):
+        # Back-to-back ranges (books, chapters): one segment reduction.
+        sums = np.add.reduceat(normed[starts[0]:ends[-1]], starts - starts[0], axis=0,
+                               dtype=np.float32)
+        return normalize_rows(sums)
+    # Overlapping or unordered ranges: prefix sums, a few columns at a time
+    # so the float64 prefix stays small however many rows there are.
+    sums = np.empty((len(starts), normed.shape[1]), dtype=np.float32)
+    for c in range(0, normed.shape[1], PREFIX_COLUMNS):
+        cols = normed[:, c:c + PREFIX_COLUMNS]
+        prefix = np.zeros((normed.shape[0] + 1, cols.shape[1]), dtype=np.float64)
+        np.cumsum(cols, axis=0, out=prefix[1:])
+        sums[:, c:c + cols.shape[1]] = prefix[ends] - prefix[starts]
+    return normalize_rows(sums)
+
+
+def _top_k_flat(rows, seg, sims, n_seg, k):
+    """Top-k (row, sim) per segment from flat, segment-sorted arrays."""
+    order = np.lexsort((-sims, seg))
+    seg_sorted = seg[order]
+    seg_first = np.searchsorted(seg_sorted, np.arange(n_seg))
+    rank = np.arange(len(order)) - seg_first[seg_sorted]
+    keep = rank < k
+
+    top_idx = np.full((n_seg, k), -1, dtype=np.int64)
+    top_sim = np.full((n_seg, k), np.nan, dtype=np.float32)
+    top_idx[seg_sorted[keep], rank[keep]] = rows[order[keep]]
+    top_sim[seg_sorted[keep], rank[keep]] = sims[order[keep]]
+    return top_idx, top_sim
+
+
+def _rowwise_dot(normed, rows, centroids, seg, contiguous=False, chunk=8192):
+    """sims[i] = normed[rows[i]] . centroids[seg[i]], in bounded-memory chunks."""
+    sims = np.empty(len(rows), dtype=np.float32)
+    for s in range(0, len(rows), chunk):
+        e = min(s + chunk, len(rows))
+        block = normed[rows[s]:rows[s] + (e - s)] if contiguous else normed[rows[s:e]]
+        sims[s:e] = np.einsum("ij,ij->i", block, centroids[seg[s:e]])
+    return sims
+
+
+def top_k_in_ranges(normed: np.ndarray, starts, ends, k: int = 1):
+    """
+    Top-k representative rows for each (start, end) range.
+    Returns (indices, sims), both shaped (n_ranges, k); short ranges are
+    padded with -1 / NaN.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    lengths = ends - starts
+    centroids = range_centroids(normed, starts, ends)
+
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows += np.repeat(starts, lengths)
+
+    # Ordered, gap-free ranges (books, chapters) are read as plain slices.
+    contiguous = bool(len(rows)) and bool(np.all(np.diff(rows) == 1))
+    sims = _rowwise_dot(normed, rows, centroids, seg, contiguous)
+    return _top_k_flat(rows, seg, sims, len(starts), k)
+
+
+def top_k_in_sets(normed: np.ndarray, members: list, k: int = 1):
+    """
+    Top-k representative rows for each set of row indices (e.g. all verses
+    mentioning an entity). Returns (indices, sims) shaped (n_sets, k).
+    """
+    lengths = np.fromiter((len(m) for m in members), dtype=np.int64, count=len(members))
+    rows = (np.concatenate([np.asarray(m, dtype=np.int64) for m in members])
+            if lengths.sum() else np.zeros(0, dtype=np.int64))
+    seg = np.repeat(np.arange(len(members)), lengths)
+
+    gathered = normed[rows]
+    offsets = np.cumsum(lengths) - lengths
+    nonempty = lengths > 0
+    centroids = np.zeros((len(members), normed.shape[1]), dtype=np.float32)
+    if nonempty.any():
+        sums = np.add.reduceat(gathered, offsets[nonempty], axis=0, dtype=np.float32)
+        centroids[nonempty] = normalize_rows(sums)
+
+    sims = np.einsum("ij,ij->i", gathered, centroids[seg]).astype(np.float32)
+    return _top_k_flat(rows, seg, sims, len(members), k)
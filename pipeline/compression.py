@@ -0,0 +1,109 @@
+"""
+Compression-based complexity measures with a pluggable codec suite.
+
+Compressed sizes are computed on a thread pool: zlib, bz2 and lzma all
+release the GIL while compressing, so threads scale across cores without
+pickling texts to worker processes.  A process pool can be requested for
+codecs that do not.
+
+Provides plain compression ratios and sliding-window compression
+profiles; pipeline/ncd.py builds normalized compression distance
+matrices on top of the same codec registry.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _zlib(data: bytes) -> bytes:
+    return zlib.compress(data, 9)
+
+
+def _bz2(data: bytes) -> bytes:
+    return bz2.compress(data, 9)
+
+
+def _lzma(data: bytes) -> bytes:
+    return lzma.compress(data, preset=6)  # preset 9 needs ~700 MB per thread
+
+
+CODECS = {
+    "gzip": _gzip,
+    "zlib": _zlib,
+    "bz2": _bz2,
+    "lzma": _lzma,
+}
+
+try:  # optional: python-zstandard
+    import zstandard
+
+    def _zstd(data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=19).compress(data)
+
+    CODECS["zstd"] = _zstd
+except ImportError:
+    pass
+
+DEFAULT_WORKERS = min(32, os.cpu_count() or 1)
+
+
+def _encode(text) -> bytes:
+    return text.encode("utf-8") if isinstance(text, str) else bytes(text)
+
+
+def _size(codec: str, data: bytes) -> int:
+    return len(CODECS[codec](data))
+
+
+def compressed_sizes(texts, codec: str = "gzip", workers: int | None = None,
+                     processes: bool = False) -> np.ndarray:
+    """Compressed byte size of every text, computed in parallel."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r}; available: {sorted(CODECS)}")
+    payloads = [_encode(t) for t in texts]
+    workers = workers or DEFAULT_WORKERS
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    if workers == 1 or len(payloads) <= 1:
+        sizes = [_size(codec, p) for p in payloads]
+    else:
+        with pool_cls(max_workers=workers) as pool:
+            sizes = list(pool.map(_size, [codec] * len(payloads), payloads,
+                                  chunksize=1 if not processes else 4))
+    return np.asarray(sizes, dtype=np.int64)
+
+
+def compression_ratios(texts, codec: str = "gzip", workers: int | None = None) -> np.ndarray:
+    """compressed / raw byte ratio per text (1.0 for empty texts)."""
+    payloads = [_encode(t) for t in texts]  # texts may be a one-shot iterator
+    raw = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=len(payloads))
+    sizes = compressed_sizes(payloads, codec, workers)
+    return np.where(raw > 0, sizes / np.maximum(raw, 1), 1.0)
+
+
+def codec_suite(texts, codecs=None, workers: int | None = None) -> dict[str, np.ndarray]:
+    """compression_ratios for several codecs; defaults to every available one."""
+    return {c: compression_ratios(texts, c, workers) for c in (codecs or CODECS)}
+
+
+def window_profile(text: str, window: int = 4096, step: int | None = None,
+                   codec: str = "gzip", workers: int | None = None):
+    """
+    Compression ratio of each ``window``-byte slice of ``text`` every
+    ``step`` bytes.  Returns (byte_offsets, ratios).
+    """
+    data = _encode(text)
+    step = step or window
+    offsets = np.arange(0, max(len(data) - window, 0) + 1, step, dtype=np.int64)
+    chunks = [data[o:o + window] for o in offsets]
+    return offsets, compression_ratios(chunks, codec, workers)
+
@@ -0,0 +1,159 @@
+"""
+Optional clause-level search vectors (step 11, off unless CLAUSE_SEARCH or
+--clauses).
+
+Long verses (Esther 8:9, the genealogies) average many ideas into one
+vector, so a query matching a single clause ranks them poorly.  Each verse
+is split on the sentence punctuation compute_metrics uses ([.!?;:], see
+text_metrics.clause_spans); pieces shorter than CLAUSE_MIN_WORDS words are
+merged into a neighbour, and every verse keeps at least one clause.
+
+Clauses (~3 per verse) are embedded CLAUSE_CHUNK at a time through the
+shared EmbeddingCache, so single-clause verses reuse their verse vector
+and only one chunk of float32 vectors is alive at once; each chunk is
+normalised and quantised as it streams to disk.  A verse is scored as the
+maximum over its clauses (search.max_pool_scores).
+
+  clause_embeddings.bin   uint8 n_clauses × dim, same quantisation as
+                          search_embeddings.bin, grouped by verse
+  clause_index.bin        little-endian sections, table in clause_meta.json
+    verse_offsets  uint32  n_verses + 1 start positions into the clauses
+    clause_verse   uint32  verse ID of every clause
+    spans          uint16  n_clauses × 2 [start, end) characters in the verse text
+  clause_meta.json        counts, model, section table
+
+These are intermediate data for search.py and are not staged to the site.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_binary, write_json
+from .centroids import normalize_rows
+from .config import CLAUSE_CHUNK, CLAUSE_MIN_WORDS, CLAUSE_SEARCH, EMBEDDING_CACHE_DIR, EMBEDDING_MODEL
+from .embedding_cache import EmbeddingCache, model_encoder
+from .embedding_store import model_hash
+from .instrumentation import record_bytes, span
+from .text_metrics import clause_spans
+
+CLAUSE_EMB_FILE = "clause_embeddings.bin"
+CLAUSE_INDEX_FILE = "clause_index.bin"
+CLAUSE_META_FILE = "clause_meta.json"
+
+_SECTIONS = {
+    "verse_offsets": "<u4",
+    "clause_verse": "<u4",
+    "spans": "<u2",  # last, so the uint32 sections stay aligned
+}
+
+
+def _merge_short(text: str, spans: list[tuple[int, int]], min_words: int):
+    """Fold pieces under ``min_words`` words into the next piece (the last into the previous)."""
+    merged = []
+    pending = None
+    for s, e in spans:
+        if pending is not None:
+            s = pending
+        if len(text[s:e].split()) < min_words:
+            pending = s
+            continue
+        merged.append((s, e))
+        pending = None
+    if pending is not None:
+        if merged:
+            merged[-1] = (merged[-1][0], spans[-1][1])
+        else:
+            merged.append((pending, spans[-1][1]))
+    return merged
+
+
+def segment(verses: list[dict], min_words: int = CLAUSE_MIN_WORDS):
+    """(clause texts, verse_offsets (n_verses + 1), spans (n_clauses, 2)) in verse order."""
+    texts, spans = [], []
+    offsets = np.zeros(len(verses) + 1, dtype=np.int64)
+    for i, v in enumerate(verses):
+        text = v["text"]
+        pieces = _merge_short(text, clause_spans(text), min_words) or [(0, len(text))]
+        spans.extend(pieces)
+        texts.extend(text[s:e] for s, e in pieces)
+        offsets[i + 1] = len(texts)
+    return texts, offsets, np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def load_index(data_dir: Path) -> tuple[dict, dict]:
+    """(meta, {section: read-only memmap}) for a saved clause index."""
+    with open(data_dir / CLAUSE_META_FILE) as f:
+        meta = json.load(f)
+    path = data_dir / CLAUSE_INDEX_FILE
+    return meta, {
+        name: np.memmap(path, dtype=_SECTIONS[name], mode="r", offset=sec["offset"],
+                        shape=tuple(sec["shape"]))
+        for name, sec in meta["sections"].items()
+    }
+
+
+def _write_index(path: Path, offsets: np.ndarray, spans: np.ndarray) -> dict:
+    arrays = {
+        "verse_offsets": offsets,
+        "clause_verse": np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)),
+        "spans": spans,
+    }
+    sections = {}
+    pos = 0
+    with atomic_open(path, "wb") as f:
+        for name, dtype in _SECTIONS.items():
+            arr = np.ascontiguousarray(arrays[name], dtype=dtype)
+            f.write(arr.data)
+            sections[name] = {"offset": pos, "dtype": np.dtype(dtype).name, "shape": list(arr.shape)}
+            pos += arr.nbytes
+    record_bytes(pos)
+    return sections
+
+
+def _quantized_chunks(texts: list[str], cache: EmbeddingCache, chunk: int):
+    """Embed, normalise and quantise [-1, 1] → [0, 255] one chunk of clauses at a time."""
+    encode = model_encoder(cache.model)
+    for start in range(0, len(texts), chunk):
+        emb = normalize_rows(cache.encode(texts[start:start + chunk], encode, verbose=False))
+        yield ((emb + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
+
+
+def run(verses: list[dict], data_dir: Path, clauses: bool = CLAUSE_SEARCH):
+    if not clauses:
+        print("[clauses] Skipped (set CLAUSE_SEARCH or pass --clauses)")
+        return
+    print("[clauses] Building clause-level search vectors...")
+
+    with span("segment", items=len(verses)):
+        texts, offsets, spans = segment(verses)
+    print(f"  {len(texts)} clauses from {len(verses)} verses "
+          f"({len(texts) / max(len(verses), 1):.2f} per verse)")
+
+    cache = EmbeddingCache(data_dir / EMBEDDING_CACHE_DIR, EMBEDDING_MODEL)
+    keys, rows = cache.lookup(texts)
+    unique = set(keys)
+    cached = len({k for k, r in zip(keys, rows.tolist()) if r >= 0})
+    print(f"  {len(unique)} unique clause texts: {cached} cached, {len(unique) - cached} to encode")
+
+    emb_path = data_dir / CLAUSE_EMB_FILE
+    with span("embed", items=len(texts), chunk=CLAUSE_CHUNK):
+        size = write_binary(emb_path, _quantized_chunks(texts, cache, CLAUSE_CHUNK))
+    print(f"  ({len(texts)}, {cache.dim}) → {emb_path} ({size / 1e6:.1f} MB)")
+
+    sections = _write_index(data_dir / CLAUSE_INDEX_FILE, offsets, spans)
+    write_json(data_dir / CLAUSE_META_FILE, {
+        "n_clauses": len(texts),
+        "n_verses": len(verses),
+        "dim": cache.dim,
+        "dtype": "uint8",
+        "model": EMBEDDING_MODEL,
+        "model_hash": model_hash(EMBEDDING_MODEL),
+        "min_words": CLAUSE_MIN_WORDS,
+        "note": "Clause embeddings L2-normalised, affine-quantised [-1,1]→[0,255]; "
+                "verse score = max over its clauses",
+        "index": CLAUSE_INDEX_FILE,
+        "sections": sections,
+    })
+    print(f"  Clause index → {data_dir / CLAUSE_INDEX_FILE}")
@@ -1,109 +1,133 @@
 """
 Compute sentence embeddings for every verse, reduce to 2D with UMAP,
 and find nearest neighbors in the full embedding space.
+
+Verse texts go through the persistent EmbeddingCache, so duplicate texts
+are encoded once and only new or edited verses reach the model.  The raw
+vectors are written to embeddings.npy; everything downstream (here and in
+steps 5, 7 and 8) reads the normalised, memory-mapped EmbeddingStore built
+from it, except UMAP, which is fitted on the raw float32 vectors so that
+reproducible layouts (and the umap_layout stability check) are unchanged
+by the store's float16 rounding.
+Cached outputs are reused only while they match the current
+embeddings.npy (embedding_store.derived_current), so a verse edit
+rebuilds the layout, neighbours, tiles and heatmap rather than leaving
+them stale.
 """
 
 import json
 import numpy as np
 from pathlib import Path
 
+from .artifacts import atomic_open, write_json, write_json_array
+from .centroids import book_ranges
+from .embedding_cache import EmbeddingCache, model_encoder
+from .embedding_store import EmbeddingStore, derived_current, mark_derived
+from .instrumentation import span
+from .map_tiles import MAP_TILES_FILE, MAP_TILES_META_FILE, MapTiles
+from .umap_layout import fit_umap
 from .config import (
-    EMBEDDING_MODEL, EMBEDDINGS_FILE, UMAP_FILE, NEIGHBORS_FILE,
-    UMAP_N_NEIGHBORS, UMAP_MIN_DIST, UMAP_METRIC, UMAP_RANDOM_STATE,
+    EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, EMBEDDINGS_FILE, UMAP_FILE, NEIGHBORS_FILE, UMAP_MODE,
     TOP_K_NEIGHBORS, HEATMAP_FILE, BOOKS, BOOK_NAME_TO_META, GENRE_COLORS,
 )
 
 
-def _compute_embeddings(texts: list[str], cache_path: Path) -> np.ndarray:
-    if cache_path.exists():
-        print(f"  [skip] Embeddings cached at {cache_path}")
-        return np.load(cache_path)
+def _compute_embeddings(texts: list[str], out_path: Path, cache_dir: Path):
+    cache = EmbeddingCache(cache_dir, EMBEDDING_MODEL)
+    existing = np.load(out_path, mmap_mode="r") if out_path.exists() else None
+    if existing is not None and not len(cache) and len(existing) == len(texts):
+        # Embeddings from before the cache existed belong to the current texts
+        added = cache.add(texts, existing)
+        print(f"  Seeded embedding cache with {added} vectors from {out_path}")
 
-    from sentence_transformers import SentenceTransformer
-    print(f"  Loading model {EMBEDDING_MODEL}...")
-    model = SentenceTransformer(EMBEDDING_MODEL)
-    print(f"  Encoding {len(texts)} verses...")
-    embeddings = model.encode(texts, show_progress_bar=True, batch_size=256)
-    embeddings = np.array(embeddings, dtype=np.float32)
-    np.save(cache_path, embeddings)
-    print(f"  Saved embeddings {embeddings.shape} → {cache_path}")
-    return embeddings
+    embeddings = cache.encode(texts, model_encoder(EMBEDDING_MODEL))
+    if existing is not None and np.array_equal(existing, embeddings):
+        print(f"  [skip] Embeddings unchanged at {out_path}")
+        return
+    del existing  # release the map before replacing the file
+    with atomic_open(out_path, "wb") as f:
+        np.save(f, embeddings)
+    print(f"  Saved embeddings {embeddings.shape} → {out_path}")
 
 
-def _run_umap(embeddings: np.ndarray, out_path: Path) -> list[list[float]]:
-    if out_path.exists():
+def _run_umap(embeddings: np.ndarray, out_path: Path, mode: str = UMAP_MODE) -> list[list[float]]:
+    if derived_current(out_path):
         print(f"  [skip] UMAP coordinates cached at {out_path}")
         with open(out_path) as f:
             return json.load(f)
 
-    import umap
-    print(f"  Running UMAP ({embeddings.shape[0]} points)...")
-    reducer = umap.UMAP(
-        n_neighbors=UMAP_N_NEIGHBORS,
-        min_dist=UMAP_MIN_DIST,
-        metric=UMAP_METRIC,
-        random_state=UMAP_RANDOM_STATE,
-        n_components=2,
-    )
-    coords = reducer.fit_transform(embeddings)
+    print(f"  Running {mode} UMAP ({len(embeddings)} points)...")
+    coords = fit_umap(embeddings, n_components=2, mode=mode)
     coords_list = coords.tolist()
-    with open(out_path, "w") as f:
-        json.dump(coords_list, f)
+    write_json(out_path, coords_list)
+    mark_derived(out_path)
     print(f"  UMAP complete → {out_path}")
     return coords_list
 
 
-def _find_neighbors(embeddings: np.ndarray, out_path: Path) -> list[list]:
-    if out_path.exists():
+def _iter_neighbors(store: EmbeddingStore, batch_size: int = 500):
+    """Yield each verse's top-k neighbor list, one similarity batch at a time."""
+    k = min(TOP_K_NEIGHBORS, len(store) - 1)
+    for start in range(0, len(store), batch_size):
+        sims = store.similarities(store.rows(start, start + batch_size))  # (batch, N)
+        rows = np.arange(len(sims))
+        sims[rows, start + rows] = -1  # exclude self
+        # Partition out the top k, then sort only those k columns
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+        for ids, vals in zip(top.tolist(), top_sims.tolist()):
+            yield [[j, round(s, 4)] for j, s in zip(ids, vals)]
+
+
+def _find_neighbors(store: EmbeddingStore, out_path: Path):
+    if derived_current(out_path):
         print(f"  [skip] Neighbors cached at {out_path}")
-        with open(out_path) as f:
-            return json.load(f)
+        return
 
-    print(f"  Computing top-{TOP_K_NEIGHBORS} neighbors for {len(embeddings)} verses...")
-    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-    normed = embeddings / (norms + 1e-10)
+    print(f"  Computing top-{TOP_K_NEIGHBORS} neighbors for {len(store)} verses...")
+    # Neighbors are computed lazily while the JSON streams out
+    with span("knn", items=len(store), k=TOP_K_NEIGHBORS):
+        size = write_json_array(out_path, _iter_neighbors(store))
+    mark_derived(out_path)
+    print(f"  Neighbors → {out_path} ({size / 1e6:.1f} MB)")
 
-    neighbors = []
-    batch_size = 500
-    for start in range(0, len(normed), batch_size):
-        end = min(start + batch_size, len(normed))
-        sims = normed[start:end] @ normed.T  # (batch, N)
-        for i, row in enumerate(sims):
-            idx = start + i
-            row[idx] = -1  # exclude self
-            top_k = np.argsort(row)[-TOP_K_NEIGHBORS:][::-1]
-            neighbors.append([[int(j), round(float(row[j]), 4)] for j in top_k])
 
-    with open(out_path, "w") as f:
-        json.dump(neighbors, f)
-    print(f"  Neighbors → {out_path}")
-    return neighbors
+def _build_tiles(coords: list[list[float]], nb_path: Path, out_dir: Path):
+    """Tile pyramid over the 2D map; importance = kNN in-degree from neighbors.json."""
+    out_path = out_dir / MAP_TILES_FILE
+    if derived_current(out_path):
+        print(f"  [skip] Map tiles cached at {out_path}")
+        return
+
+    with open(nb_path) as f:
+        targets = [j for row in json.load(f) for j, _sim in row]
+    importance = np.bincount(targets, minlength=len(coords))
+    with span("map_tiles", items=len(coords)):
+        tiles = MapTiles.build(coords, importance)
+        size = tiles.save(out_dir)
+    mark_derived(out_path, out_dir / MAP_TILES_META_FILE)
+    print(f"  Map tiles: {tiles.zooms} zooms, {len(tiles.tile_keys)} tiles "
+          f"→ {out_path} ({size / 1e6:.1f} MB)")
 
 
-def _book_heatmap(verses: list[dict], embeddings: np.ndarray, out_path: Path):
+def _book_heatmap(verses: list[dict], store: EmbeddingStore, out_path: Path):
     """Compute book×book cosine similarity matrix from mean embeddings."""
-    if out_path.exists():
+    if derived_current(out_path):
         print(f"  [skip] Heatmap cached at {out_path}")
         return
 
-    from collections import defaultdict
-    book_embs = defaultdict(list)
-    for v, emb in zip(verses, embeddings):
-        book_embs[v["book"]].append(emb)
-
-    book_names = [b["name"] for b in BOOKS]
-    means = {}
-    for name in book_names:
-        vecs = np.array(book_embs[name])
-        means[name] = vecs.mean(axis=0)
-
-    n = len(book_names)
-    matrix = np.zeros((n, n))
-    for i in range(n):
-        for j in range(n):
-            a, b = means[book_names[i]], means[book_names[j]]
-            cos = float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-10))
-            matrix[i][j] = round(cos, 4)
+    # Sum of raw embeddings per book (raw = unit row * norm); cosine ignores
+    # the 1/count of the mean, so the sums are compared directly.
+    row_of = {b["num"]: i for i, b in enumerate(BOOKS)}
+    sums = np.zeros((len(BOOKS), store.dim), dtype=np.float64)
+    for num, start, end in zip(*book_ranges(verses)):
+        sums[row_of[int(num)]] += store.norms[start:end] @ store.rows(start, end)
+
+    lengths = np.linalg.norm(sums, axis=1)
+    matrix = np.round(sums @ sums.T / (np.outer(lengths, lengths) + 1e-10), 4)
 
     result = {
         "books": [{"name": b["name"], "abbrev": b["abbrev"], "genre": b["genre"]}
@@ -111,22 +135,25 @@ def _book_heatmap(verses: list[dict], embeddings: np.ndarray, out_path: Path):
         "matrix": matrix.tolist(),
         "genre_colors": GENRE_COLORS,
     }
-    with open(out_path, "w") as f:
-        json.dump(result, f)
+    write_json(out_path, result)
+    mark_derived(out_path)
     print(f"  Heatmap → {out_path}")
 
 
-def run(verses: list[dict], data_dir: Path):
+def run(verses: list[dict], data_dir: Path, umap_mode: str = UMAP_MODE):
     print("[2/5] Computing embeddings...")
     texts = [v["text"] for v in verses]
     emb_path = data_dir / EMBEDDINGS_FILE
-    embeddings = _compute_embeddings(texts, emb_path)
+    _compute_embeddings(texts, emb_path, data_dir / EMBEDDING_CACHE_DIR)
+    store = EmbeddingStore.ensure(data_dir)
 
     umap_path = data_dir / UMAP_FILE
-    _run_umap(embeddings, umap_path)
+    coords = _run_umap(np.load(emb_path, mmap_mode="r"), umap_path, umap_mode)
 
     nb_path = data_dir / NEIGHBORS_FILE
-    _find_neighbors(embeddings, nb_path)
+    _find_neighbors(store, nb_path)
+
+    _build_tiles(coords, nb_path, data_dir)
 
     heatmap_path = data_dir / HEATMAP_FILE
-    _book_heatmap(verses, embeddings, heatmap_path)
+    _book_heatmap(verses, store, heatmap_path)
@@ -1,64 +1,51 @@
 """
 Compute information-theoretic and lexical metrics per book:
   - Shannon entropy (token distribution)
-  - Compression ratio (gzip)
+  - Compression ratio (gzip, plus bz2/lzma/zlib/zstd for comparison)
   - Lexical diversity (type-token ratio, hapax ratio)
   - Mean word/sentence length
-  - Hapax legomena (words appearing exactly once in the entire Bible)
+  - Hapax legomena (words appearing exactly once in the entire Bible),
+    from a persistent term → verse inverted index
 """
 
-import gzip
-import json
-import math
-import re
-from collections import Counter, defaultdict
+from collections import defaultdict
 from pathlib import Path
 
-from .config import BOOKS, METRICS_FILE, HAPAX_FILE, GENRE_COLORS
+import numpy as np
 
+from .artifacts import write_json
+from .centroids import chapter_ranges
+from .compression import codec_suite, compression_ratios
+from .config import (
+    BOOKS, METRICS_FILE, HAPAX_FILE, CHAPTER_METRICS_FILE, GENRE_COLORS,
+    NCD_HEATMAP_FILE, NCD_CHAPTER_FILE, NCD_CODEC, NCD_CHAPTER_CODEC, NCD_CHAPTERS, METRICS_CODECS,
+)
+from .instrumentation import span
+from .lexical_index import LexicalIndex, LEXICON_INDEX_FILE
+from .ncd import NCD_CACHE, ncd_matrix, write_heatmap
+from .text_metrics import TokenizedCorpus, group_metrics, range_metrics, tokenize_corpus
 
-def _tokenize(text: str) -> list[str]:
-    return re.findall(r'[a-zA-Z]+', text.lower())
 
+def _book_labels(verses: list[dict]) -> np.ndarray:
+    """Index into BOOKS for each verse."""
+    book_index = {b["name"]: i for i, b in enumerate(BOOKS)}
+    return np.fromiter((book_index[v["book"]] for v in verses), dtype=np.int64, count=len(verses))
 
-def _shannon_entropy(tokens: list[str]) -> float:
-    counts = Counter(tokens)
-    total = len(tokens)
-    if total == 0:
-        return 0.0
-    return -sum(
-        (c / total) * math.log2(c / total)
-        for c in counts.values()
-    )
-
-
-def _compression_ratio(text: str) -> float:
-    raw = text.encode("utf-8")
-    compressed = gzip.compress(raw, compresslevel=9)
-    return len(compressed) / len(raw) if len(raw) > 0 else 1.0
 
+def _compute_book_metrics(verses: list[dict], corpus: TokenizedCorpus) -> list[dict]:
+    labels = _book_labels(verses)
+    m = group_metrics(corpus, labels, n_groups=len(BOOKS))
+    n_verses = np.bincount(labels, minlength=len(BOOKS))
 
-def _compute_book_metrics(verses: list[dict]) -> list[dict]:
     book_texts = defaultdict(list)
-    book_tokens = defaultdict(list)
     for v in verses:
         book_texts[v["book"]].append(v["text"])
-        book_tokens[v["book"]].extend(_tokenize(v["text"]))
+    full_texts = [" ".join(book_texts.get(b["name"], [])) for b in BOOKS]
+    ratios = codec_suite(full_texts, dict.fromkeys(("gzip", *METRICS_CODECS)))
 
     metrics = []
-    for book_meta in BOOKS:
+    for i, book_meta in enumerate(BOOKS):
         name = book_meta["name"]
-        tokens = book_tokens.get(name, [])
-        full_text = " ".join(book_texts.get(name, []))
-        types = set(tokens)
-        n_tokens = len(tokens)
-        n_types = len(types)
-
-        sentences = re.split(r'[.!?;:]', full_text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-
-        hapax_in_book = sum(1 for w, c in Counter(tokens).items() if c == 1)
-
         metrics.append({
             "book": name,
             "abbrev": book_meta["abbrev"],
@@ -66,46 +53,86 @@ def _compute_book_metrics(verses: list[dict]) -> list[dict]:
             "testament": book_meta["testament"],
             "genre": book_meta["genre"],
             "genre_color": GENRE_COLORS[book_meta["genre"]],
-            "n_verses": len(book_texts.get(name, [])),
-            "n_tokens": n_tokens,
-            "n_types": n_types,
-            "shannon_entropy": round(_shannon_entropy(tokens), 4),
-            "compression_ratio": round(_compression_ratio(full_text), 4),
-            "type_token_ratio": round(n_types / n_tokens, 4) if n_tokens > 0 else 0,
-            "hapax_ratio": round(hapax_in_book / n_types, 4) if n_types > 0 else 0,
-            "mean_word_length": round(
-                sum(len(t) for t in tokens) / n_tokens, 2
-            ) if n_tokens else 0,
-            "mean_sentence_length": round(
-                n_tokens / len(sentences), 2
-            ) if sentences else 0,
+            "n_verses": int(n_verses[i]),
+            "n_tokens": int(m["n_tokens"][i]),
+            "n_types": int(m["n_types"][i]),
+            "shannon_entropy": round(float(m["shannon_entropy"][i]), 4),
+            "compression_ratio": round(float(ratios["gzip"][i]), 4),
+            "compression_by_codec": {c: round(float(r[i]), 4) for c, r in ratios.items()},
+            "type_token_ratio": round(float(m["type_token_ratio"][i]), 4),
+            "hapax_ratio": round(float(m["hapax_ratio"][i]), 4),
+            "mean_word_length": round(float(m["mean_word_length"][i]), 2),
+            "mean_sentence_length": round(float(m["mean_sentence_length"][i]), 2),
         })
     return metrics
 
 
-def _compute_hapax_legomena(verses: list[dict]) -> list[dict]:
-    """Find words appearing exactly once in the entire Bible."""
-    global_counts = Counter()
-    word_locations = {}
+def _compute_chapter_metrics(verses: list[dict], corpus: TokenizedCorpus) -> list[dict]:
+    """Same lexical metrics as the book table, per chapter (gzip ratio only)."""
+    _, starts, ends = chapter_ranges(verses)
+    m = range_metrics(corpus, starts, ends)
+    gzip_ratios = compression_ratios(
+        [" ".join(v["text"] for v in verses[s:e]) for s, e in zip(starts, ends)]
+    )
+    chapters = []
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        v = verses[s]
+        chapters.append({
+            "book": v["book"],
+            "book_num": v["book_num"],
+            "chapter": v["chapter"],
+            "n_verses": int(e - s),
+            "n_tokens": int(m["n_tokens"][i]),
+            "n_types": int(m["n_types"][i]),
+            "shannon_entropy": round(float(m["shannon_entropy"][i]), 4),
+            "compression_ratio": round(float(gzip_ratios[i]), 4),
+            "type_token_ratio": round(float(m["type_token_ratio"][i]), 4),
+            "hapax_ratio": round(float(m["hapax_ratio"][i]), 4),
+            "mean_word_length": round(float(m["mean_word_length"][i]), 2),
+            "mean_sentence_length": round(float(m["mean_sentence_length"][i]), 2),
+        })
+    return chapters
 
-    for v in verses:
-        tokens = _tokenize(v["text"])
-        for tok in set(tokens):
-            global_counts[tok] += 1
-            word_locations[tok] = v["id"]
 
+def _compute_ncd(verses: list[dict], data_dir: Path):
+    """Book×book (and optionally chapter×chapter) compression distance."""
+    book_texts = defaultdict(list)
+    for v in verses:
+        book_texts[v["book"]].append(v["text"])
+    labels = [{"name": b["name"], "abbrev": b["abbrev"], "genre": b["genre"]} for b in BOOKS]
+    out_path = data_dir / NCD_HEATMAP_FILE
+    write_heatmap(labels, [" ".join(book_texts[b["name"]]) for b in BOOKS], out_path,
+                  codec=NCD_CODEC, genre_colors=GENRE_COLORS,
+                  cache_path=data_dir / NCD_CACHE.format(scope="books", codec=NCD_CODEC))
+    print(f"  NCD heatmap → {out_path}")
+
+    if NCD_CHAPTERS:
+        _, starts, ends = chapter_ranges(verses)
+        texts = [" ".join(v["text"] for v in verses[s:e]) for s, e in zip(starts, ends)]
+        matrix = ncd_matrix(texts, NCD_CHAPTER_CODEC,
+                            cache_path=data_dir / NCD_CACHE.format(scope="chapters",
+                                                                   codec=NCD_CHAPTER_CODEC))
+        chapter_path = data_dir / NCD_CHAPTER_FILE
+        np.save(chapter_path, matrix.astype(np.float16))
+        print(f"  Chapter NCD {matrix.shape} → {chapter_path}")
+
+
+def _compute_hapax_legomena(verses: list[dict], index: LexicalIndex) -> list[dict]:
+    """Find words appearing in exactly one verse of the entire Bible."""
     hapax = []
-    for word, count in global_counts.items():
-        if count == 1 and len(word) > 3:
-            vid = word_locations[word]
-            verse = verses[vid]
-            hapax.append({
-                "word": word,
-                "verse_id": vid,
-                "ref": verse["ref"],
-                "book": verse["book"],
-                "genre": verse["genre"],
-            })
+    for tid in index.legomena(1, by="verses"):
+        word = index.terms[tid]
+        if len(word) <= 3:
+            continue
+        vid = int(index.postings[index.offsets[tid]])
+        verse = verses[vid]
+        hapax.append({
+            "word": word,
+            "verse_id": vid,
+            "ref": verse["ref"],
+            "book": verse["book"],
+            "genre": verse["genre"],
+        })
 
     hapax.sort(key=lambda h: h["verse_id"])
     return hapax
@@ -139,7 +166,10 @@ def _genre_aggregates(book_metrics: list[dict]) -> list[dict]:
 
 def run(verses: list[dict], data_dir: Path):
     print("[4/5] Computing information-theoretic metrics...")
-    book_metrics = _compute_book_metrics(verses)
+    with span("tokenize", items=len(verses)):
+        corpus = tokenize_corpus(verses)
+    print(f"  {len(corpus.token_ids)} tokens, {len(corpus.vocab)} types")
+    book_metrics = _compute_book_metrics(verses, corpus)
     genre_aggs = _genre_aggregates(book_metrics)
 
     result = {
@@ -149,13 +179,25 @@ def run(verses: list[dict], data_dir: Path):
     }
 
     out_path = data_dir / METRICS_FILE
-    with open(out_path, "w") as f:
-        json.dump(result, f)
+    write_json(out_path, result)
     print(f"  Metrics → {out_path}")
 
+    chapter_metrics = _compute_chapter_metrics(verses, corpus)
+    chapter_path = data_dir / CHAPTER_METRICS_FILE
+    write_json(chapter_path, chapter_metrics)
+    print(f"  {len(chapter_metrics)} chapter metrics → {chapter_path}")
+
+    with span("ncd"):
+        _compute_ncd(verses, data_dir)
+
+    with span("lexical_index", items=len(corpus.token_ids)):
+        index = LexicalIndex.build(corpus, _book_labels(verses), len(BOOKS))
+        size = index.save(data_dir)
+    print(f"  Lexical index: {len(index.terms)} terms, {len(index.postings)} postings "
+          f"→ {data_dir / LEXICON_INDEX_FILE} ({size / 1e6:.1f} MB)")
+
     print("  Computing hapax legomena...")
-    hapax = _compute_hapax_legomena(verses)
+    hapax = _compute_hapax_legomena(verses, index)
     hapax_path = data_dir / HAPAX_FILE
-    with open(hapax_path, "w") as f:
-        json.dump(hapax, f)
+    write_json(hapax_path, hapax)
     print(f"  Found {len(hapax)} hapax legomena → {hapax_path}")
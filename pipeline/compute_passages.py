@@ -1,17 +1,48 @@
 """
-Build passage (pericope) records for passage-level semantic search.
+Build passage records for passage-level semantic search.
 
-Uses the ~5,300 pericope boundaries from biblestudystart.com (via sil-ai/pericopes)
-and computes each passage's embedding as the L2-normalised mean of its verse embeddings.
-Exports a JSON manifest and a uint8 binary identical in format to the verse search data.
+Passages come from one or more segmentation schemes, all exported in one run:
+  - pericope: the ~5,300 boundaries from biblestudystart.com (via sil-ai/pericopes)
+  - chapter:  one passage per chapter
+  - window:   fixed PASSAGE_WINDOW-verse windows every PASSAGE_WINDOW_STEP verses
+
+Pericopes may cross chapter boundaries (an "End Chapter" column, or an end
+verse before the start verse, which runs on into the next chapter).
+
+Every scheme reduces to (start, end) verse-ID ranges.  References are
+resolved against a sorted verse-key array (book << 16 | chapter << 8 | verse)
+with np.searchsorted, and each passage embedding is the L2-normalised mean
+of its (unit) verse embeddings from the shared embedding store, computed for
+all passages at once as a segment reduction (centroids.range_centroids).
+Records carry verse IDs only; their text comes from the text store
+(pipeline/text_store.py).
+Exports a JSON manifest and a uint8 binary identical in format to the verse search data,
+plus a compact passage graph binary (little-endian sections, table in the meta file):
+    ranges           uint32  n_passages × 2 verse-ID [start, end) per passage
+    verse_offsets    uint32  n_verses + 1 start positions into verse_passages
+    verse_passages   uint32  passage IDs containing each verse
+    neighbor_ids     uint32  n_passages × k most similar passages, best first;
+                             NO_NEIGHBOR (0xFFFFFFFF) pads rows with fewer than
+                             k non-overlapping candidates
+    neighbor_sims    uint8   cosine similarity quantised [-1,1]→[0,255] (0 for padding)
+so "related passages" on the site is a table lookup rather than a scan.
 """
 
 import csv
-import json
 import urllib.request
 import numpy as np
 from pathlib import Path
 
+from .artifacts import atomic_open, write_binary, write_json, write_json_array
+from .centroids import range_centroids, chapter_ranges
+from .embedding_store import EmbeddingStore
+from .config import (
+    BOOK_NAME_TO_META, BOOK_NUM_TO_META,
+    PASSAGE_NEIGHBORS, PASSAGE_SCHEMES, PASSAGE_WINDOW, PASSAGE_WINDOW_STEP,
+)
+from .instrumentation import record_bytes, span
+from .translations import verse_key, verse_keys
+
 PERICOPE_URL = (
     "https://raw.githubusercontent.com/sil-ai/pericopes/main/pericopes.csv"
 )
@@ -19,6 +50,8 @@ PERICOPE_URL = (
 PASSAGES_JSON = "passages.json"
 PASSAGE_EMB_FILE = "passage_embeddings.bin"
 PASSAGE_META_FILE = "passage_meta.json"
+PASSAGE_GRAPH_FILE = "passage_graph.bin"
+NO_NEIGHBOR = 0xFFFFFFFF  # neighbor_ids padding (uint32 -1)
 
 # Map from the pericope CSV's 3-letter codes to our book names (config.py)
 _PERI_CODE_TO_BOOK = {
@@ -55,105 +88,222 @@ def _fetch_pericopes(data_dir: Path) -> list[dict]:
     return rows
 
 
-def run(verses: list[dict], data_dir: Path):
-    print("[passages] Building passage records from pericope boundaries...")
+def _resolve_ranges(keys: np.ndarray, book_nums, start_ch, start_v, end_ch, end_v):
+    """(starts, ends) verse-ID ranges covering every verse between two references."""
+    lo = verse_key(book_nums, start_ch, start_v)
+    hi = verse_key(book_nums, end_ch, end_v)
+    return np.searchsorted(keys, lo, side="left"), np.searchsorted(keys, hi, side="right")
+
+
+def _format_ref(book: str, ch: int, sv: int, end_ch: int, ev: int) -> str:
+    if end_ch != ch:
+        return f"{book} {ch}:{sv}–{end_ch}:{ev}"
+    return f"{book} {ch}:{sv}–{ch}:{ev}" if ev != sv else f"{book} {ch}:{sv}"
+
+
+def _end_chapter(row: dict, ch: int, sv: int, ev: int) -> int:
+    """End chapter of a pericope row; single-chapter rows end where they start."""
+    explicit = (row.get("End Chapter") or "").strip()
+    if explicit:
+        return int(explicit)
+    return ch + 1 if ev < sv else ch
+
 
+def _pericope_segments(verses: list[dict], keys: np.ndarray, data_dir: Path):
     raw = _fetch_pericopes(data_dir)
     print(f"  {len(raw)} pericope rows loaded")
+    rows = [r for r in raw if r["Book"] in _PERI_CODE_TO_BOOK]
+    books = [_PERI_CODE_TO_BOOK[r["Book"]] for r in rows]
+    book_nums = [BOOK_NAME_TO_META[b]["num"] for b in books]
+    ch = [int(r["Chapter"]) for r in rows]
+    sv = [int(r["Start Verse"]) for r in rows]
+    ev = [int(r["End Verse"]) for r in rows]
+    end_ch = [_end_chapter(r, c, s, e) for r, c, s, e in zip(rows, ch, sv, ev)]
+    starts, ends = _resolve_ranges(keys, book_nums, ch, sv, end_ch, ev)
 
-    emb_path = data_dir / "embeddings.npy"
-    if not emb_path.exists():
-        raise FileNotFoundError("embeddings.npy not found; run step 2 first")
-    all_emb = np.load(emb_path).astype(np.float32)
-
-    # Build a lookup: (book_name, chapter, verse) → verse index
-    verse_idx = {}
-    for i, v in enumerate(verses):
-        verse_idx[(v["book"], v["chapter"], v["verse"])] = i
-
-    from pipeline.config import BOOK_NAME_TO_META
-
-    passages = []
-    passage_embeddings = []
-    skipped = 0
-
-    for r in raw:
-        code = r["Book"]
-        book_name = _PERI_CODE_TO_BOOK.get(code)
-        if not book_name:
-            skipped += 1
-            continue
-        ch = int(r["Chapter"])
-        sv = int(r["Start Verse"])
-        ev = int(r["End Verse"])
-        summary = r["Summary"].strip().rstrip(";").strip()
-
-        # Collect verse indices for this passage
-        v_indices = []
-        for vn in range(sv, ev + 1):
-            idx = verse_idx.get((book_name, ch, vn))
-            if idx is not None:
-                v_indices.append(idx)
-
-        if not v_indices:
-            skipped += 1
-            continue
-
-        meta = BOOK_NAME_TO_META.get(book_name, {})
-        ref_start = f"{book_name} {ch}:{sv}"
-        ref_end = f"{ch}:{ev}" if ev != sv else ""
-        ref = f"{ref_start}–{ref_end}" if ref_end else ref_start
-
-        # Mean embedding for the passage
-        emb = all_emb[v_indices].mean(axis=0)
-
-        verse_texts = [verses[i]["text"] for i in v_indices]
-        bsb_texts = [verses[i].get("text_bsb", "") for i in v_indices]
-
-        rec = {
-            "id": len(passages),
-            "title": summary,
-            "ref": ref,
-            "book": book_name,
-            "book_num": meta.get("num", 0),
+    titles = [r["Summary"].strip().rstrip(";").strip() for r in rows]
+    refs = [_format_ref(b, c, s, ec, e) for b, c, s, ec, e in zip(books, ch, sv, end_ch, ev)]
+    bounds = np.array(list(zip(ch, sv, end_ch, ev)), dtype=np.int64).reshape(-1, 4)
+    return starts, ends, titles, refs, bounds, len(raw) - len(rows)
+
+
+def _chapter_segments(verses: list[dict], keys: np.ndarray, data_dir: Path):
+    _, starts, ends = chapter_ranges(verses)
+    titles = [f"{verses[s]['book']} {verses[s]['chapter']}" for s in starts]
+    bounds = np.array([(verses[s]["chapter"], verses[s]["verse"],
+                        verses[e - 1]["chapter"], verses[e - 1]["verse"])
+                       for s, e in zip(starts, ends)], dtype=np.int64).reshape(-1, 4)
+    return starts, ends, titles, list(titles), bounds, 0
+
+
+def _window_segments(verses: list[dict], keys: np.ndarray, data_dir: Path,
+                     size: int = PASSAGE_WINDOW, step: int = PASSAGE_WINDOW_STEP):
+    """Windows of ``size`` verses every ``step`` verses, never crossing a chapter."""
+    _, ch_starts, ch_ends = chapter_ranges(verses)
+    lengths = ch_ends - ch_starts
+    n_win = np.maximum(1, -(-(lengths - size) // step) + 1)
+    first = np.repeat(np.cumsum(n_win) - n_win, n_win)
+    starts = np.repeat(ch_starts, n_win) + step * (np.arange(n_win.sum()) - first)
+    ends = np.minimum(starts + size, np.repeat(ch_ends, n_win))
+
+    refs, bounds = [], []
+    for s, e in zip(starts, ends):
+        a, b = verses[s], verses[e - 1]
+        refs.append(_format_ref(a["book"], a["chapter"], a["verse"], b["chapter"], b["verse"]))
+        bounds.append((a["chapter"], a["verse"], b["chapter"], b["verse"]))
+    return starts, ends, list(refs), refs, np.array(bounds, dtype=np.int64).reshape(-1, 4), 0
+
+
+_SCHEMES = {
+    "pericope": _pericope_segments,
+    "chapter": _chapter_segments,
+    "window": _window_segments,
+}
+
+
+def _scheme_files(scheme: str) -> tuple[str, str, str, str]:
+    """(json, bin, meta, graph) file names; pericope keeps the original names."""
+    if scheme == "pericope":
+        return PASSAGES_JSON, PASSAGE_EMB_FILE, PASSAGE_META_FILE, PASSAGE_GRAPH_FILE
+    return (f"passages_{scheme}.json", f"passage_embeddings_{scheme}.bin",
+            f"passage_meta_{scheme}.json", f"passage_graph_{scheme}.bin")
+
+
+def _iter_records(verses, starts, ends, titles, refs, bounds):
+    """Yield passage records; text is resolved from the text store by verse range."""
+    for pid, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+        first = verses[s]
+        meta = BOOK_NUM_TO_META.get(first["book_num"], {})
+        ch, sv, end_ch, ev = bounds[pid].tolist()
+        yield {
+            "id": pid,
+            "title": titles[pid],
+            "ref": refs[pid],
+            "book": first["book"],
+            "book_num": first["book_num"],
             "testament": meta.get("testament", ""),
             "chapter": ch,
             "start_verse": sv,
+            "end_chapter": end_ch,
             "end_verse": ev,
-            "verse_ids": v_indices,
-            "n_verses": len(v_indices),
-            "text": " ".join(verse_texts),
+            "verse_ids": list(range(s, e)),
+            "n_verses": e - s,
         }
-        bsb_joined = " ".join(t for t in bsb_texts if t)
-        if bsb_joined:
-            rec["text_bsb"] = bsb_joined
-        passages.append(rec)
-        passage_embeddings.append(emb)
 
-    print(f"  {len(passages)} passages built, {skipped} skipped")
 
-    # Save passage manifest
-    with open(data_dir / PASSAGES_JSON, "w") as f:
-        json.dump(passages, f)
-    print(f"  → {data_dir / PASSAGES_JSON}")
+def _verse_to_passages(starts: np.ndarray, ends: np.ndarray, n_verses: int):
+    """CSR (offsets, passage IDs) listing the passages that contain each verse."""
+    lengths = ends - starts
+    pids = np.repeat(np.arange(len(starts)), lengths)
+    vids = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    vids += np.repeat(starts, lengths)
+    order = np.argsort(vids, kind="stable")
+    offsets = np.zeros(n_verses + 1, dtype=np.int64)
+    np.cumsum(np.bincount(vids, minlength=n_verses), out=offsets[1:])
+    return offsets, pids[order]
+
+
+def _neighbor_graph(emb: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                    k: int, chunk: int = 1024):
+    """
+    Top-k cosine neighbours of every passage, excluding itself and any
+    passage sharing a verse with it (overlapping windows are trivially similar).
+    Slots left without a candidate get ID -1 and similarity -inf, at the end of the row.
+    """
+    n = len(emb)
+    k = min(k, max(n - 1, 0))
+    ids = np.zeros((n, k), dtype=np.int64)
+    sims = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return ids, sims
+    for s in range(0, n, chunk):
+        e = min(s + chunk, n)
+        block = emb[s:e] @ emb.T
+        overlap = (starts[None, :] < ends[s:e, None]) & (starts[s:e, None] < ends[None, :])
+        block[overlap] = -np.inf
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_sims = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind="stable")
+        ids[s:e] = np.take_along_axis(part, order, axis=1)
+        sims[s:e] = np.take_along_axis(part_sims, order, axis=1)
+    ids[np.isneginf(sims)] = -1
+    return ids, sims
+
+
+def _write_graph(path: Path, starts, ends, n_verses: int, emb: np.ndarray,
+                 k: int = PASSAGE_NEIGHBORS) -> dict:
+    """Write the passage graph binary; returns its section table for the meta file."""
+    verse_offsets, verse_passages = _verse_to_passages(starts, ends, n_verses)
+    with span("knn", items=len(starts), k=k):
+        nbr_ids, nbr_sims = _neighbor_graph(emb, starts, ends, k)
+    sims_u8 = ((np.nan_to_num(nbr_sims, neginf=-1.0) + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
+    nbr_ids = np.where(nbr_ids < 0, NO_NEIGHBOR, nbr_ids)
+    arrays = {
+        "ranges": (np.stack([starts, ends], axis=1), "<u4"),
+        "verse_offsets": (verse_offsets, "<u4"),
+        "verse_passages": (verse_passages, "<u4"),
+        "neighbor_ids": (nbr_ids, "<u4"),
+        "neighbor_sims": (sims_u8, "u1"),  # last, so the uint32 sections stay aligned
+    }
+    sections = {}
+    pos = 0
+    with atomic_open(path, "wb") as f:
+        for name, (arr, dtype) in arrays.items():
+            arr = np.ascontiguousarray(arr, dtype=dtype)
+            f.write(arr.data)
+            sections[name] = {"offset": pos, "dtype": np.dtype(dtype).name, "shape": list(arr.shape)}
+            pos += arr.nbytes
+    record_bytes(pos)
+    return {"file": path.name, "k": int(nbr_ids.shape[1]), "missing_id": NO_NEIGHBOR,
+            "bytes": pos, "sections": sections}
+
 
-    # L2-normalise and quantise to uint8 (same scheme as verse search)
-    emb_arr = np.array(passage_embeddings, dtype=np.float32)
-    norms = np.linalg.norm(emb_arr, axis=1, keepdims=True)
-    emb_arr = emb_arr / np.clip(norms, 1e-8, None)
+def _export_scheme(scheme: str, verses: list[dict], keys: np.ndarray,
+                   store: EmbeddingStore, data_dir: Path):
+    starts, ends, titles, refs, bounds, skipped = _SCHEMES[scheme](verses, keys, data_dir)
+    keep = ends > starts
+    skipped += int((~keep).sum())
+    starts, ends, bounds = starts[keep], ends[keep], bounds[keep]
+    titles = [t for t, k in zip(titles, keep) if k]
+    refs = [r for r, k in zip(refs, keep) if k]
+    print(f"  [{scheme}] {len(starts)} passages built, {skipped} skipped")
 
+    json_file, emb_file, meta_file, graph_file = _scheme_files(scheme)
+    size = write_json_array(data_dir / json_file,
+                            _iter_records(verses, starts, ends, titles, refs, bounds))
+    print(f"  → {data_dir / json_file} ({size / 1e6:.1f} MB)")
+
+    # Mean embedding per passage in one segment reduction, L2-normalised,
+    # then quantised to uint8 (same scheme as verse search)
+    emb_arr = range_centroids(store.vectors, starts, ends)
     emb_uint8 = ((emb_arr + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
-    emb_uint8.tofile(data_dir / PASSAGE_EMB_FILE)
+    write_binary(data_dir / emb_file, emb_uint8)
+    size_mb = (data_dir / emb_file).stat().st_size / 1e6
+    print(f"  {emb_arr.shape} → {data_dir / emb_file} ({size_mb:.1f} MB)")
+
+    graph = _write_graph(data_dir / graph_file, starts, ends, len(verses), emb_arr)
+    print(f"  {graph['k']}-NN passage graph → {data_dir / graph_file} ({graph['bytes'] / 1e6:.1f} MB)")
 
-    meta_out = {
-        "n_passages": len(passages),
+    write_json(data_dir / meta_file, {
+        "n_passages": len(starts),
         "dim": int(emb_arr.shape[1]),
         "dtype": "uint8",
-        "model": "odunola/sentence-transformers-bible-reference-final",
-        "note": "Mean of verse embeddings, L2-normalised, affine-quantised [-1,1]→[0,255]",
-    }
-    with open(data_dir / PASSAGE_META_FILE, "w") as f:
-        json.dump(meta_out, f)
+        "model": store.model,
+        "model_hash": store.meta["model_hash"],
+        "scheme": scheme,
+        "note": "Mean of unit verse embeddings, L2-normalised, affine-quantised [-1,1]→[0,255]",
+        "graph": graph,
+    })
+
+
+def run(verses: list[dict], data_dir: Path, schemes=PASSAGE_SCHEMES):
+    print("[passages] Building passage records...")
+
+    store = EmbeddingStore.ensure(data_dir)
 
-    size_mb = (data_dir / PASSAGE_EMB_FILE).stat().st_size / 1e6
-    print(f"  {emb_arr.shape} → {data_dir / PASSAGE_EMB_FILE} ({size_mb:.1f} MB)")
+    keys = verse_keys(verses)
+    for scheme in schemes:
+        if scheme not in _SCHEMES:
+            raise ValueError(f"Unknown passage scheme {scheme!r}; available: {sorted(_SCHEMES)}")
+        with span(scheme, items=len(verses)):
+            _export_scheme(scheme, verses, keys, store, data_dir)
@@ -2,16 +2,20 @@
 Export Bible-model embeddings as a compact uint8 binary for client-side semantic search.
 
 Reads the 768-dim embeddings already computed by compute_embeddings.py (using the
-Bible-trained sentence transformer), L2-normalises them, and quantises to uint8 so
-the browser can load ~23 MB instead of ~96 MB.  Cosine-similarity ranking is
+Bible-trained sentence transformer) from the normalised embedding store, block
+by block, and quantises them to uint8 so the browser can load ~23 MB instead of
+~96 MB.  Cosine-similarity ranking is
 order-preserving under this quantisation because all vectors share the same
 affine mapping [-1, 1] → [0, 255].
 """
 
-import json
 import numpy as np
 from pathlib import Path
 
+from .artifacts import write_binary, write_json
+from .embedding_store import EmbeddingStore
+from .instrumentation import span
+
 SEARCH_FILE = "search_embeddings.bin"
 SEARCH_META_FILE = "search_meta.json"
 
@@ -21,32 +25,26 @@ def run(verses: list[dict], data_dir: Path):
     out_path = data_dir / SEARCH_FILE
     meta_path = data_dir / SEARCH_META_FILE
 
-    emb_path = data_dir / "embeddings.npy"
-    if not emb_path.exists():
-        raise FileNotFoundError(f"embeddings.npy not found at {emb_path}; run step 2 first")
-
-    embeddings = np.load(emb_path).astype(np.float32)
-    assert embeddings.shape[0] == len(verses), (
-        f"Mismatch: {embeddings.shape[0]} embeddings vs {len(verses)} verses"
+    # Rows are already L2-normalised, so dot product == cosine similarity
+    store = EmbeddingStore.ensure(data_dir)
+    assert len(store) == len(verses), (
+        f"Mismatch: {len(store)} embeddings vs {len(verses)} verses"
     )
 
-    # L2-normalise so dot product == cosine similarity
-    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-    embeddings = embeddings / np.clip(norms, 1e-8, None)
-
-    # Quantise [-1, 1] → [0, 255]
-    emb_uint8 = ((embeddings + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
-    emb_uint8.tofile(out_path)
+    # Quantise [-1, 1] → [0, 255], streamed one block at a time
+    with span("quantize", items=len(store)):
+        write_binary(out_path, (((block + 1.0) * 127.5).clip(0, 255).astype(np.uint8)
+                                for _start, block in store.blocks()))
 
     meta = {
         "n_verses": len(verses),
-        "dim": int(embeddings.shape[1]),
+        "dim": store.dim,
         "dtype": "uint8",
-        "model": "odunola/sentence-transformers-bible-reference-final",
+        "model": store.model,
+        "model_hash": store.meta["model_hash"],
         "note": "L2-normalised, then affine-quantised [-1,1]→[0,255]",
     }
-    with open(meta_path, "w") as f:
-        json.dump(meta, f)
+    write_json(meta_path, meta)
 
     size_mb = out_path.stat().st_size / 1e6
-    print(f"  {embeddings.shape} → {out_path} ({size_mb:.1f} MB)")
+    print(f"  {(len(store), store.dim)} → {out_path} ({size_mb:.1f} MB)")
@@ -12,15 +12,16 @@ Pipeline:
 
 import csv
 import io
-import json
 import numpy as np
 import urllib.request
 from pathlib import Path
 
-from .config import (
-    BOOKS, EMBEDDINGS_FILE,
-    UMAP_METRIC, UMAP_RANDOM_STATE,
-)
+from .artifacts import write_json
+from .centroids import book_ranges, top_k_in_ranges
+from .config import BOOKS, BOOK_NUM_TO_META, EMBEDDINGS_FILE, UMAP_MODE
+from .embedding_store import EmbeddingStore, derived_current, mark_derived
+from .instrumentation import span
+from .umap_layout import fit_umap
 
 SPHERE_FILE = "sphere.json"
 XREF_CSV_URL = (
@@ -48,22 +49,15 @@ _ABBREV_ALIASES = {
 }
 
 
-def _umap_3d(embeddings, cache_path):
-    if cache_path.exists():
+def _umap_3d(embeddings, cache_path, mode=UMAP_MODE):
+    if derived_current(cache_path):
         print(f"  [skip] 3D UMAP cached at {cache_path}")
         return np.load(cache_path)
 
-    import umap
-    print(f"  Running 3D UMAP on {len(embeddings)} points...")
-    reducer = umap.UMAP(
-        n_components=3,
-        n_neighbors=15,
-        min_dist=0.1,
-        metric=UMAP_METRIC,
-        random_state=UMAP_RANDOM_STATE,
-    )
-    coords = reducer.fit_transform(embeddings)
+    print(f"  Running {mode} 3D UMAP on {len(embeddings)} points...")
+    coords = fit_umap(embeddings, n_components=3, mode=mode, n_neighbors=15, min_dist=0.1)
     np.save(cache_path, coords)
+    mark_derived(cache_path)
     return coords
 
 
@@ -203,16 +197,32 @@ def _build_vote_bins(arcs, sphere_coords):
     return result
 
 
-def run(verses, data_dir):
+def _iter_points(verses, sphere):
+    """Yield one point record per verse; streamed straight into sphere.json."""
+    for v, sc in zip(verses, sphere):
+        yield {
+            "ref": v["ref"],
+            "book": v["book"],
+            "book_num": v["book_num"],
+            "testament": v["testament"],
+            "sx": round(float(sc[0]), 4),
+            "sy": round(float(sc[1]), 4),
+            "sz": round(float(sc[2]), 4),
+        }
+
+
+def run(verses, data_dir, umap_mode=UMAP_MODE):
     print("[sphere] Building homepage 3D sphere...")
 
-    emb_path = data_dir / EMBEDDINGS_FILE
-    if not emb_path.exists():
+    try:
+        store = EmbeddingStore.ensure(data_dir)
+    except FileNotFoundError:
         print("  [error] Embeddings not found. Run step 2 first.")
         return
-    embeddings = np.load(emb_path)
 
-    coords = _umap_3d(embeddings, data_dir / "umap3d.npy")
+    # Raw float32 vectors, as in step 2, so the layout does not depend on the store dtype
+    coords = _umap_3d(np.load(data_dir / EMBEDDINGS_FILE, mmap_mode="r"),
+                      data_dir / "umap3d.npy", umap_mode)
     sphere = _project_to_sphere(coords)
     print(f"  {len(sphere)} verses projected to unit sphere")
 
@@ -221,11 +231,14 @@ def run(verses, data_dir):
         lookup[(v["book_abbrev"], v["chapter"], v["verse"])] = i
 
     csv_text = _download_xrefs(data_dir)
-    arcs, total_unique, dataset_intra, dataset_inter = _parse_xrefs(csv_text, lookup)
+    with span("xref_parse", bytes_in=len(csv_text)) as s:
+        arcs, total_unique, dataset_intra, dataset_inter = _parse_xrefs(csv_text, lookup)
+        s.items = total_unique
     print(f"  {total_unique} unique cross-references in dataset ({dataset_intra} intra, {dataset_inter} inter)")
     print(f"  {len(arcs)} with votes >= {MIN_VOTES} (rendered)")
 
-    vote_bins = _build_vote_bins(arcs, sphere)
+    with span("arc_geometry", items=len(arcs)):
+        vote_bins = _build_vote_bins(arcs, sphere)
     total_cross = 0
     total_intra = 0
     for b in vote_bins:
@@ -239,58 +252,27 @@ def run(verses, data_dir):
     n_ot = sum(1 for v in verses if v["testament"] == "OT")
     n_nt = sum(1 for v in verses if v["testament"] == "NT")
 
-    points = []
-    bsb_list = []
-    for v, sc in zip(verses, sphere):
-        pt = {
-            "ref": v["ref"],
-            "text": v["text"],
-            "book": v["book"],
-            "book_num": v["book_num"],
-            "testament": v["testament"],
-            "sx": round(float(sc[0]), 4),
-            "sy": round(float(sc[1]), 4),
-            "sz": round(float(sc[2]), 4),
-        }
-        points.append(pt)
-        bsb_list.append(v.get("text_bsb", ""))
-
-    # Write BSB translations as a separate lightweight file
-    bsb_path = data_dir / "bsb_verses.json"
-    with open(bsb_path, "w") as f:
-        json.dump(bsb_list, f)
-    print(f"  BSB translations → {bsb_path} ({bsb_path.stat().st_size / 1e6:.1f} MB)")
-
     # Representative verse per book: closest to mean embedding
-    book_indices = {}
-    for i, v in enumerate(verses):
-        book_indices.setdefault(v["book_num"], []).append(i)
+    book_nums, starts, ends = book_ranges(verses)
+    top_idx, top_sim = top_k_in_ranges(store.vectors, starts, ends, k=1)
 
     rep_verses = []
-    for b in BOOKS:
-        bn = b["num"]
-        idxs = book_indices.get(bn, [])
-        if not idxs:
-            continue
-        book_emb = embeddings[idxs]
-        mean_emb = book_emb.mean(axis=0)
-        mean_norm = mean_emb / (np.linalg.norm(mean_emb) + 1e-8)
-        norms = np.linalg.norm(book_emb, axis=1, keepdims=True)
-        sims = (book_emb / np.clip(norms, 1e-8, None)) @ mean_norm
-        best = idxs[int(np.argmax(sims))]
+    for bn, start, end, best, sim in zip(book_nums, starts, ends,
+                                         top_idx[:, 0], top_sim[:, 0]):
+        b = BOOK_NUM_TO_META[int(bn)]
         rep_verses.append({
-            "book_num": bn,
+            "book_num": b["num"],
             "book": b["name"],
             "testament": b["testament"],
             "ref": verses[best]["ref"],
-            "text": verses[best]["text"],
-            "similarity": round(float(np.max(sims)), 4),
-            "n_verses": len(idxs),
+            "verse_id": int(best),  # text comes from the text store
+            "similarity": round(float(sim), 4),
+            "n_verses": int(end - start),
         })
     print(f"  {len(rep_verses)} representative verses computed")
 
     result = {
-        "points": points,
+        "points": _iter_points(verses, sphere),
         "vote_bins": vote_bins,
         "representative_verses": rep_verses,
         "stats": {
@@ -308,8 +290,6 @@ def run(verses, data_dir):
     }
 
     out_path = data_dir / SPHERE_FILE
-    with open(out_path, "w") as f:
-        json.dump(result, f)
-    size_mb = out_path.stat().st_size / 1e6
+    size_mb = write_json(out_path, result) / 1e6
     print(f"  sphere.json -> {out_path} ({size_mb:.1f} MB, "
-          f"{len(points)} points, {len(arcs)} arcs in {len(vote_bins)} vote bins)")
+          f"{len(verses)} points, {len(arcs)} arcs in {len(vote_bins)} vote bins)")
@@ -153,10 +153,49 @@ UMAP_N_NEIGHBORS = 15
 UMAP_MIN_DIST = 0.1
 UMAP_METRIC = "cosine"
 UMAP_RANDOM_STATE = 42
+# "reproducible": seeded, single-threaded SGD (bit-identical reruns).
+# "fast": parallel SGD over UMAP_N_JOBS cores, started from a deterministic
+# exact kNN graph and PCA init so runs differ only by SGD scheduling; check
+# with `python -m pipeline.umap_layout --data data`.
+UMAP_MODES = ("reproducible", "fast")
+UMAP_MODE = "reproducible"
+UMAP_N_JOBS = -1
+UMAP_STABILITY_MAX_DISPARITY = 0.2
+UMAP_STABILITY_MIN_PRESERVATION = 0.4
 
 EMBEDDING_MODEL = "odunola/sentence-transformers-bible-reference-final"
 TOP_K_NEIGHBORS = 8
 
+# Shared memory-mapped store of normalised embeddings (pipeline/embedding_store.py).
+# float16 halves its size; consumers upcast EMBEDDING_BLOCK_ROWS rows at a time.
+EMBEDDING_STORE_DTYPE = "float16"
+EMBEDDING_BLOCK_ROWS = 8192
+
+# Append-only embedding cache keyed by normalised text (pipeline/embedding_cache.py),
+# under data/; new vectors are flushed to disk every EMBEDDING_CACHE_FLUSH_ROWS encodes.
+EMBEDDING_CACHE_DIR = "embedding_cache"
+EMBEDDING_CACHE_FLUSH_ROWS = 4096
+EMBEDDING_BATCH_SIZE = 256
+
+# Optional clause-level search vectors (step 11, pipeline/compute_clauses.py):
+# verses split on the sentence punctuation of compute_metrics, pieces under
+# CLAUSE_MIN_WORDS words merged into a neighbour, embedded CLAUSE_CHUNK at a time.
+CLAUSE_SEARCH = False
+CLAUSE_MIN_WORDS = 3
+CLAUSE_CHUNK = 8192
+
+# Tile pyramid over the 2D UMAP map (pipeline/map_tiles.py)
+MAP_TILE_CAPACITY = 256
+MAP_TILE_MAX_ZOOM = 12
+MAP_DENSITY_GRID = 16
+MAP_DENSITY_ZOOMS = 4
+
+# Entity network layout (pipeline/graph_layout.py), stored in graph.json
+GRAPH_LAYOUT_SEED = 42
+GRAPH_LAYOUT_ITERATIONS = 300
+GRAPH_PAGERANK_DAMPING = 0.85
+GRAPH_BETWEENNESS_SAMPLES = 500
+
 # Data source: public-domain KJV from GitHub
 KJV_SOURCE_BASE = "https://raw.githubusercontent.com/aruljohn/Bible-kjv/master"
 
@@ -170,3 +209,34 @@ GRAPH_FILE = "graph.json"
 METRICS_FILE = "metrics.json"
 HEATMAP_FILE = "heatmap.json"
 HAPAX_FILE = "hapax.json"
+CHAPTER_METRICS_FILE = "chapter_metrics.json"
+NCD_HEATMAP_FILE = "ncd_heatmap.json"
+NCD_CHAPTER_FILE = "ncd_chapters.npy"
+
+# Codecs whose whole-book compression ratios go into metrics.json
+# (compression_by_codec).  compression_ratio and the site use gzip, which
+# always runs; add "bz2", "lzma" or "zstd" to compare codecs (lzma on
+# whole books is by far the slowest).
+METRICS_CODECS = ("gzip",)
+
+# Normalized compression distance: the chapter matrix is ~700k pair
+# compressions, so it is opt-in; the book matrix always runs.
+# Deflate (gzip/zlib) can only match back 32 KB, so for texts longer than
+# that C(xy) ≈ C(x) + C(y) and NCD sits near 1 for every pair; most books
+# are longer.  Books therefore use lzma (8 MB dictionary at preset 6, or
+# "zstd" if installed).  Chapters (a few KB each) fit the deflate window,
+# and lzma would make the chapter matrix several times slower.
+NCD_CODEC = "lzma"
+NCD_CHAPTER_CODEC = "gzip"
+NCD_CHAPTERS = False
+
+# Passage segmentations exported by step 8. "pericope" keeps the original
+# passages.json / passage_embeddings.bin names; the others get a suffix.
+PASSAGE_SCHEMES = ("pericope", "chapter", "window")
+PASSAGE_WINDOW = 10
+PASSAGE_WINDOW_STEP = 5
+PASSAGE_NEIGHBORS = 10
+
+# Translations ingested into the text store by step 9 (registry in
+# pipeline/translations.py); KJV comes from the verse records themselves.
+TRANSLATIONS_ENABLED = ("bsb",)
@@ -0,0 +1,171 @@
+"""
+Persistent embedding cache keyed by normalised text and model.
+
+Refrains, the Kings/Chronicles parallels, repeated Psalm lines and verses
+shared between translations all encode to the same vector, so texts are
+NFKC-normalised with whitespace collapsed and keyed by
+blake2b-128(model ID + NUL + normalised text).  encode() looks every text
+up, sends each missing *unique* text through the model once, appends the
+new vectors, and scatters rows back to every position that shares a key.
+Editing a verse therefore re-encodes just that verse.
+
+One append-only store per model under data/embedding_cache/:
+
+  <model_hash>.vec   float32 rows, dim per row, in insertion order
+  <model_hash>.idx   16-byte keys; key i owns row i
+  <model_hash>.json  model, dim, key scheme
+
+Rows are appended (and fsynced) before their keys, so the index is the
+commit record: rows past the last key, from an interrupted run, are cut
+off on the next open.  New vectors are flushed every
+EMBEDDING_CACHE_FLUSH_ROWS encodes, so an interrupted encode resumes where
+it stopped.  Reads go through a read-only memory map of the .vec file.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import write_json
+from .config import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_FLUSH_ROWS, EMBEDDING_MODEL
+from .embedding_store import model_hash
+from .instrumentation import span
+
+KEY_BYTES = 16
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """The form a text is cached (and encoded) under."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_key(normalized: str, model: str = EMBEDDING_MODEL) -> bytes:
+    return hashlib.blake2b(f"{model}\0{normalized}".encode("utf-8"),
+                           digest_size=KEY_BYTES).digest()
+
+
+def model_encoder(model_id: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE):
+    """encode_fn for EmbeddingCache.encode; the model is loaded on the first cache miss."""
+    model = None
+
+    def encode(texts: list[str]) -> np.ndarray:
+        nonlocal model
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"  Loading model {model_id}...")
+            model = SentenceTransformer(model_id)
+        return model.encode(texts, show_progress_bar=True, batch_size=batch_size)
+
+    return encode
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: Path, model: str = EMBEDDING_MODEL):
+        self.dir = Path(cache_dir)
+        self.model = model
+        stem = model_hash(model)
+        self.vec_path = self.dir / f"{stem}.vec"
+        self.idx_path = self.dir / f"{stem}.idx"
+        self.meta_path = self.dir / f"{stem}.json"
+        self.dim = None
+        self._rows: dict[bytes, int] = {}
+        self._vectors = None
+        if self.meta_path.exists():
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self):
+        raw = self.idx_path.read_bytes() if self.idx_path.exists() else b""
+        n = len(raw) // KEY_BYTES
+        # A partial key from an interrupted append would misalign every key after it
+        if len(raw) != n * KEY_BYTES:
+            os.truncate(self.idx_path, n * KEY_BYTES)
+        self._rows = {raw[i * KEY_BYTES:(i + 1) * KEY_BYTES]: i for i in range(n)}
+        row_bytes = self.dim * 4
+        # Drop rows (or a partial row) written after the last committed key
+        if self.vec_path.exists() and self.vec_path.stat().st_size != n * row_bytes:
+            os.truncate(self.vec_path, n * row_bytes)
+        self._vectors = (np.memmap(self.vec_path, dtype="<f4", mode="r", shape=(n, self.dim))
+                         if n else np.zeros((0, self.dim), dtype=np.float32))
+
+    def _append(self, keys: list[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self.dir.mkdir(parents=True, exist_ok=True)
+            write_json(self.meta_path, {
+                "model": self.model,
+                "model_hash": model_hash(self.model),
+                "dim": self.dim,
+                "dtype": "float32",
+                "key": "blake2b-128(model + NUL + normalised text); key i ↔ row i",
+                "normalization": "NFKC, whitespace runs → one space, stripped",
+            })
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Cache for {self.model!r} holds dim {self.dim}, got {vectors.shape[1]}")
+        for path, data in ((self.vec_path, vectors.data), (self.idx_path, b"".join(keys))):
+            with open(path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        for key in keys:
+            self._rows[key] = len(self._rows)
+        self._vectors = np.memmap(self.vec_path, dtype="<f4", mode="r",
+                                  shape=(len(self._rows), self.dim))
+
+    def add(self, texts: list[str], vectors: np.ndarray) -> int:
+        """Insert already-computed vectors (e.g. an existing embeddings.npy); returns rows added."""
+        new = {}
+        for row, text in enumerate(texts):
+            key = text_key(normalize_text(text), self.model)
+            if key not in self._rows:
+                new.setdefault(key, row)
+        if new:
+            self._append(list(new), np.asarray(vectors)[list(new.values())])
+        return len(new)
+
+    def lookup(self, texts: list[str]) -> tuple[list[bytes], np.ndarray]:
+        """(keys, cache row per text or -1)."""
+        keys = [text_key(normalize_text(t), self.model) for t in texts]
+        rows = np.fromiter((self._rows.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        return keys, rows
+
+    def encode(self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray],
+               flush_rows: int = EMBEDDING_CACHE_FLUSH_ROWS, verbose: bool = True) -> np.ndarray:
+        """
+        Embeddings for ``texts`` (n, dim) float32.  ``encode_fn`` is called
+        only on normalised texts missing from the cache, each unique text
+        once, at most ``flush_rows`` per call.
+        """
+        keys, rows = self.lookup(texts)
+        missing = {}
+        for i in np.flatnonzero(rows < 0).tolist():
+            missing.setdefault(keys[i], normalize_text(texts[i]))
+        if verbose:
+            n_unique = len(set(keys))
+            print(f"  {len(texts)} texts, {n_unique} unique: "
+                  f"{n_unique - len(missing)} cached, {len(missing)} to encode")
+
+        if missing:
+            with span("encode", items=len(missing), model=self.model):
+                pending = list(missing.items())
+                for start in range(0, len(pending), flush_rows):
+                    chunk = pending[start:start + flush_rows]
+                    self._append([k for k, _t in chunk], encode_fn([t for _k, t in chunk]))
+            rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+
+        with span("scatter", items=len(texts)):
+            if not len(texts):
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            return np.asarray(self._vectors[rows], dtype=np.float32)
@@ -0,0 +1,195 @@
+"""
+Shared, memory-mapped store of pre-normalised verse embeddings.
+
+Step 2 writes the raw model output to embeddings.npy once; every consumer
+(the map and neighbours in step 2, the sphere in step 5, search in step 7,
+passages in step 8) used to np.load that whole float32 matrix and
+normalise its own copy.  The store is built from it once instead:
+
+  embedding_store.npy   n × dim L2-normalised rows, EMBEDDING_STORE_DTYPE
+  embedding_norms.npy   float32 original row norms (raw = vectors * norms)
+  embedding_store.json  shape, dtype, model ID + hash, source fingerprint
+
+Both .npy files are opened with mmap_mode="r", so steps share the page
+cache rather than each holding a private copy; peak RSS no longer grows
+with the number of steps (or translations) reading the same vectors.
+Consumers read rows(start, end) / blocks() as float32 (a view when the
+store is float32, a per-block upcast when it is float16) so BLAS never
+sees half precision and no step materialises the full float32 matrix.
+
+The store is rebuilt by EmbeddingStore.ensure() whenever embeddings.npy
+changes (size or mtime), the configured model differs from the one
+recorded, or EMBEDDING_STORE_DTYPE changes.
+
+Outputs derived from the embeddings (UMAP layouts, neighbours, map tiles,
+the book heatmap) record the same fingerprint in embedding_derived.json
+via mark_derived(); derived_current() tells a step whether its cached
+output still matches embeddings.npy or must be rebuilt.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .config import EMBEDDING_BLOCK_ROWS, EMBEDDING_MODEL, EMBEDDING_STORE_DTYPE, EMBEDDINGS_FILE
+from .instrumentation import record_bytes, span
+
+EMBEDDING_STORE_FILE = "embedding_store.npy"
+EMBEDDING_NORMS_FILE = "embedding_norms.npy"
+EMBEDDING_STORE_META_FILE = "embedding_store.json"
+EMBEDDING_DERIVED_FILE = "embedding_derived.json"
+
+
+def model_hash(model: str = EMBEDDING_MODEL) -> str:
+    """Short stable hash of a model ID, recorded with everything it produced."""
+    return hashlib.sha256(model.encode("utf-8")).hexdigest()[:16]
+
+
+def _fingerprint(path: Path) -> dict:
+    st = path.stat()
+    return {"file": path.name, "bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _derived(data_dir: Path) -> dict:
+    path = data_dir / EMBEDDING_DERIVED_FILE
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def derived_current(path: Path) -> bool:
+    """Whether ``path`` exists and was built from the current embeddings.npy."""
+    path = Path(path)
+    source = path.parent / EMBEDDINGS_FILE
+    if not path.exists():
+        return False
+    recorded = _derived(path.parent).get(path.name)
+    if source.exists() and recorded != _fingerprint(source):
+        print(f"  {path.name} predates {source.name}, rebuilding")
+        return False
+    return True
+
+
+def mark_derived(*paths: Path):
+    """Record the current embeddings.npy fingerprint for freshly written outputs."""
+    data_dir = Path(paths[0]).parent
+    source = data_dir / EMBEDDINGS_FILE
+    if not source.exists():
+        return
+    derived = _derived(data_dir)
+    fingerprint = _fingerprint(source)
+    derived.update({Path(p).name: fingerprint for p in paths})
+    write_json(data_dir / EMBEDDING_DERIVED_FILE, derived)
+
+
+class EmbeddingStore:
+    def __init__(self, vectors: np.ndarray, norms: np.ndarray, meta: dict):
+        self.vectors = vectors    # (n, dim) unit rows, read-only memmap
+        self.norms = norms        # (n,) float32 norms of the raw rows
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def model(self) -> str:
+        return self.meta["model"]
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, data_dir: Path, model: str = EMBEDDING_MODEL,
+              dtype: str = EMBEDDING_STORE_DTYPE, source: Path | None = None,
+              block_rows: int = EMBEDDING_BLOCK_ROWS) -> "EmbeddingStore":
+        """
+        Normalise ``embeddings`` (any array-like, e.g. a memmap of
+        embeddings.npy) block by block into the store and open it.
+        """
+        n, dim = embeddings.shape
+        norms = np.empty(n, dtype=np.float32)
+        with span("embedding_store", items=n, dtype=dtype):
+            with atomic_open(data_dir / EMBEDDING_STORE_FILE, "wb") as f:
+                np.lib.format.write_array_header_1_0(f, {
+                    "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                    "fortran_order": False,
+                    "shape": (n, dim),
+                })
+                for start in range(0, n, block_rows):
+                    block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+                    block_norms = np.linalg.norm(block, axis=1)
+                    norms[start:start + len(block)] = block_norms
+                    f.write((block / np.clip(block_norms, 1e-8, None)[:, None]).astype(dtype).data)
+            with atomic_open(data_dir / EMBEDDING_NORMS_FILE, "wb") as f:
+                np.save(f, norms)
+            record_bytes((data_dir / EMBEDDING_STORE_FILE).stat().st_size + norms.nbytes)
+            write_json(data_dir / EMBEDDING_STORE_META_FILE, {
+                "n": n,
+                "dim": dim,
+                "dtype": np.dtype(dtype).name,
+                "model": model,
+                "model_hash": model_hash(model),
+                "normalized": "L2, norms < 1e-8 clamped; raw = vectors * norms[:, None]",
+                "vectors": EMBEDDING_STORE_FILE,
+                "norms": EMBEDDING_NORMS_FILE,
+                "source": _fingerprint(source) if source else None,
+            })
+        return cls.open(data_dir, model)
+
+    @classmethod
+    def open(cls, data_dir: Path, model: str = EMBEDDING_MODEL) -> "EmbeddingStore":
+        """Memory-map an existing store; refuses one built from another model."""
+        meta_path = data_dir / EMBEDDING_STORE_META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"{meta_path} not found; run step 2 first")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["model_hash"] != model_hash(model):
+            raise ValueError(f"Embedding store was built with {meta['model']!r}, not {model!r}; "
+                             "re-run step 2")
+        vectors = np.load(data_dir / meta["vectors"], mmap_mode="r")
+        norms = np.load(data_dir / meta["norms"], mmap_mode="r")
+        return cls(vectors, norms, meta)
+
+    @classmethod
+    def ensure(cls, data_dir: Path, model: str = EMBEDDING_MODEL,
+               dtype: str = EMBEDDING_STORE_DTYPE) -> "EmbeddingStore":
+        """Open the store, (re)building it from embeddings.npy if missing or stale."""
+        source = data_dir / EMBEDDINGS_FILE
+        meta_path = data_dir / EMBEDDING_STORE_META_FILE
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            fresh = (meta["model_hash"] == model_hash(model)
+                     and meta["dtype"] == np.dtype(dtype).name
+                     and (not source.exists() or meta["source"] == _fingerprint(source)))
+            if fresh:
+                return cls.open(data_dir, model)
+        if not source.exists():
+            raise FileNotFoundError(f"{source} not found; run step 2 first")
+        print(f"  Building {np.dtype(dtype).name} embedding store from {source}...")
+        return cls.build(np.load(source, mmap_mode="r"), data_dir, model, dtype, source)
+
+    # --- float32 access -------------------------------------------------------
+
+    def rows(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """Unit rows [start, end) as float32: a view of the map when the store is float32."""
+        return np.asarray(self.vectors[start:end], dtype=np.float32)
+
+    def blocks(self, block_rows: int = EMBEDDING_BLOCK_ROWS):
+        """Yield (start, float32 rows) over the whole store."""
+        for start in range(0, len(self), block_rows):
+            yield start, self.rows(start, start + block_rows)
+
+    def similarities(self, queries: np.ndarray, block_rows: int = EMBEDDING_BLOCK_ROWS) -> np.ndarray:
+        """Cosine similarity of unit ``queries`` (q, dim) against every row, (q, n) float32."""
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start, block in self.blocks(block_rows):
+            np.matmul(queries, block.T, out=out[:, start:start + len(block)])
+        return out
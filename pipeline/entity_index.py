@@ -0,0 +1,174 @@
+"""
+Entity mention index: entity → sorted verse IDs, plus book and chapter
+histograms, so neighbourhood and timeline views are lookups rather than a
+re-run of entity extraction.
+
+Built by step 3 from the (verse_id, entity, type) mentions and saved in the
+same raw-binary-plus-JSON-manifest layout as the lexical index:
+
+  entity_index.bin    little-endian uint32 sections, offsets in the manifest
+    postings         verse IDs (sorted, unique) grouped by entity
+    offsets          n_entities + 1 start positions into postings
+    book_hist        n_entities × n_books mention-verse counts
+    chapter_offsets  n_entities + 1 start positions into chapter_ids/counts
+    chapter_ids      chapter indices (into "chapters" in the meta), sorted
+    chapter_counts   mention-verse count per listed chapter
+  entity_meta.json    entities (sorted), types, chapters, section table
+
+Entities are sorted, so the browser can binary-search names; Python
+callers use EntityIndex.load(data_dir).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .centroids import chapter_ranges
+from .config import BOOKS
+
+ENTITY_INDEX_FILE = "entity_index.bin"
+ENTITY_META_FILE = "entity_meta.json"
+
+_SECTIONS = ("postings", "offsets", "book_hist", "chapter_offsets", "chapter_ids", "chapter_counts")
+
+
+class EntityIndex:
+    def __init__(self, entities: list[str], types: list[str], chapters: list[list[int]],
+                 postings: np.ndarray, offsets: np.ndarray, book_hist: np.ndarray,
+                 chapter_offsets: np.ndarray, chapter_ids: np.ndarray,
+                 chapter_counts: np.ndarray, n_verses: int):
+        self.entities = entities
+        self.types = types
+        self.chapters = chapters          # [book_num, chapter] per chapter index
+        self.postings = postings
+        self.offsets = offsets
+        self.book_hist = book_hist
+        self.chapter_offsets = chapter_offsets
+        self.chapter_ids = chapter_ids
+        self.chapter_counts = chapter_counts
+        self.n_verses = n_verses
+        self._entity_id = {e: i for i, e in enumerate(entities)}
+
+    @classmethod
+    def build(cls, mentions: list[tuple], verses: list[dict]) -> "EntityIndex":
+        """``mentions`` are (verse_id, entity, type) tuples from extract_entities."""
+        n_verses = len(verses)
+        entity_type = {}
+        for _vid, ent, etype in mentions:
+            entity_type[ent] = etype  # last wins, as in graph.json
+        entities = sorted(entity_type)
+        eid = {e: i for i, e in enumerate(entities)}
+        n_entities = len(entities)
+
+        ent = np.fromiter((eid[m[1]] for m in mentions), dtype=np.int64, count=len(mentions))
+        vid = np.fromiter((m[0] for m in mentions), dtype=np.int64, count=len(mentions))
+        pairs = np.unique(ent * n_verses + vid)  # one posting per entity and verse
+        pair_ent = pairs // n_verses
+        verse_ids = pairs % n_verses
+        offsets = np.zeros(n_entities + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_ent, minlength=n_entities), out=offsets[1:])
+
+        book_index = {b["name"]: i for i, b in enumerate(BOOKS)}
+        book_of = np.fromiter((book_index[v["book"]] for v in verses), dtype=np.int64,
+                              count=n_verses)
+        n_books = len(BOOKS)
+        book_hist = np.bincount(pair_ent * n_books + book_of[verse_ids],
+                                minlength=n_entities * n_books).reshape(n_entities, n_books)
+
+        chapter_keys, starts, _ends = chapter_ranges(verses)
+        chapter_of = np.searchsorted(starts, verse_ids, side="right") - 1
+        ch_pairs, ch_counts = np.unique(pair_ent * len(starts) + chapter_of, return_counts=True)
+        chapter_offsets = np.zeros(n_entities + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ch_pairs // len(starts), minlength=n_entities),
+                  out=chapter_offsets[1:])
+
+        return cls(entities, [entity_type[e] for e in entities], chapter_keys.tolist(),
+                   verse_ids.astype(np.uint32), offsets.astype(np.uint32),
+                   book_hist.astype(np.uint32), chapter_offsets.astype(np.uint32),
+                   (ch_pairs % len(starts)).astype(np.uint32), ch_counts.astype(np.uint32),
+                   n_verses)
+
+    def save(self, data_dir: Path) -> int:
+        sections = {}
+        pos = 0
+        with atomic_open(data_dir / ENTITY_INDEX_FILE, "wb") as f:
+            for name in _SECTIONS:
+                arr = np.ascontiguousarray(getattr(self, name), dtype="<u4")
+                f.write(arr.data)
+                sections[name] = {"offset": pos, "dtype": "uint32", "shape": list(arr.shape)}
+                pos += arr.nbytes
+        write_json(data_dir / ENTITY_META_FILE, {
+            "n_entities": len(self.entities),
+            "n_verses": self.n_verses,
+            "n_books": int(self.book_hist.shape[1]),
+            "postings": "sorted verse IDs per entity; offsets index into postings",
+            "sections": sections,
+            "entities": self.entities,
+            "types": self.types,
+            "chapters": self.chapters,
+        })
+        return pos
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "EntityIndex":
+        """Open a saved index; all arrays are read-only memory maps."""
+        with open(data_dir / ENTITY_META_FILE) as f:
+            meta = json.load(f)
+        path = data_dir / ENTITY_INDEX_FILE
+        arrays = {
+            name: np.memmap(path, dtype="<u4", mode="r", offset=sec["offset"],
+                            shape=tuple(sec["shape"]))
+            for name, sec in meta["sections"].items()
+        }
+        return cls(meta["entities"], meta["types"], meta["chapters"],
+                   *(arrays[name] for name in _SECTIONS), meta["n_verses"])
+
+    def entity_id(self, entity: str) -> int | None:
+        return self._entity_id.get(entity)
+
+    def postings_for(self, entity: str) -> np.ndarray:
+        """Sorted verse IDs mentioning ``entity``."""
+        i = self.entity_id(entity)
+        if i is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.postings[self.offsets[i]:self.offsets[i + 1]], dtype=np.int64)
+
+    def book_histogram(self, entity: str) -> np.ndarray:
+        """Mention-verse count per book (BOOKS order)."""
+        i = self.entity_id(entity)
+        return np.zeros(self.book_hist.shape[1], dtype=np.int64) if i is None \
+            else np.asarray(self.book_hist[i], dtype=np.int64)
+
+    def timeline(self, entity: str) -> tuple[np.ndarray, np.ndarray]:
+        """(chapter indices, mention-verse counts) for chapters mentioning ``entity``."""
+        i = self.entity_id(entity)
+        if i is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        s, e = int(self.chapter_offsets[i]), int(self.chapter_offsets[i + 1])
+        return (np.asarray(self.chapter_ids[s:e], dtype=np.int64),
+                np.asarray(self.chapter_counts[s:e], dtype=np.int64))
+
+    def cooccurrences(self, a: str, b: str, window: int = 0) -> np.ndarray:
+        """
+        Verse IDs mentioning ``a`` with a mention of ``b`` at most ``window``
+        verses away (0 = the same verse).  Windows run over canonical verse
+        order, so they may cross chapter boundaries.
+        """
+        pa, pb = self.postings_for(a), self.postings_for(b)
+        if not len(pa) or not len(pb):
+            return np.zeros(0, dtype=np.int64)
+        # First b at or after a - window, for every a at once (merge by bisection)
+        j = np.searchsorted(pb, pa - window, side="left")
+        hit = j < len(pb)
+        hit[hit] = pb[j[hit]] <= pa[hit] + window
+        return pa[hit]
+
+    def neighbors(self, entity: str, window: int = 0, top: int = 20) -> list[tuple[str, int]]:
+        """Entities co-occurring with ``entity`` within ``window`` verses, most frequent first."""
+        counts = [(other, len(self.cooccurrences(entity, other, window)))
+                  for other in self.entities if other != entity]
+        counts = [c for c in counts if c[1]]
+        counts.sort(key=lambda c: (-c[1], c[0]))
+        return counts[:top]
@@ -4,16 +4,19 @@ curated dictionaries, build a co-occurrence graph, and extract top TF-IDF
 concept keywords per book.
 """
 
-import json
 import math
 import re
 from collections import Counter, defaultdict
 from pathlib import Path
 
+from .artifacts import write_json
 from .config import (
     PEOPLE, PLACES, GROUPS, ENTITY_ALIASES,
     GRAPH_FILE, BOOKS, BOOK_NAME_TO_META,
 )
+from .entity_index import ENTITY_INDEX_FILE, EntityIndex
+from .graph_layout import annotate
+from .instrumentation import span
 
 
 def _find_entities_in_text(text: str, entity_list: list[str]) -> list[str]:
@@ -185,17 +188,30 @@ def _build_graph_json(
 
 def run(verses: list[dict], data_dir: Path):
     print("[3/5] Extracting entities and building graph...")
-    verse_entities, chapter_entities = _extract_all(verses)
+    with span("extract", items=len(verses)):
+        verse_entities, chapter_entities = _extract_all(verses)
     print(f"  Found {len(verse_entities)} entity mentions")
 
-    edge_counts = _build_cooccurrence(chapter_entities)
+    with span("cooccurrence", items=len(chapter_entities)):
+        edge_counts = _build_cooccurrence(chapter_entities)
     print(f"  Built {len(edge_counts)} co-occurrence edges")
 
-    concepts = _compute_tfidf_concepts(verses)
+    with span("tfidf_concepts", items=len(verses)):
+        concepts = _compute_tfidf_concepts(verses)
     graph = _build_graph_json(verse_entities, edge_counts, concepts, verses)
     print(f"  Graph: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
 
+    with span("layout", items=len(graph["nodes"])):
+        annotate(graph)
+    top = sorted(graph["nodes"], key=lambda n: -n["pagerank"])[:5]
+    print(f"  Layout + centrality computed; top PageRank: {', '.join(n['id'] for n in top)}")
+
     out_path = data_dir / GRAPH_FILE
-    with open(out_path, "w") as f:
-        json.dump(graph, f)
+    write_json(out_path, graph)
     print(f"  Graph → {out_path}")
+
+    with span("entity_index", items=len(verse_entities)):
+        index = EntityIndex.build(verse_entities, verses)
+        size = index.save(data_dir)
+    print(f"  Entity index: {len(index.entities)} entities, {len(index.postings)} postings "
+          f"→ {data_dir / ENTITY_INDEX_FILE} ({size / 1e6:.1f} MB)")
@@ -3,20 +3,148 @@ Download and normalize the KJV Bible from a public-domain GitHub source.
 Produces a flat list of verse records with book metadata attached.
 """
 
+import http.client
 import json
+import random
 import re
+import threading
+import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from .artifacts import write_json
 from .config import BOOKS, KJV_SOURCE_BASE, RAW_DATA_FILE, VERSES_FILE
+from .instrumentation import propagate
+
+BOOK_CACHE_DIR = "kjv_books"
+FETCH_WORKERS = 16
+FETCH_RETRIES = 4
+FETCH_TIMEOUT = 30
+FETCH_BACKOFF = 0.5
+_RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
 
 def _book_filename(name: str) -> str:
     """aruljohn/Bible-kjv strips all spaces from filenames."""
     return name.replace(" ", "") + ".json"
 
 
-def fetch_kjv(data_dir: Path) -> list[dict]:
+class _Connections(threading.local):
+    """
+    One keep-alive connection per (thread, host), reused across books.
+    Every open connection is also tracked across threads so close_all()
+    can shut them down once the worker pool has finished.
+    """
+
+    _open: set = set()  # class attributes are shared by all threads
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.conns = {}
+
+    def get(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        key = (scheme, netloc)
+        if key not in self.conns:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = self.conns[key] = cls(netloc, timeout=FETCH_TIMEOUT)
+            with self._lock:
+                self._open.add(conn)
+        return self.conns[key]
+
+    def drop(self, scheme: str, netloc: str):
+        conn = self.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            with self._lock:
+                self._open.discard(conn)
+            conn.close()
+
+    def close_all(self):
+        """Close every thread's connections; call once no worker is using them."""
+        with self._lock:
+            conns = list(self._open)
+            self._open.clear()
+        for conn in conns:
+            conn.close()
+        self.conns = {}
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._open)
+
+
+_connections = _Connections()
+
+
+def _http_get(url: str, headers: dict) -> tuple[int, dict, bytes]:
+    parts = urllib.parse.urlsplit(url)
+    conn = _connections.get(parts.scheme, parts.netloc)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    try:
+        conn.request("GET", path, headers={"User-Agent": "bible-mapped", **headers})
+        resp = conn.getresponse()
+        body = resp.read()
+    except (OSError, http.client.HTTPException):
+        _connections.drop(parts.scheme, parts.netloc)
+        raise
+    if resp.getheader("Connection", "").lower() == "close":
+        _connections.drop(parts.scheme, parts.netloc)
+    return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+
+def _fetch_book(base_url: str, book: dict, cache_dir: Path) -> dict:
+    """
+    Fetch one book, revalidating any cached copy with ETag/If-Modified-Since.
+    Transient failures are retried with exponential backoff; anything else
+    raises so the caller can refuse to build a partial corpus.
+    """
+    fname = _book_filename(book["name"])
+    url = f"{base_url}/{urllib.parse.quote(fname)}"
+    cache_path = cache_dir / fname
+    meta_path = cache_dir / f"{fname}.meta.json"
+
+    headers = {}
+    if cache_path.exists() and meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    last_error = None
+    for attempt in range(FETCH_RETRIES + 1):
+        if attempt:
+            time.sleep(FETCH_BACKOFF * 2 ** (attempt - 1) * (1 + random.random()))
+        try:
+            status, resp_headers, body = _http_get(url, headers)
+        except (OSError, http.client.HTTPException) as e:
+            last_error = e
+            continue
+
+        if status == 304:
+            with open(cache_path) as f:
+                return json.load(f)
+        if status == 200:
+            book_data = json.loads(body.decode("utf-8"))
+            if not book_data.get("chapters"):
+                raise RuntimeError(f"{url} returned no chapters")
+            write_json(cache_path, book_data)
+            write_json(meta_path, {
+                "etag": resp_headers.get("etag"),
+                "last_modified": resp_headers.get("last-modified"),
+            })
+            return book_data
+        last_error = RuntimeError(f"HTTP {status} for {url}")
+        if status not in _RETRY_STATUSES:
+            break
+
+    raise RuntimeError(f"Failed to fetch {book['name']} after "
+                       f"{attempt + 1} attempt(s): {last_error}")
+
+
+def fetch_kjv(data_dir: Path, base_url: str = KJV_SOURCE_BASE,
+              workers: int = FETCH_WORKERS) -> list[dict]:
     """Download all 66 books from the aruljohn/Bible-kjv repository."""
     data_dir.mkdir(parents=True, exist_ok=True)
     raw_path = data_dir / RAW_DATA_FILE
@@ -26,20 +154,34 @@ def fetch_kjv(data_dir: Path) -> list[dict]:
         with open(raw_path) as f:
             return json.load(f)
 
-    all_verses = []
-    for book in BOOKS:
-        fname = _book_filename(book["name"])
-        url = f"{KJV_SOURCE_BASE}/{fname}"
-        print(f"  Fetching {book['name']}...")
+    cache_dir = data_dir / BOOK_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    print(f"  Fetching {len(BOOKS)} books ({workers} parallel connections)...")
+
+    def fetch(book):
         try:
-            with urllib.request.urlopen(url) as resp:
-                book_data = json.loads(resp.read().decode("utf-8"))
+            return _fetch_book(base_url, book, cache_dir), None
         except Exception as e:
-            print(f"    [error] Failed to fetch {url}: {e}")
-            continue
+            return None, e
 
-        chapters = book_data.get("chapters", [])
-        for chapter_obj in chapters:
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(propagate(fetch), BOOKS))
+    finally:
+        _connections.close_all()  # the pool has shut down; nothing else reuses them
+
+    failures = [(b["name"], err) for b, (_, err) in zip(BOOKS, results) if err]
+    if failures:
+        for name, err in failures:
+            print(f"    [error] {name}: {err}")
+        raise RuntimeError(
+            f"{len(failures)} of {len(BOOKS)} books failed to download; "
+            "refusing to write an incomplete corpus"
+        )
+
+    all_verses = []
+    for book, (book_data, _) in zip(BOOKS, results):
+        for chapter_obj in book_data.get("chapters", []):
             ch_num = int(chapter_obj["chapter"])
             for verse in chapter_obj.get("verses", []):
                 all_verses.append({
@@ -53,8 +195,7 @@ def fetch_kjv(data_dir: Path) -> list[dict]:
                     "genre": book["genre"],
                 })
 
-    with open(raw_path, "w") as f:
-        json.dump(all_verses, f)
+    write_json(raw_path, all_verses)
     print(f"  Saved {len(all_verses)} verses to {raw_path}")
     return all_verses
 
@@ -67,8 +208,7 @@ def normalize(verses: list[dict], data_dir: Path) -> list[dict]:
         v["text"] = re.sub(r"\s+", " ", v["text"]).strip()
 
     out_path = data_dir / VERSES_FILE
-    with open(out_path, "w") as f:
-        json.dump(verses, f)
+    write_json(out_path, verses)
     print(f"  Normalized {len(verses)} verses → {out_path}")
     return verses
 
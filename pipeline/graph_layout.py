@@ -0,0 +1,232 @@
+"""
+Offline layout and centrality for the entity network (graph.json).
+
+The layout is a multilevel Fruchterman-Reingold force layout in NumPy:
+
+  1. Coarsen: repeatedly merge heavy-edge matchings (visited in seeded
+     random order) until the graph has at most LAYOUT_COARSEST nodes or
+     stops shrinking.  Merged nodes carry their summed mass.
+  2. Lay out the coarsest graph with the full iteration budget.
+  3. Prolong level by level (each node starts at its parent's position
+     plus seeded jitter) and refine with a shorter, cooler schedule.
+
+Repulsion between all pairs is computed exactly in row chunks, which
+stays cheap because only the last few refinement passes run on the full
+graph.  A weak pull toward the origin keeps disconnected components in
+frame; isolated nodes (which the page never draws) are parked on a ring
+just outside it.  The same seed always gives the same coordinates.
+
+Every node also gets degree, weighted degree, PageRank and betweenness
+(Brandes over hop distance; sampled pivots on large graphs), so the
+network page can size and rank nodes without simulating anything.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .config import (
+    GRAPH_BETWEENNESS_SAMPLES, GRAPH_LAYOUT_ITERATIONS, GRAPH_LAYOUT_SEED,
+    GRAPH_PAGERANK_DAMPING,
+)
+
+LAYOUT_COARSEST = 30
+LAYOUT_GRAVITY = 0.05
+LAYOUT_SCALE = 500.0  # connected nodes lie in [-LAYOUT_SCALE, LAYOUT_SCALE]
+ISOLATED_RING = 1.1  # isolated nodes sit on a circle of LAYOUT_SCALE × this
+REPULSION_CHUNK = 1 << 22  # pair distances evaluated per chunk
+
+
+def _edge_arrays(nodes: list[dict], edges: list[dict]):
+    index = {n["id"]: i for i, n in enumerate(nodes)}
+    src = np.array([index[e["source"]] for e in edges], dtype=np.int64)
+    dst = np.array([index[e["target"]] for e in edges], dtype=np.int64)
+    weight = np.array([e["weight"] for e in edges], dtype=np.float64)
+    return src, dst, weight
+
+
+def _coarsen(n: int, src, dst, weight, mass, rng):
+    """Heavy-edge matching; returns (fine→coarse map, n_coarse, coarse edges, mass)."""
+    matched = np.full(n, -1, dtype=np.int64)
+    # Visit edges heaviest first, breaking weight ties by a seeded shuffle
+    order = np.lexsort((rng.permutation(len(weight)), -weight))
+    parent = np.arange(n)
+    for e in order:
+        a, b = src[e], dst[e]
+        if matched[a] < 0 and matched[b] < 0 and a != b:
+            matched[a] = matched[b] = 1
+            parent[b] = a
+    roots, coarse = np.unique(parent, return_inverse=True)
+    cs, cd = coarse[src], coarse[dst]
+    keep = cs != cd
+    lo, hi = np.minimum(cs[keep], cd[keep]), np.maximum(cs[keep], cd[keep])
+    pairs, inv = np.unique(np.stack([lo, hi], axis=1), axis=0, return_inverse=True)
+    cw = np.bincount(inv.ravel(), weights=weight[keep], minlength=len(pairs))
+    cmass = np.bincount(coarse, weights=mass, minlength=len(roots))
+    return coarse, len(roots), pairs[:, 0], pairs[:, 1], cw, cmass
+
+
+def _repulsion(pos, mass, k2):
+    """Exact pairwise repulsion k²·m_j / d, chunked over rows."""
+    n = len(pos)
+    disp = np.zeros_like(pos)
+    rows = max(1, REPULSION_CHUNK // max(n, 1))
+    for start in range(0, n, rows):
+        delta = pos[start:start + rows, None, :] - pos[None, :, :]
+        d2 = np.einsum("ijk,ijk->ij", delta, delta)
+        d2[d2 < 1e-9] = np.inf  # self, and exact overlaps (jitter resolves those)
+        disp[start:start + rows] = np.einsum("ij,ijk->ik", k2 * mass[None, :] / d2, delta)
+    return disp
+
+
+def _force_layout(pos, src, dst, weight, mass, iterations, t0):
+    n = len(pos)
+    if n < 2:
+        return pos
+    k2 = 1.0  # ideal edge length 1; area grows with n
+    strength = np.log1p(weight)
+    for it in range(iterations):
+        disp = _repulsion(pos, mass, k2)
+        delta = pos[dst] - pos[src]
+        dist = np.linalg.norm(delta, axis=1, keepdims=True)
+        pull = delta * (strength[:, None] * dist)  # d² / k along the edge
+        np.add.at(disp, src, pull)
+        np.add.at(disp, dst, -pull)
+        disp -= LAYOUT_GRAVITY * mass[:, None] * pos
+        length = np.linalg.norm(disp, axis=1, keepdims=True)
+        temp = t0 * (1.0 - it / iterations)
+        pos = pos + disp / np.maximum(length, 1e-9) * np.minimum(length, temp)
+    return pos
+
+
+def force_layout(n: int, src, dst, weight, iterations: int = GRAPH_LAYOUT_ITERATIONS,
+                 seed: int = GRAPH_LAYOUT_SEED) -> np.ndarray:
+    """Multilevel force layout of an undirected weighted graph; returns (n, 2)."""
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    connected = np.bincount(np.concatenate([src, dst]), minlength=n) > 0
+    pos = np.zeros((n, 2))
+    isolated = np.flatnonzero(~connected)
+    angle = 2 * np.pi * np.arange(len(isolated)) / max(len(isolated), 1)
+    pos[isolated] = LAYOUT_SCALE * ISOLATED_RING * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+    if connected.any():
+        remap = np.cumsum(connected) - 1
+        pos[connected] = _multilevel(int(connected.sum()), remap[src], remap[dst],
+                                     weight, iterations, seed)
+    return pos
+
+
+def _multilevel(n, src, dst, weight, iterations, seed):
+    rng = np.random.default_rng(seed)
+    levels = []
+    mass = np.ones(n)
+    cur = (n, np.asarray(src), np.asarray(dst), np.asarray(weight, dtype=np.float64), mass)
+    while cur[0] > LAYOUT_COARSEST and len(cur[1]):
+        coarse, nc, cs, cd, cw, cm = _coarsen(*cur, rng)
+        if nc > 0.9 * cur[0]:
+            break
+        levels.append((cur, coarse))
+        cur = (nc, cs, cd, cw, cm)
+
+    nc = cur[0]
+    pos = rng.uniform(-1, 1, size=(nc, 2)) * np.sqrt(nc)
+    pos = _force_layout(pos, cur[1], cur[2], cur[3], cur[4], iterations, np.sqrt(nc) / 2)
+    refine = max(30, iterations // 4)
+    for fine, coarse in reversed(levels):
+        nf = fine[0]
+        pos = pos[coarse] * np.sqrt(nf / len(pos)) + rng.normal(scale=0.1, size=(nf, 2))
+        pos = _force_layout(pos, fine[1], fine[2], fine[3], fine[4], refine, 1.0)
+
+    pos -= pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos * (LAYOUT_SCALE / extent) if extent > 0 else pos
+
+
+def pagerank(n: int, src, dst, weight, damping: float = GRAPH_PAGERANK_DAMPING,
+             tol: float = 1e-10, max_iter: int = 200) -> np.ndarray:
+    """Weighted PageRank on the undirected graph; dangling mass spreads uniformly."""
+    if n == 0:
+        return np.zeros(0)
+    a = np.concatenate([src, dst])
+    b = np.concatenate([dst, src])
+    w = np.concatenate([weight, weight]).astype(np.float64)
+    out = np.bincount(a, weights=w, minlength=n)
+    share = w / out[a]
+    dangling = out == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = np.bincount(b, weights=rank[a] * share, minlength=n)
+        new = damping * (new + rank[dangling].sum() / n) + (1 - damping) / n
+        done = np.abs(new - rank).sum() < tol
+        rank = new
+        if done:
+            break
+    return rank
+
+
+def betweenness(n: int, src, dst, samples: int = GRAPH_BETWEENNESS_SAMPLES,
+                seed: int = GRAPH_LAYOUT_SEED) -> np.ndarray:
+    """Normalised betweenness centrality (Brandes, unweighted hops)."""
+    adj = [[] for _ in range(n)]
+    for a, b in zip(src.tolist(), dst.tolist()):
+        adj[a].append(b)
+        adj[b].append(a)
+    sources = range(n)
+    if n > samples:
+        sources = np.random.default_rng(seed).choice(n, size=samples, replace=False).tolist()
+    bc = np.zeros(n)
+    for s in sources:
+        stack, preds = [], [[] for _ in range(n)]
+        sigma = [0] * n
+        dist = [-1] * n
+        sigma[s], dist[s] = 1, 0
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            stack.append(v)
+            for w in adj[v]:
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    queue.append(w)
+                if dist[w] == dist[v] + 1:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+        delta = [0.0] * n
+        while stack:
+            w = stack.pop()
+            for v in preds[w]:
+                delta[v] += sigma[v] / sigma[w] * (1 + delta[w])
+            if w != s:
+                bc[w] += delta[w]
+    if n > samples:
+        bc *= n / samples
+    # Each undirected pair was counted from both ends
+    return bc / ((n - 1) * (n - 2)) if n > 2 else bc
+
+
+def annotate(graph: dict, iterations: int = GRAPH_LAYOUT_ITERATIONS,
+             seed: int = GRAPH_LAYOUT_SEED) -> dict:
+    """Add x, y, degree, weighted_degree, pagerank and betweenness to graph nodes."""
+    nodes, edges = graph["nodes"], graph["edges"]
+    n = len(nodes)
+    src, dst, weight = _edge_arrays(nodes, edges)
+    pos = force_layout(n, src, dst, weight, iterations, seed)
+    degree = np.bincount(np.concatenate([src, dst]), minlength=n)
+    wdegree = np.bincount(np.concatenate([src, dst]),
+                          weights=np.concatenate([weight, weight]), minlength=n)
+    pr = pagerank(n, src, dst, weight)
+    bc = betweenness(n, src, dst)
+    for i, node in enumerate(nodes):
+        node["x"] = round(float(pos[i, 0]), 2)
+        node["y"] = round(float(pos[i, 1]), 2)
+        node["degree"] = int(degree[i])
+        node["weighted_degree"] = int(wdegree[i])
+        node["pagerank"] = round(float(pr[i]), 6)
+        node["betweenness"] = round(float(bc[i]), 6)
+    graph["layout"] = {
+        "algorithm": "multilevel-fruchterman-reingold",
+        "seed": seed,
+        "iterations": iterations,
+        "extent": LAYOUT_SCALE,
+        "betweenness_samples": min(n, GRAPH_BETWEENNESS_SAMPLES),
+    }
+    return graph
@@ -0,0 +1,320 @@
+"""
+Lightweight spans for timing pipeline steps and their sub-phases.
+
+    with span("umap_fit", items=len(embeddings)):
+        coords = reducer.fit_transform(embeddings)
+
+Each span measures wall time, peak RSS (VmHWM, reset on entry so nested
+phases get their own high-water mark), items/sec and the artifact bytes
+written inside it (artifacts.py reports every file it finishes).  Spans
+nest; a parent's peak and bytes include its children's.
+
+The open span lives in a ContextVar, so each thread has its own stack.
+Thread-pool tasks wrapped with propagate() (or submitted via submit())
+run under the span that was open when they were created; their spans
+nest there and their bytes count towards it.  Only the main thread
+resets the peak-RSS mark (it is process-wide), so spans closed in worker
+threads report the process peak since their step began.
+
+Spans cost two /proc reads and are always safe to leave in place: nothing
+is recorded until a Tracer is started (run_pipeline does this), which
+appends one JSON line per finished span to the trace file and can print
+a summary table aggregated by span path.
+
+With ``profile_dir`` set, top-level step spans are also wrapped in
+cProfile and tracemalloc and write ``<step>.prof`` / ``<step>.txt``.
+
+import_report() runs ``python -X importtime`` on a list of modules in a
+subprocess (so nothing already imported here hides the cost) and ranks
+what they pull in by cumulative import time.
+"""
+
+import contextvars
+import functools
+import io
+import json
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 15
+IMPORT_REPORT_TOP = 15
+
+
+def reset_peak_rss():
+    """Reset VmHWM so the next peak_rss_mb() covers only what follows."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size; the process-lifetime maximum where VmHWM is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Span:
+    def __init__(self, name: str, items: int | None, attrs: dict, parent: "Span | None"):
+        self.name = name
+        self.items = items
+        self.attrs = attrs
+        self.parent = parent
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.depth = parent.depth + 1 if parent else 0
+        self.bytes = 0
+        self.peak_mb = 0.0
+        self.start = 0.0
+        self.duration = 0.0
+
+    def record(self) -> dict:
+        rec = {
+            "span": self.path,
+            "name": self.name,
+            "depth": self.depth,
+            "start": round(self.start, 6),
+            "duration_s": round(self.duration, 6),
+            "peak_rss_mb": round(self.peak_mb, 1),
+        }
+        if self.items is not None:
+            rec["items"] = self.items
+            rec["items_per_s"] = round(self.items / self.duration, 1) if self.duration else None
+        if self.bytes:
+            rec["bytes"] = self.bytes
+        if self.attrs:
+            rec["attrs"] = self.attrs
+        return rec
+
+
+class Tracer:
+    """Collects finished spans; writes them to a JSONL trace as they close."""
+
+    def __init__(self, trace_path: Path | None = None, profile_dir: Path | None = None):
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.records: list[dict] = []
+        self.t0 = time.perf_counter()
+        self._trace = None
+        if self.trace_path:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._trace = open(self.trace_path, "w", encoding="utf-8")
+        if self.profile_dir:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    def emit(self, rec: dict):
+        with _lock:
+            self.records.append(rec)
+            if self._trace:
+                self._trace.write(json.dumps(rec) + "\n")
+                self._trace.flush()
+
+    def close(self):
+        if self._trace:
+            self._trace.close()
+            self._trace = None
+
+    def summary(self) -> list[dict]:
+        """One row per span path (in first-seen order) with totals over repeats."""
+        rows = {}
+        for rec in self.records:
+            row = rows.setdefault(rec["span"], {
+                "span": rec["span"], "name": rec["name"], "depth": rec["depth"],
+                "calls": 0, "duration_s": 0.0, "peak_rss_mb": 0.0, "items": None, "bytes": 0,
+            })
+            row["calls"] += 1
+            row["duration_s"] += rec["duration_s"]
+            row["peak_rss_mb"] = max(row["peak_rss_mb"], rec["peak_rss_mb"])
+            row["bytes"] += rec.get("bytes", 0)
+            if "items" in rec:
+                row["items"] = (row["items"] or 0) + rec["items"]
+        # Children close before their parents; show parents first
+        order = {}
+        for rec in sorted(self.records, key=lambda r: r["start"]):
+            order.setdefault(rec["span"], len(order))
+        return sorted(rows.values(), key=lambda r: order[r["span"]])
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        width = max(len("  " * r["depth"] + r["name"]) for r in rows) + 2
+        print(f"\n  {'span':<{width}} {'calls':>5} {'wall s':>9} {'peak MB':>8} "
+              f"{'items/s':>10} {'MB out':>8}")
+        for r in rows:
+            label = "  " * r["depth"] + r["name"]
+            rate = (f"{r['items'] / r['duration_s']:>10.0f}"
+                    if r["items"] and r["duration_s"] else f"{'':>10}")
+            out = f"{r['bytes'] / 1e6:>8.1f}" if r["bytes"] else f"{'':>8}"
+            print(f"  {label:<{width}} {r['calls']:>5} {r['duration_s']:>9.2f} "
+                  f"{r['peak_rss_mb']:>8.0f} {rate} {out}")
+
+
+_tracer: Tracer | None = None
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("span", default=None)
+_lock = threading.Lock()  # guards span byte counters and the trace file
+
+
+def start(trace_path: Path | None = None, profile_dir: Path | None = None) -> Tracer:
+    """Start recording spans (replacing any active tracer)."""
+    global _tracer
+    stop()
+    _tracer = Tracer(trace_path, profile_dir)
+    return _tracer
+
+
+def stop() -> Tracer | None:
+    """Stop recording; returns the tracer so its summary can still be printed."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer:
+        tracer.close()
+    return tracer
+
+
+def record_bytes(n: int):
+    """Attribute ``n`` artifact bytes to the innermost open span of this context."""
+    s = _current.get()
+    if _tracer and s is not None:
+        with _lock:
+            s.bytes += n
+
+
+def propagate(fn):
+    """
+    Wrap ``fn`` to run under the span open *now*, e.g. for thread-pool
+    tasks, which otherwise start with no open span.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)  # a Context can't be entered twice at once
+
+    return run
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit() whose task nests under the currently open span."""
+    return pool.submit(propagate(fn), *args, **kwargs)
+
+
+@contextmanager
+def _profiled(name: str, profile_dir: Path):
+    import cProfile
+    import tracemalloc
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+        _write_profile(name, profile_dir, profiler, snapshot, traced_peak)
+
+
+def _write_profile(name, profile_dir, profiler, snapshot, traced_peak):
+    import pstats
+
+    stem = name.replace("/", "_")
+    profiler.dump_stats(profile_dir / f"{stem}.prof")
+    buf = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buf).strip_dirs().sort_stats("cumulative")
+    buf.write(f"# {name}: cProfile, top {PROFILE_TOP_FUNCTIONS} by cumulative time\n")
+    stats.print_stats(PROFILE_TOP_FUNCTIONS)
+    buf.write(f"\n# {name}: tracemalloc, peak traced {traced_peak / 1e6:.1f} MB; "
+              f"top {PROFILE_TOP_ALLOCATIONS} live allocation sites at exit\n")
+    for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+        buf.write(f"{stat.size / 1e6:10.2f} MB {stat.count:>9} blocks  {stat.traceback[0]}\n")
+    (profile_dir / f"{stem}.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+
+@contextmanager
+def span(name: str, items: int | None = None, **attrs):
+    """
+    Time a phase.  ``items`` (settable later via the yielded span's
+    ``.items``) gives items/sec; keyword ``attrs`` are copied to the trace.
+    """
+    parent = _current.get()
+    s = Span(name, items, attrs, parent)
+    if _tracer is None:
+        yield s
+        return
+
+    main = threading.current_thread() is threading.main_thread()
+    if parent:
+        parent.peak_mb = max(parent.peak_mb, peak_rss_mb())
+    if main:
+        reset_peak_rss()
+    profile = _tracer.profile_dir if parent is None and main else None
+    token = _current.set(s)
+    s.start = time.perf_counter() - _tracer.t0
+    t0 = time.perf_counter()
+    try:
+        if profile:
+            with _profiled(name, profile):
+                yield s
+        else:
+            yield s
+    finally:
+        s.duration = time.perf_counter() - t0
+        s.peak_mb = max(s.peak_mb, peak_rss_mb())
+        _current.reset(token)
+        if parent:
+            with _lock:
+                parent.peak_mb = max(parent.peak_mb, s.peak_mb)
+                parent.bytes += s.bytes
+        if _tracer:
+            _tracer.emit(s.record())
+
+
+def import_report(modules: list[str]) -> list[tuple[str, float, float]]:
+    """
+    (module, self ms, cumulative ms) for everything importing ``modules``
+    loads in a fresh interpreter, slowest cumulative first.
+    """
+    import subprocess
+
+    code = "; ".join(f"import {m}" for m in dict.fromkeys(modules))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"importing {', '.join(modules)} failed:\n{proc.stderr.strip()[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda r: -r[2])
+    return rows
+
+
+def print_import_report(modules: list[str], top: int = IMPORT_REPORT_TOP):
+    rows = import_report(modules)
+    total = sum(r[1] for r in rows)
+    print(f"[imports] {', '.join(dict.fromkeys(modules))}: {len(rows)} modules, {total:.0f} ms")
+    print(f"  {'module':<40} {'self ms':>9} {'cumul ms':>9}")
+    for name, self_ms, cumulative_ms in rows[:top]:
+        print(f"  {name:<40} {self_ms:>9.1f} {cumulative_ms:>9.1f}")
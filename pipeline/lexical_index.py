@@ -0,0 +1,168 @@
+"""
+Corpus-wide inverted index: term → sorted verse IDs, plus frequencies.
+
+Built once from the tokenized corpus (text_metrics.TokenizedCorpus) and
+saved in the same raw-binary-plus-JSON-manifest layout as the search
+vectors, so both Python (np.memmap) and the browser (ArrayBuffer views)
+can use it without parsing:
+
+  lexicon_index.bin   little-endian sections, offsets in the manifest
+    postings     uint32  delta-encoded verse IDs, grouped by term
+    offsets      uint32  n_terms + 1 start positions into postings
+    freq         uint32  total token count per term
+    book_freq    uint32  n_terms × n_books token counts
+  lexicon_meta.json   terms (sorted), section table, corpus sizes
+
+Terms are sorted, so lookup is a binary search; a posting list is decoded
+with one cumsum over its slice.
+"""
+
+import bisect
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .text_metrics import TokenizedCorpus
+
+LEXICON_INDEX_FILE = "lexicon_index.bin"
+LEXICON_META_FILE = "lexicon_meta.json"
+
+_SECTIONS = ("postings", "offsets", "freq", "book_freq")
+
+
+class LexicalIndex:
+    def __init__(self, terms: list[str], postings: np.ndarray, offsets: np.ndarray,
+                 freq: np.ndarray, book_freq: np.ndarray, n_verses: int):
+        self.terms = terms
+        self.postings = postings      # delta-encoded
+        self.offsets = offsets
+        self.freq = freq
+        self.book_freq = book_freq
+        self.n_verses = n_verses
+        self._term_id = {t: i for i, t in enumerate(terms)}
+
+    @classmethod
+    def build(cls, corpus: TokenizedCorpus, book_labels: np.ndarray, n_books: int) -> "LexicalIndex":
+        """``book_labels[i]`` is verse i's book index (0..n_books-1)."""
+        n_verses = corpus.n_verses
+        order = sorted(range(len(corpus.vocab)), key=corpus.vocab.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        terms = [corpus.vocab[i] for i in order]
+
+        term = rank[corpus.token_ids]
+        verse = np.repeat(np.arange(n_verses, dtype=np.int64), np.diff(corpus.verse_offsets))
+        book = np.asarray(book_labels, dtype=np.int64)[verse]
+        n_terms = len(terms)
+
+        freq = np.bincount(term, minlength=n_terms)
+        book_freq = np.bincount(term * n_books + book, minlength=n_terms * n_books)
+
+        pairs = np.unique(term * n_verses + verse)
+        pair_term = pairs // n_verses
+        verse_ids = pairs % n_verses
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_term, minlength=n_terms), out=offsets[1:])
+
+        deltas = verse_ids.copy()
+        deltas[1:] -= verse_ids[:-1]
+        firsts = offsets[:-1][offsets[:-1] < offsets[1:]]
+        deltas[firsts] = verse_ids[firsts]
+
+        return cls(terms, deltas.astype(np.uint32), offsets.astype(np.uint32),
+                   freq.astype(np.uint32),
+                   book_freq.reshape(n_terms, n_books).astype(np.uint32), n_verses)
+
+    def save(self, data_dir: Path) -> int:
+        sections = {}
+        pos = 0
+        with atomic_open(data_dir / LEXICON_INDEX_FILE, "wb") as f:
+            for name in _SECTIONS:
+                arr = np.ascontiguousarray(getattr(self, name), dtype="<u4")
+                f.write(arr.data)
+                sections[name] = {"offset": pos, "dtype": "uint32", "shape": list(arr.shape)}
+                pos += arr.nbytes
+        write_json(data_dir / LEXICON_META_FILE, {
+            "n_terms": len(self.terms),
+            "n_verses": self.n_verses,
+            "n_books": int(self.book_freq.shape[1]),
+            "postings": "delta-encoded verse IDs per term; offsets index into postings",
+            "sections": sections,
+            "terms": self.terms,
+        })
+        return pos
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "LexicalIndex":
+        """Open a saved index; all arrays are read-only memory maps."""
+        with open(data_dir / LEXICON_META_FILE) as f:
+            meta = json.load(f)
+        path = data_dir / LEXICON_INDEX_FILE
+        arrays = {
+            name: np.memmap(path, dtype="<u4", mode="r", offset=sec["offset"],
+                            shape=tuple(sec["shape"]))
+            for name, sec in meta["sections"].items()
+        }
+        return cls(meta["terms"], arrays["postings"], arrays["offsets"],
+                   arrays["freq"], arrays["book_freq"], meta["n_verses"])
+
+    def term_id(self, term: str) -> int | None:
+        return self._term_id.get(term.lower())
+
+    def prefix(self, prefix: str) -> list[str]:
+        """All terms starting with ``prefix`` (binary search over sorted terms)."""
+        prefix = prefix.lower()
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\uffff")
+        return self.terms[lo:hi]
+
+    def postings_for(self, term: str) -> np.ndarray:
+        """Sorted verse IDs containing ``term``."""
+        tid = self.term_id(term)
+        if tid is None:
+            return np.zeros(0, dtype=np.int64)
+        s, e = int(self.offsets[tid]), int(self.offsets[tid + 1])
+        return np.cumsum(self.postings[s:e], dtype=np.int64)
+
+    def frequency(self, term: str) -> int:
+        tid = self.term_id(term)
+        return 0 if tid is None else int(self.freq[tid])
+
+    def book_frequency(self, term: str) -> np.ndarray:
+        tid = self.term_id(term)
+        return np.zeros(self.book_freq.shape[1], dtype=np.int64) if tid is None \
+            else np.asarray(self.book_freq[tid], dtype=np.int64)
+
+    def verse_frequency(self) -> np.ndarray:
+        """Number of verses containing each term."""
+        return np.diff(np.asarray(self.offsets, dtype=np.int64))
+
+    def legomena(self, count: int = 1, by: str = "tokens") -> np.ndarray:
+        """
+        Term IDs occurring exactly ``count`` times — as tokens (classic
+        hapax/dis legomena) or, with by="verses", in exactly that many verses.
+        """
+        if by == "tokens":
+            counts = self.freq
+        elif by == "verses":
+            counts = self.verse_frequency()
+        else:
+            raise ValueError(f"Unknown legomena count {by!r}; available: tokens, verses")
+        return np.flatnonzero(np.asarray(counts) == count)
+
+    def search(self, query: str, mode: str = "and") -> np.ndarray:
+        """Verse IDs matching all (mode="and") or any (mode="or") query words."""
+        words = re.findall(r"[a-zA-Z]+", query.lower())
+        if not words:
+            return np.zeros(0, dtype=np.int64)
+        lists = sorted((self.postings_for(w) for w in words), key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if mode == "and":
+                result = np.intersect1d(result, other, assume_unique=True)
+            else:
+                result = np.union1d(result, other)
+        return result
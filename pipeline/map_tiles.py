@@ -0,0 +1,255 @@
+"""
+Quadtree tile pyramid over the 2D UMAP coordinates.
+
+The map's bounding square is split into 2^z × 2^z tiles at zoom z.  Every
+non-empty tile lists the IDs of the points inside it, most important first
+(importance = how many other verses list the point among their nearest
+neighbours, i.e. kNN in-degree).  Tiles below the leaf zoom keep only their
+top MAP_TILE_CAPACITY points plus the total count; the leaf zoom is the
+first at which no tile exceeds the capacity (or MAP_TILE_MAX_ZOOM) and
+keeps every point, so it is a complete spatial index.  Coarse tiles also
+carry a MAP_DENSITY_GRID² count grid for drawing density at low zoom.
+
+Tiles are identified by a quadkey, 1 << 2z | morton(x, y): keys are
+unique across zooms, sort by zoom first, and a tile's children are
+key << 2 | 0..3.  Layout (same binary-plus-manifest scheme as the
+lexical and passage indexes):
+
+  map_tiles.bin    little-endian sections, offsets in map_tiles.json
+    coords        float32  n × 2 UMAP coordinates
+    rank          uint32   importance rank per point (0 = most important)
+    tile_keys     uint32   sorted quadkeys of non-empty tiles
+    tile_offsets  uint32   n_tiles + 1 start positions into points
+    tile_counts   uint32   points inside each tile (before capping)
+    points        uint32   point IDs per tile, most important first
+    density       uint32   n_density_tiles × grid × grid counts, for the
+                           first n_density_tiles tiles (zooms < MAP_DENSITY_ZOOMS)
+  map_tiles.json   bounds, zooms, capacity, section table
+
+MapTiles is the reference reader: viewport and radius queries touch only
+the tiles overlapping the query (binary search per tile key) instead of
+every point.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .config import MAP_DENSITY_GRID, MAP_DENSITY_ZOOMS, MAP_TILE_CAPACITY, MAP_TILE_MAX_ZOOM
+from .instrumentation import record_bytes
+
+MAP_TILES_FILE = "map_tiles.bin"
+MAP_TILES_META_FILE = "map_tiles.json"
+
+_SECTIONS = {
+    "coords": "<f4",
+    "rank": "<u4",
+    "tile_keys": "<u4",
+    "tile_offsets": "<u4",
+    "tile_counts": "<u4",
+    "points": "<u4",
+    "density": "<u4",
+}
+
+
+def _morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Interleave the bits of x (even) and y (odd)."""
+    def spread(v):
+        v = np.asarray(v, dtype=np.uint64) & 0xFFFF
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        return (v | (v << 1)) & 0x55555555
+    return spread(x) | (spread(y) << np.uint64(1))
+
+
+def quadkey(z: int, x, y) -> np.ndarray:
+    return (np.uint64(1) << np.uint64(2 * z)) | _morton(x, y)
+
+
+def _bounds(coords: np.ndarray) -> list[float]:
+    """Square bounds [x0, y0, size] enclosing every point."""
+    lo = coords.min(axis=0)
+    size = float((coords.max(axis=0) - lo).max()) or 1.0
+    return [float(lo[0]), float(lo[1]), size * (1 + 1e-6)]
+
+
+class MapTiles:
+    def __init__(self, bounds, zooms: int, coords, rank, tile_keys, tile_offsets, tile_counts,
+                 points, density, capacity: int, grid: int):
+        self.bounds = bounds          # [x0, y0, size]
+        self.zooms = zooms            # zoom levels 0 .. zooms - 1
+        self.coords = coords
+        self.rank = rank
+        self.tile_keys = tile_keys
+        self.tile_offsets = tile_offsets
+        self.tile_counts = tile_counts
+        self.points = points
+        self.density = density
+        self.capacity = capacity
+        self.grid = grid
+
+    @property
+    def leaf_zoom(self) -> int:
+        return self.zooms - 1
+
+    @classmethod
+    def build(cls, coords, importance, capacity: int = MAP_TILE_CAPACITY,
+              max_zoom: int = MAP_TILE_MAX_ZOOM, grid: int = MAP_DENSITY_GRID,
+              density_zooms: int = MAP_DENSITY_ZOOMS) -> "MapTiles":
+        coords = np.asarray(coords, dtype=np.float32)
+        n = len(coords)
+        bounds = _bounds(coords)
+        unit = (coords - np.array(bounds[:2], dtype=np.float32)) / bounds[2]  # [0, 1)
+        # Most important first; ties by verse ID
+        order = np.lexsort((np.arange(n), -np.asarray(importance, dtype=np.float64)))
+        rank = np.empty(n, dtype=np.uint32)
+        rank[order] = np.arange(n)
+
+        keys, offsets, counts, points, density = [], [0], [], [], []
+        z = 0
+        while True:
+            cells = np.minimum((unit[order] * (1 << z)).astype(np.int64), (1 << z) - 1)
+            tk = quadkey(z, cells[:, 0], cells[:, 1])
+            by_tile = np.argsort(tk, kind="stable")  # keeps importance order within a tile
+            tk_sorted = tk[by_tile]
+            uniq, starts, tile_n = np.unique(tk_sorted, return_index=True, return_counts=True)
+            leaf = z == max_zoom or tile_n.max() <= capacity
+            in_tile = np.arange(n) - np.repeat(starts, tile_n)
+            keep = np.ones(n, dtype=bool) if leaf else in_tile < capacity
+            kept = np.minimum(tile_n, n if leaf else capacity)
+
+            keys.append(uniq)
+            counts.append(tile_n)
+            points.append(order[by_tile][keep])
+            offsets.extend((offsets[-1] + np.cumsum(kept)).tolist())
+
+            if z < density_zooms:
+                fine = np.minimum((unit[order] * (grid << z)).astype(np.int64), (grid << z) - 1)
+                local = (fine[:, 1] % grid) * grid + fine[:, 0] % grid
+                tile_idx = np.searchsorted(uniq, tk)
+                density.append(np.bincount(tile_idx * grid * grid + local,
+                                           minlength=len(uniq) * grid * grid)
+                               .reshape(len(uniq), grid, grid))
+            if leaf:
+                break
+            z += 1
+
+        return cls(bounds, z + 1, coords, rank,
+                   np.concatenate(keys).astype(np.uint32),
+                   np.asarray(offsets, dtype=np.uint32),
+                   np.concatenate(counts).astype(np.uint32),
+                   np.concatenate(points).astype(np.uint32),
+                   (np.concatenate(density) if density
+                    else np.zeros((0, grid, grid))).astype(np.uint32),
+                   capacity, grid)
+
+    def save(self, data_dir: Path) -> int:
+        sections = {}
+        pos = 0
+        with atomic_open(data_dir / MAP_TILES_FILE, "wb") as f:
+            for name, dtype in _SECTIONS.items():
+                arr = np.ascontiguousarray(getattr(self, name), dtype=dtype)
+                f.write(arr.data)
+                sections[name] = {"offset": pos, "dtype": np.dtype(dtype).name,
+                                  "shape": list(arr.shape)}
+                pos += arr.nbytes
+        record_bytes(pos)
+        write_json(data_dir / MAP_TILES_META_FILE, {
+            "n_points": len(self.coords),
+            "n_tiles": len(self.tile_keys),
+            "bounds": self.bounds,
+            "zooms": self.zooms,
+            "capacity": self.capacity,
+            "density_grid": self.grid,
+            "quadkey": "1 << 2z | morton(x, y), x in even bits; tile (x, y) covers "
+                       "bounds[0:2] + [x, y] * bounds[2] / 2^z",
+            "sections": sections,
+        })
+        return pos
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "MapTiles":
+        """Open saved tiles; all arrays are read-only memory maps."""
+        with open(data_dir / MAP_TILES_META_FILE) as f:
+            meta = json.load(f)
+        path = data_dir / MAP_TILES_FILE
+        arrays = {
+            name: np.memmap(path, dtype=_SECTIONS[name], mode="r", offset=sec["offset"],
+                            shape=tuple(sec["shape"]))
+            for name, sec in meta["sections"].items()
+        }
+        return cls(meta["bounds"], meta["zooms"], *(arrays[name] for name in _SECTIONS),
+                   meta["capacity"], meta["density_grid"])
+
+    # --- reference queries ----------------------------------------------------
+
+    def _tile_index(self, keys) -> np.ndarray:
+        """Position of each quadkey in tile_keys, or -1 for empty tiles."""
+        keys = np.asarray(keys, dtype=np.uint32)
+        i = np.searchsorted(self.tile_keys, keys)
+        i = np.minimum(i, len(self.tile_keys) - 1)
+        return np.where(self.tile_keys[i] == keys, i, -1)
+
+    def tile(self, z: int, x: int, y: int) -> np.ndarray:
+        """Point IDs in tile (z, x, y), most important first."""
+        i = int(self._tile_index([quadkey(z, x, y)])[0])
+        if i < 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.points[self.tile_offsets[i]:self.tile_offsets[i + 1]], dtype=np.int64)
+
+    def _tile_range(self, z: int, x0: float, y0: float, x1: float, y1: float):
+        """Tile column/row ranges at zoom z covering the data-space box."""
+        bx, by, size = self.bounds
+        side = 1 << z
+        to_cell = lambda v, b: int(np.clip(np.floor((v - b) / size * side), 0, side - 1))
+        return to_cell(x0, bx), to_cell(x1, bx), to_cell(y0, by), to_cell(y1, by)
+
+    def _gather(self, z: int, x0, y0, x1, y1) -> np.ndarray:
+        tx0, tx1, ty0, ty1 = self._tile_range(z, x0, y0, x1, y1)
+        xs, ys = np.meshgrid(np.arange(tx0, tx1 + 1), np.arange(ty0, ty1 + 1))
+        idx = self._tile_index(quadkey(z, xs.ravel(), ys.ravel()))
+        idx = idx[idx >= 0]
+        if not len(idx):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.asarray(self.points[self.tile_offsets[i]:self.tile_offsets[i + 1]])
+                               for i in idx]).astype(np.int64)
+
+    def viewport(self, x0: float, y0: float, x1: float, y1: float,
+                 zoom: int | None = None) -> np.ndarray:
+        """
+        Point IDs inside the box, most important first.  At zoom < leaf_zoom
+        this is the capped per-tile sample a client would draw at that zoom;
+        the default (leaf zoom) returns every point in the box.
+        """
+        z = self.leaf_zoom if zoom is None else min(zoom, self.leaf_zoom)
+        ids = self._gather(z, x0, y0, x1, y1)
+        xy = self.coords[ids]
+        inside = (xy[:, 0] >= x0) & (xy[:, 0] <= x1) & (xy[:, 1] >= y0) & (xy[:, 1] <= y1)
+        ids = ids[inside]
+        # Tiles are importance-ordered internally; merge them by global rank
+        return ids[np.argsort(self.rank[ids], kind="stable")]
+
+    def radius(self, x: float, y: float, r: float) -> np.ndarray:
+        """Point IDs within distance r of (x, y), nearest first."""
+        ids = self._gather(self.leaf_zoom, x - r, y - r, x + r, y + r)
+        d2 = ((np.asarray(self.coords[ids]) - np.array([x, y], dtype=np.float32)) ** 2).sum(axis=1)
+        keep = d2 <= r * r
+        return ids[keep][np.argsort(d2[keep], kind="stable")]
+
+    def nearest(self, x: float, y: float) -> int | None:
+        """Closest point to (x, y) (hover hit-testing), growing the search box ring by ring."""
+        if not len(self.coords):
+            return None
+        bx, by, size = self.bounds
+        outside = np.hypot(max(bx - x, 0.0, x - bx - size), max(by - y, 0.0, y - by - size))
+        r = outside + size / (1 << self.leaf_zoom)
+        while True:
+            ids = self.radius(x, y, r)
+            if len(ids):
+                return int(ids[0])
+            if r > outside + 2 * size:
+                return None
+            r *= 2
@@ -0,0 +1,159 @@
+"""
+Normalized compression distance (NCD) matrices between books and chapters.
+
+    NCD(x, y) = (C(xy) - min(C(x), C(y))) / max(C(x), C(y))
+
+A naive n×n matrix needs O(n²) compressions of concatenated texts.  This
+engine cuts that down in three ways:
+  - prefix-state reuse: for deflate codecs each row compresses x_i once,
+    then forks the compressor state (zlib ``compressobj.copy()``) for
+    every x_j, so only the suffix is compressed per pair
+  - a process pool over rows, with the texts shipped once per worker
+  - an on-disk cache keyed by text hash, so only pairs touching changed
+    texts are recomputed on the next run
+
+Deflate only matches back DEFLATE_WINDOW (32 KB): when x is longer, y
+sees just the tail of x (the forked state is the same as a zdict preset
+of x's last 32 KB), and once both exceed the window C(xy) ≈ C(x) + C(y),
+so NCD → 1 regardless of content.  Use lzma (or zstd) for long texts;
+ncd_matrix warns when a deflate codec meets texts past the window.
+
+The book matrix is written as a heatmap.json-compatible artifact
+(similarity = 1 − NCD) to sit next to the embedding heatmap.
+"""
+
+import hashlib
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .compression import CODECS
+
+NCD_CACHE = "ncd_cache_{scope}_{codec}.npz"
+# "gzip" is measured as raw deflate (no 18-byte header/trailer) so that
+# compressor state can be forked; "zlib" keeps its 6-byte framing.
+_DEFLATE_WBITS = {"zlib": zlib.MAX_WBITS, "gzip": -zlib.MAX_WBITS}
+DEFLATE_WINDOW = 1 << zlib.MAX_WBITS
+
+_texts: list[bytes] = []
+
+
+def _init_worker(texts):
+    global _texts
+    _texts = texts
+
+
+def _deflate_base(codec, x):
+    base = zlib.compressobj(9, zlib.DEFLATED, _DEFLATE_WBITS[codec])
+    return base, len(base.compress(x))
+
+
+def _single_size(args) -> int:
+    codec, i = args
+    x = _texts[i]
+    if codec in _DEFLATE_WBITS:
+        base, head = _deflate_base(codec, x)
+        return head + len(base.flush())
+    return len(CODECS[codec](x))
+
+
+def _row_sizes(args) -> list[int]:
+    """C(x_i + x_j) for every j in js, reusing x_i's compressor state."""
+    codec, i, js = args
+    x = _texts[i]
+    if codec in _DEFLATE_WBITS:
+        base, head = _deflate_base(codec, x)
+        out = []
+        for j in js:
+            c = base.copy()
+            out.append(head + len(c.compress(_texts[j])) + len(c.flush()))
+        return out
+    compress = CODECS[codec]
+    return [len(compress(x + _texts[j])) for j in js]
+
+
+def _text_hashes(payloads: list[bytes]) -> np.ndarray:
+    return np.array([hashlib.blake2b(p, digest_size=16).digest() for p in payloads], dtype="S16")
+
+
+def _load_cache(path: Path | None, hashes: np.ndarray):
+    """Reuse single/pair sizes for texts whose hash appears in the cache."""
+    n = len(hashes)
+    single = np.full(n, -1, dtype=np.int64)
+    pairs = np.full((n, n), -1, dtype=np.int64)
+    if path is None or not path.exists():
+        return single, pairs
+    cached = np.load(path)
+    old_pos = {h: k for k, h in enumerate(cached["hashes"])}
+    new_idx = np.array([k for k, h in enumerate(hashes) if h in old_pos], dtype=np.int64)
+    old_idx = np.array([old_pos[hashes[k]] for k in new_idx], dtype=np.int64)
+    if len(new_idx):
+        single[new_idx] = cached["single"][old_idx]
+        pairs[np.ix_(new_idx, new_idx)] = cached["pairs"][np.ix_(old_idx, old_idx)]
+    return single, pairs
+
+
+def ncd_matrix(texts, codec: str = "lzma", workers: int | None = None,
+               cache_path: Path | None = None) -> np.ndarray:
+    """Symmetric NCD matrix (upper triangle computed as C(x_i x_j), i < j)."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r}; available: {sorted(CODECS)}")
+    payloads = [t.encode("utf-8") if isinstance(t, str) else bytes(t) for t in texts]
+    n = len(payloads)
+    hashes = _text_hashes(payloads)
+    single, pairs = _load_cache(cache_path, hashes)
+    if codec in _DEFLATE_WBITS:
+        long = sum(len(p) > DEFLATE_WINDOW for p in payloads)
+        if long:
+            print(f"  Warning: {long}/{n} texts exceed the {DEFLATE_WINDOW // 1024} KB {codec} "
+                  "window; their NCD saturates near 1 (use lzma or zstd)")
+
+    todo_single = [(codec, i) for i in np.flatnonzero(single < 0)]
+    todo_rows = []
+    for i in range(n - 1):
+        js = [int(j) for j in np.flatnonzero(pairs[i, i + 1:] < 0) + i + 1]
+        if js:
+            todo_rows.append((codec, i, js))
+    # Longest rows first keeps the pool busy until the end.
+    todo_rows.sort(key=lambda r: -len(r[2]))
+
+    if todo_single or todo_rows:
+        n_pairs = sum(len(r[2]) for r in todo_rows)
+        print(f"  NCD ({codec}): {len(todo_single)} texts, {n_pairs} pairs to compress "
+              f"({n * (n - 1) // 2 - n_pairs} cached)")
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(payloads,)) as pool:
+            for (_, i), size in zip(todo_single, pool.map(_single_size, todo_single)):
+                single[i] = size
+            for (_, i, js), sizes in zip(todo_rows, pool.map(_row_sizes, todo_rows)):
+                pairs[i, js] = sizes
+
+        if cache_path is not None:
+            with atomic_open(cache_path, "wb") as f:
+                np.savez(f, hashes=hashes, single=single, pairs=pairs)
+
+    iu, ju = np.triu_indices(n, k=1)
+    lo = np.minimum(single[iu], single[ju])
+    hi = np.maximum(single[iu], single[ju])
+    matrix = np.zeros((n, n))
+    matrix[iu, ju] = (pairs[iu, ju] - lo) / np.maximum(hi, 1)
+    matrix[ju, iu] = matrix[iu, ju]
+    return matrix
+
+
+def write_heatmap(labels: list[dict], texts: list[str], out_path: Path,
+                  codec: str = "lzma", cache_path: Path | None = None,
+                  genre_colors: dict | None = None) -> np.ndarray:
+    """Write a heatmap.json-shaped artifact with similarity = 1 − NCD."""
+    matrix = ncd_matrix(texts, codec, cache_path=cache_path)
+    similarity = np.round(1.0 - matrix, 4)
+    result = {"books": labels, "matrix": similarity.tolist(), "metric": f"1 - NCD ({codec})"}
+    if genre_colors is not None:
+        result["genre_colors"] = genre_colors
+    write_json(out_path, result)
+    return matrix
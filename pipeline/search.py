@@ -0,0 +1,288 @@
+"""
+Hybrid lexical + semantic search over verses and passages.
+
+Dense side: the uint8 vectors exported by compute_search / compute_passages
+are memory-mapped and scored exactly as the site does in rankEmbeddings
+(hero.js) — dot(query, u8 / 127.5 − 1) — so dense rankings match the
+browser.  Many queries are scored with one matmul per chunk of vectors.
+
+Lexical side: Okapi BM25 over the verse text, tokenized the same way as
+compute_metrics, with optional "quoted phrase" matching checked against
+token positions.
+
+With clause vectors from step 11 loaded, search(..., clauses=True) scores
+each verse as its best-matching clause (max_pool_scores) instead of its
+whole-verse vector, so one matching clause in a long verse is not diluted.
+
+The two rankings are combined with reciprocal-rank fusion (RRF):
+    score(v) = Σ 1 / (RRF_K + rank_i(v))
+and can be filtered by book, testament or genre.
+
+    engine = SearchEngine.load(Path("data"), verses)
+    hits = engine.search(["love your enemies"], top_k=10, testament="NT")
+"""
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from .compute_clauses import CLAUSE_EMB_FILE, CLAUSE_META_FILE, load_index
+from .compute_passages import PASSAGE_EMB_FILE, PASSAGE_META_FILE
+from .compute_search import SEARCH_FILE, SEARCH_META_FILE
+from .config import EMBEDDING_MODEL
+from .text_metrics import TokenizedCorpus, tokenize_corpus
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+DENSE_CHUNK = 8192
+
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+_WORD_RE = re.compile(r"[a-zA-Z]+")
+
+
+def load_quantized(bin_path: Path, n: int, dim: int) -> np.ndarray:
+    """Memory-map an (n, dim) uint8 vector file written by compute_search."""
+    return np.memmap(bin_path, dtype=np.uint8, mode="r", shape=(n, dim))
+
+
+def dense_scores(vectors_u8: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    (n_queries, n) cosine scores of normalised float queries against uint8
+    vectors, dequantised as u8 / 127.5 − 1 (identical to the site).
+    """
+    q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    out = np.empty((q.shape[0], vectors_u8.shape[0]), dtype=np.float32)
+    q_scaled = (q / 127.5).T
+    q_offset = q.sum(axis=1)
+    for s in range(0, vectors_u8.shape[0], DENSE_CHUNK):
+        block = np.asarray(vectors_u8[s:s + DENSE_CHUNK], dtype=np.float32)
+        out[:, s:s + len(block)] = (block @ q_scaled).T - q_offset[:, None]
+    return out
+
+
+def max_pool_scores(vectors_u8: np.ndarray, verse_offsets: np.ndarray, queries: np.ndarray,
+                    chunk: int = DENSE_CHUNK) -> np.ndarray:
+    """
+    (n_queries, n_verses) verse scores = max over each verse's clause scores.
+    Clause vectors are grouped by verse (verse v owns rows verse_offsets[v]
+    to verse_offsets[v + 1], at least one each); about ``chunk`` clauses are
+    scored and reduced at a time.
+    """
+    q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    offsets = np.asarray(verse_offsets, dtype=np.int64)
+    n_verses = len(offsets) - 1
+    out = np.empty((q.shape[0], n_verses), dtype=np.float32)
+    v = 0
+    while v < n_verses:
+        v_end = max(v + 1, int(np.searchsorted(offsets, offsets[v] + chunk, side="right")) - 1)
+        c0, c1 = offsets[v], offsets[v_end]
+        scores = dense_scores(vectors_u8[c0:c1], q)
+        out[:, v:v_end] = np.maximum.reduceat(scores, offsets[v:v_end] - c0, axis=1)
+        v = v_end
+    return out
+
+
+def top_k_rows(scores: np.ndarray, k: int, mask: np.ndarray | None = None):
+    """Row-wise top-k (indices, scores), best first; masked-out entries excluded."""
+    scores = np.atleast_2d(scores)
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx, np.take_along_axis(part_scores, order, axis=1)
+
+
+class BM25Index:
+    """Term-major (verse, tf) postings with precomputed BM25 weights."""
+
+    def __init__(self, corpus: TokenizedCorpus):
+        self.corpus = corpus
+        self.n_docs = corpus.n_verses
+        self.term_id = {t: i for i, t in enumerate(corpus.vocab)}
+        n_terms = len(corpus.vocab)
+
+        doc = np.repeat(np.arange(self.n_docs, dtype=np.int64), np.diff(corpus.verse_offsets))
+        keys, tf = np.unique(corpus.token_ids.astype(np.int64) * self.n_docs + doc,
+                             return_counts=True)
+        term = keys // self.n_docs
+        self.docs = (keys % self.n_docs).astype(np.int32)
+        self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term, minlength=n_terms), out=self.offsets[1:])
+
+        df = np.diff(self.offsets)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+        doc_len = np.diff(corpus.verse_offsets).astype(np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(doc_len.mean(), 1e-9))
+        self.weights = (self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm[self.docs])).astype(np.float32)
+
+    def _postings(self, word: str):
+        tid = self.term_id.get(word)
+        if tid is None:
+            return None
+        s, e = self.offsets[tid], self.offsets[tid + 1]
+        return self.docs[s:e], self.weights[s:e], tid
+
+    def _phrase_docs(self, words: list[str]) -> np.ndarray:
+        """Verses containing ``words`` as a contiguous token sequence."""
+        postings = [self._postings(w) for w in words]
+        if any(p is None for p in postings):
+            return np.zeros(0, dtype=np.int32)
+        cand = postings[0][0]
+        for p in postings[1:]:
+            cand = np.intersect1d(cand, p[0], assume_unique=True)
+        ids = np.array([p[2] for p in postings], dtype=np.int32)
+        tokens, offsets = self.corpus.token_ids, self.corpus.verse_offsets
+        keep = []
+        for d in cand:
+            seq = tokens[offsets[d]:offsets[d + 1]]
+            if len(seq) < len(ids):
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(seq, len(ids))
+            if (windows == ids).all(axis=1).any():
+                keep.append(d)
+        return np.asarray(keep, dtype=np.int32)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every verse; quoted phrases must match verbatim."""
+        out = np.zeros(self.n_docs, dtype=np.float32)
+        for word in _WORD_RE.findall(query.lower()):
+            p = self._postings(word)
+            if p is not None:
+                out[p[0]] += p[1]  # docs are unique within a posting list
+        for phrase in _PHRASE_RE.findall(query):
+            words = _WORD_RE.findall(phrase.lower())
+            if len(words) > 1:
+                allowed = np.zeros(self.n_docs, dtype=bool)
+                allowed[self._phrase_docs(words)] = True
+                out[~allowed] = 0.0
+        return out
+
+
+def rrf_fuse(rankings: list[np.ndarray], n: int, k: int = RRF_K) -> np.ndarray:
+    """Reciprocal-rank fusion of several ranked index lists over n items."""
+    fused = np.zeros(n, dtype=np.float64)
+    for ranked in rankings:
+        fused[ranked] += 1.0 / (k + 1 + np.arange(len(ranked)))
+    return fused
+
+
+class SearchEngine:
+    def __init__(self, verses: list[dict], verse_vectors: np.ndarray,
+                 passage_vectors: np.ndarray | None = None,
+                 clause_vectors: np.ndarray | None = None, clause_offsets: np.ndarray | None = None):
+        self.verses = verses
+        self.verse_vectors = verse_vectors
+        self.passage_vectors = passage_vectors
+        self.clause_vectors = clause_vectors
+        self.clause_offsets = clause_offsets
+        self.bm25 = BM25Index(tokenize_corpus(verses))
+        self._book_num = np.fromiter((v["book_num"] for v in verses), dtype=np.int32,
+                                     count=len(verses))
+        self._testament = np.array([v["testament"] for v in verses])
+        self._genre = np.array([v["genre"] for v in verses])
+        self._book = np.array([v["book"] for v in verses])
+        self._encoder = None
+
+    @classmethod
+    def load(cls, data_dir: Path, verses: list[dict]) -> "SearchEngine":
+        with open(data_dir / SEARCH_META_FILE) as f:
+            meta = json.load(f)
+        verse_vecs = load_quantized(data_dir / SEARCH_FILE, meta["n_verses"], meta["dim"])
+        passage_vecs = None
+        if (data_dir / PASSAGE_META_FILE).exists():
+            with open(data_dir / PASSAGE_META_FILE) as f:
+                pmeta = json.load(f)
+            passage_vecs = load_quantized(data_dir / PASSAGE_EMB_FILE,
+                                          pmeta["n_passages"], pmeta["dim"])
+        clause_vecs = clause_offsets = None
+        if (data_dir / CLAUSE_META_FILE).exists():
+            cmeta, index = load_index(data_dir)
+            clause_vecs = load_quantized(data_dir / CLAUSE_EMB_FILE, cmeta["n_clauses"], cmeta["dim"])
+            clause_offsets = index["verse_offsets"]
+        return cls(verses, verse_vecs, passage_vecs, clause_vecs, clause_offsets)
+
+    def encode(self, queries: list[str]) -> np.ndarray:
+        """Normalised query embeddings (mean pooling, as on the site)."""
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+            self._encoder = SentenceTransformer(EMBEDDING_MODEL)
+        return self._encoder.encode(queries, normalize_embeddings=True,
+                                    convert_to_numpy=True).astype(np.float32)
+
+    def filter_mask(self, book=None, testament=None, genre=None) -> np.ndarray | None:
+        """Boolean verse mask; each filter accepts a value or a list of values."""
+        mask = None
+        for values, column in ((book, None), (testament, self._testament), (genre, self._genre)):
+            if values is None:
+                continue
+            values = [values] if isinstance(values, (str, int)) else list(values)
+            if column is None:
+                nums = [v for v in values if isinstance(v, int)]
+                names = [v for v in values if isinstance(v, str)]
+                m = np.isin(self._book_num, nums) | np.isin(self._book, names)
+            else:
+                m = np.isin(column, values)
+            mask = m if mask is None else mask & m
+        return mask
+
+    def verse_scores(self, query_vecs: np.ndarray, clauses: bool = False) -> np.ndarray:
+        """(n_queries, n_verses) dense scores from verse vectors, or max-pooled clause vectors."""
+        if not clauses:
+            return dense_scores(self.verse_vectors, query_vecs)
+        if self.clause_vectors is None:
+            raise FileNotFoundError("clause vectors not loaded; run step 11 (--clauses) first")
+        return max_pool_scores(self.clause_vectors, self.clause_offsets, query_vecs)
+
+    def dense(self, query_vecs: np.ndarray, top: int = 200, mask=None, clauses: bool = False):
+        """Batched dense ranking: one matmul per vector chunk for all queries."""
+        return top_k_rows(self.verse_scores(query_vecs, clauses), top, mask)
+
+    def dense_passages(self, query_vecs: np.ndarray, top: int = 200):
+        if self.passage_vectors is None:
+            raise FileNotFoundError("passage vectors not loaded; run step 8 first")
+        return top_k_rows(dense_scores(self.passage_vectors, query_vecs), top)
+
+    def rank(self, query: str, dense_row: np.ndarray, top_k: int = 20, depth: int = 200,
+             mask: np.ndarray | None = None) -> list[dict]:
+        """Fuse one query's precomputed dense scores with its BM25 ranking."""
+        dense_idx, dense_sc = top_k_rows(dense_row, depth, mask)
+        dense_idx, dense_sc = dense_idx[0], dense_sc[0]
+        valid = np.isfinite(dense_sc)
+
+        lex = self.bm25.scores(query)
+        if mask is not None:
+            lex = np.where(mask, lex, 0.0)
+        n_lex = min(depth, int(np.count_nonzero(lex)))
+        lex_idx = np.argsort(-lex, kind="stable")[:n_lex]
+
+        fused = rrf_fuse([dense_idx[valid], lex_idx], len(self.verses))
+        n_hits = int(np.count_nonzero(fused))
+        best = np.argsort(-fused, kind="stable")[:min(top_k, n_hits)]
+        dense_score = dict(zip(dense_idx[valid].tolist(), dense_sc[valid].tolist()))
+        return [{
+            "verse_id": int(i),
+            "ref": self.verses[i].get("ref", ""),
+            "score": round(float(fused[i]), 6),
+            "dense": round(dense_score[int(i)], 4) if int(i) in dense_score else None,
+            "bm25": round(float(lex[i]), 4),
+        } for i in best]
+
+    def search(self, queries: list[str], top_k: int = 20, query_vecs: np.ndarray | None = None,
+               depth: int = 200, book=None, testament=None, genre=None,
+               clauses: bool = False) -> list[list[dict]]:
+        """
+        Hybrid search for a batch of queries.  ``query_vecs`` may be passed
+        pre-encoded; otherwise the embedding model is loaded on first use.
+        ``clauses`` ranks verses by their best clause (needs step 11).
+        """
+        if query_vecs is None:
+            query_vecs = self.encode(queries)
+        mask = self.filter_mask(book, testament, genre)
+        scores = self.verse_scores(query_vecs, clauses)
+        return [self.rank(q, scores[qi], top_k, depth, mask) for qi, q in enumerate(queries)]
@@ -0,0 +1,259 @@
+"""
+Local HTTP search service built on pipeline.search.
+
+Concurrent requests are micro-batched: a single worker thread collects
+whatever queries arrive within BATCH_WAIT seconds (up to BATCH_MAX),
+encodes them with one model call, and scans the uint8 vectors once for
+the whole batch.  Results are kept in an LRU cache keyed by the
+normalised query text and options, with TTL eviction.
+
+    python -m pipeline.search_service --data data --port 8765
+    curl 'http://127.0.0.1:8765/search?q=love+your+enemies&k=10&testament=NT'
+
+Filters (book, testament, genre) take one value or a list: repeat the
+GET parameter (book=John&book=Mark) or pass a JSON array.  Numeric books
+("43" or 43) match book_num.  Malformed input gets a 400.
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .config import VERSES_FILE
+from .search import SearchEngine, dense_scores
+
+BATCH_MAX = 64
+BATCH_WAIT = 0.01
+CACHE_SIZE = 4096
+CACHE_TTL = 3600.0
+MAX_TOP_K = 200
+FILTERS = ("book", "testament", "genre")
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def normalize_filters(filters: dict) -> dict[str, tuple]:
+    """
+    Each non-empty filter as a sorted tuple of values (hashable, so it can
+    be part of a cache key); numeric book strings become book numbers.
+    Raises ValueError for unknown filters or values that are not str/int.
+    """
+    out = {}
+    for name, value in filters.items():
+        if name not in FILTERS:
+            raise ValueError(f"unknown filter {name!r}; available: {', '.join(FILTERS)}")
+        if value is None or value == "" or value == []:
+            continue
+        values = value if isinstance(value, list) else [value]
+        parsed = set()
+        for v in values:
+            if isinstance(v, bool) or not isinstance(v, (str, int)):
+                raise ValueError(f"{name} values must be strings or integers")
+            if name == "book" and isinstance(v, str) and v.strip().isdigit():
+                v = int(v)
+            parsed.add(v)
+        out[name] = tuple(sorted(parsed, key=lambda v: (isinstance(v, str), v)))
+    return out
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL."""
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MicroBatcher:
+    """Collects concurrent search requests and serves them in batches."""
+
+    def __init__(self, engine: SearchEngine, encode=None,
+                 batch_max: int = BATCH_MAX, batch_wait: float = BATCH_WAIT):
+        self.engine = engine
+        self.encode = encode or engine.encode
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self._queue: queue.Queue = queue.Queue()
+        self.batches = self.queries = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, query: str, k: int, filters: dict) -> Future:
+        fut: Future = Future()
+        self._queue.put((query, k, filters, fut))
+        return fut
+
+    def _take_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                vecs = self.encode([item[0] for item in batch])
+                scores = dense_scores(self.engine.verse_vectors, vecs)
+            except Exception as e:
+                for *_, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for row, (query, k, filters, fut) in zip(scores, batch):
+                try:
+                    mask = self.engine.filter_mask(**{n: list(v) for n, v in filters.items()})
+                    fut.set_result(self.engine.rank(query, row, k, mask=mask))
+                except Exception as e:
+                    fut.set_exception(e)
+
+
+class SearchService:
+    def __init__(self, engine: SearchEngine, encode=None, cache: LRUCache | None = None):
+        self.batcher = MicroBatcher(engine, encode)
+        self.cache = cache or LRUCache()
+
+    def search(self, query: str, k: int = 20, **filters) -> list[dict]:
+        filters = normalize_filters(filters)
+        key = (normalize_query(query), k, tuple(sorted(filters.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.batcher.submit(query, k, filters).result()
+        self.cache.put(key, result)
+        return result
+
+    def stats(self) -> dict:
+        b = self.batcher
+        return {
+            "batches": b.batches,
+            "queries_encoded": b.queries,
+            "mean_batch": round(b.queries / b.batches, 2) if b.batches else 0,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+    def handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, params):
+                if not isinstance(params, dict):
+                    return self._send(400, {"error": "body must be a JSON object"})
+                query = params.get("q", "")
+                if not isinstance(query, str) or not query.strip():
+                    return self._send(400, {"error": "missing q"})
+                query = query.strip()
+                try:
+                    k = max(1, min(int(params.get("k", 20)), MAX_TOP_K))
+                except (TypeError, ValueError):
+                    return self._send(400, {"error": "k must be an integer"})
+                try:
+                    filters = normalize_filters({n: params.get(n) for n in FILTERS})
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                try:
+                    results = service.search(query, k, **{n: list(v) for n, v in filters.items()})
+                except Exception as e:
+                    return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                self._send(200, {"query": query, "results": results})
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/stats":
+                    return self._send(200, service.stats())
+                if url.path != "/search":
+                    return self._send(404, {"error": "not found"})
+                # Repeated parameters (book=John&book=Mark) become lists
+                self._handle({k: v[0] if len(v) == 1 else v
+                              for k, v in parse_qs(url.query).items()})
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/search":
+                    return self._send(404, {"error": "not found"})
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    params = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    return self._send(400, {"error": "invalid JSON"})
+                self._handle(params)
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+        return ThreadingHTTPServer((host, port), self.handler())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve hybrid verse search over HTTP")
+    parser.add_argument("--data", type=Path, default=Path("data"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with open(args.data / VERSES_FILE) as f:
+        verses = json.load(f)
+    service = SearchService(SearchEngine.load(args.data, verses))
+    server = service.serve(args.host, args.port)
+    print(f"Search service on http://{args.host}:{args.port}/search?q=...")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Stage pipeline artifacts into site/data/ for static hosting.
+
+For each artifact this writes:
+  - the plain file (``verses.json``), the fallback when there is no manifest
+  - a content-hashed copy (``verses.3f9a1c02de.json``) safe to serve with
+    ``Cache-Control: immutable``
+  - precompressed ``.gz`` / ``.br`` siblings of the hashed copy, for servers
+    that serve precompressed files (nginx gzip_static / brotli_static)
+
+and records everything in ``asset_manifest.json``, mapping each logical
+name to its hashed URL, sizes, and a Subresource Integrity hash; the pages
+resolve artifact names through it (fetchAsset in site/js/common.js).
+Files whose content hash matches the previous manifest, and whose outputs
+are all still present, are left untouched, so redeploys only upload what
+actually changed.
+"""
+
+import base64
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+from .artifacts import compress_file, write_json
+from .config import TRANSLATIONS_ENABLED
+
+SITE_DATA_DIR = Path("site") / "data"
+SITE_ARTIFACTS = [
+    "verses.json",
+    "umap_coords.json",
+    "map_tiles.bin",
+    "map_tiles.json",
+    "neighbors.json",
+    "graph.json",
+    "metrics.json",
+    "heatmap.json",
+    "ncd_heatmap.json",
+    "hapax.json",
+    "lexicon_index.bin",
+    "lexicon_meta.json",
+    "entity_index.bin",
+    "entity_meta.json",
+    "sphere.json",
+    "search_embeddings.bin",
+    "search_meta.json",
+    "passages.json",
+    "passage_embeddings.bin",
+    "passage_meta.json",
+    "passage_graph.bin",
+    "text_meta.json",
+    "text_index.bin",
+] + [f"text_{name}.txt" for name in ("kjv", *TRANSLATIONS_ENABLED)]
+
+ASSET_MANIFEST_FILE = "asset_manifest.json"
+STAGE_COMPRESSIONS = ("gz", "br")
+HASH_LEN = 10
+
+
+def _digests(path: Path) -> tuple[str, str]:
+    """(sha256 hex, sha384 SRI string) of a file, read in 1 MB chunks."""
+    h256 = hashlib.sha256()
+    h384 = hashlib.sha384()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h256.update(chunk)
+            h384.update(chunk)
+    return h256.hexdigest(), "sha384-" + base64.b64encode(h384.digest()).decode("ascii")
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    p = Path(name)
+    return f"{p.stem}.{digest[:HASH_LEN]}{p.suffix}"
+
+
+def _load_manifest(path: Path) -> dict:
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {"assets": {}}
+
+
+def _outputs_present(site_dir: Path, name: str, entry: dict) -> bool:
+    """Whether every file a manifest entry describes still exists."""
+    paths = [name, entry["url"]]
+    paths += [f"{entry['url']}.{fmt}" for fmt in STAGE_COMPRESSIONS if f"size_{fmt}" in entry]
+    return all((site_dir / p).exists() for p in paths)
+
+
+def _prune_stale(site_dir: Path, name: str, keep: str):
+    """Remove older hashed copies (and their siblings) of a logical artifact."""
+    p = Path(name)
+    for old in site_dir.glob(f"{p.stem}.*{p.suffix}*"):
+        base = old.name
+        for fmt in STAGE_COMPRESSIONS:
+            base = base.removesuffix(f".{fmt}")
+        if base != keep and base != name:
+            old.unlink()
+
+
+def stage(data_dir: Path, site_dir: Path, names: list[str]) -> dict:
+    """Copy, hash and precompress ``names`` from data_dir into site_dir."""
+    site_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = site_dir / ASSET_MANIFEST_FILE
+    previous = _load_manifest(manifest_path)["assets"]
+
+    assets = {}
+    staged = skipped = 0
+    for name in names:
+        src = data_dir / name
+        if not src.exists():
+            print(f"  [warn] {src} not found, skipping")
+            if name in previous:
+                assets[name] = previous[name]
+            continue
+
+        digest, integrity = _digests(src)
+        hashed = _hashed_name(name, digest)
+        prev = previous.get(name)
+        if prev and prev["sha256"] == digest and _outputs_present(site_dir, name, prev):
+            assets[name] = prev
+            skipped += 1
+            continue
+
+        shutil.copy2(src, site_dir / name)
+        shutil.copy2(src, site_dir / hashed)
+        sizes = compress_file(site_dir / hashed, STAGE_COMPRESSIONS)
+        _prune_stale(site_dir, name, hashed)
+
+        raw_size = src.stat().st_size
+        assets[name] = {
+            "url": hashed,
+            "size": raw_size,
+            **{f"size_{fmt}": n for fmt, n in sizes.items()},
+            "sha256": digest,
+            "integrity": integrity,
+        }
+        best = min(sizes.values(), default=raw_size)
+        print(f"  {src} → {site_dir / hashed} "
+              f"({raw_size / 1e6:.2f} MB, {best / 1e6:.2f} MB compressed)")
+        staged += 1
+
+    write_json(manifest_path, {"assets": assets})
+    print(f"  {staged} staged, {skipped} unchanged → {manifest_path}")
+    return assets
+
+
+def run(data_dir: Path, site_dir: Path = SITE_DATA_DIR):
+    """Copy final artifacts into site/data/ with hashed, precompressed variants."""
+    print("[6/6] Staging data for site...")
+    stage(data_dir, site_dir, SITE_ARTIFACTS)
+    print("Done. Serve site/ with any static server to view the project.")
@@ -0,0 +1,73 @@
+"""
+Pipeline step registry.
+
+Steps are listed by dotted "module:function" targets and imported only when
+they run, so `run_pipeline.py --step 6` (staging) or `--list` never pay for
+numpy, the embedding model or UMAP.  This module must stay stdlib-only.
+
+Steps run in registry order; numbers are the historical --step IDs.
+"""
+
+import importlib
+import sys
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Step:
+    number: int
+    name: str
+    target: str               # "module:function"
+    description: str
+    needs_verses: bool = True
+    provides_verses: bool = False  # returns the verse list (fetch)
+    options: tuple = ()       # run_pipeline options forwarded as keyword args
+
+    @property
+    def module(self) -> str:
+        return self.target.split(":")[0]
+
+    def load(self):
+        """Import the step; returns (callable, import seconds, modules newly loaded)."""
+        module_name, func = self.target.split(":")
+        before = len(sys.modules)
+        t0 = time.perf_counter()
+        module = importlib.import_module(module_name)
+        elapsed = time.perf_counter() - t0
+        return getattr(module, func), elapsed, len(sys.modules) - before
+
+
+STEPS = [
+    Step(1, "fetch", "pipeline.fetch_data:run", "Download KJV text and build verses.json",
+         needs_verses=False, provides_verses=True),
+    Step(2, "embeddings", "pipeline.compute_embeddings:run",
+         "Verse embeddings, 2D UMAP, neighbors, map tiles, book heatmap",
+         options=("umap_mode",)),
+    Step(3, "entities", "pipeline.extract_entities:run",
+         "Entity graph with layout, entity index"),
+    Step(4, "metrics", "pipeline.compute_metrics:run",
+         "Information-theoretic metrics, NCD, lexical index"),
+    Step(9, "translations", "pipeline.translations:run", "Ingest translations into the text store"),
+    Step(10, "texts", "pipeline.text_store:run", "Write and verify canonical text stores"),
+    Step(5, "sphere", "pipeline.compute_sphere:run", "Homepage 3D sphere and cross-reference arcs",
+         options=("umap_mode",)),
+    Step(7, "search", "pipeline.compute_search:run", "Quantised search embeddings"),
+    Step(8, "passages", "pipeline.compute_passages:run", "Passage records, embeddings and graph"),
+    Step(11, "clauses", "pipeline.compute_clauses:run",
+         "Clause-level search vectors (optional: --clauses or CLAUSE_SEARCH)",
+         options=("clauses",)),
+    Step(6, "stage", "pipeline.stage_site:run", "Copy artifacts into site/data",
+         needs_verses=False),
+]
+
+STEP_BY_NUMBER = {s.number: s for s in STEPS}
+
+
+def selected(number: int = 0) -> list[Step]:
+    """Steps to run for --step N (0 = all, in registry order)."""
+    if number == 0:
+        return list(STEPS)
+    if number not in STEP_BY_NUMBER:
+        raise ValueError(f"Unknown step {number}; available: {sorted(STEP_BY_NUMBER)}")
+    return [STEP_BY_NUMBER[number]]
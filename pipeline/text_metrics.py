@@ -0,0 +1,189 @@
+"""
+Lexical metrics over integer token IDs for arbitrary verse groupings.
+
+The corpus is tokenized once into a flat int32 array of token IDs with
+per-verse offsets.  Any grouping (book, chapter, genre, sliding window)
+is then reduced to (group, token) pairs, and every metric — Shannon
+entropy, type-token ratio, hapax ratio, mean word and sentence length —
+falls out of a single sort plus a few np.bincount calls.
+
+Sentences follow compute_metrics: text is split on [.!?;:] after joining
+a group's verses with spaces, so a clause that runs across a verse
+boundary counts once.
+"""
+
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-zA-Z]+")
+_SENTENCE_RE = re.compile(r"[.!?;:]")
+
+
+class TokenizedCorpus(NamedTuple):
+    vocab: list[str]             # token ID → lowercase word
+    token_ids: np.ndarray        # int32, every token in verse order
+    verse_offsets: np.ndarray    # int64, len n_verses + 1
+    sentence_pieces: np.ndarray  # int32, non-empty [.!?;:] pieces per verse
+    blank: np.ndarray            # bool, whitespace-only verse (transparent to sentence joins)
+    joins_prev: np.ndarray       # bool, first piece continues the previous non-blank verse's last
+
+    @property
+    def n_verses(self) -> int:
+        return len(self.verse_offsets) - 1
+
+    def prev_nonblank(self) -> np.ndarray:
+        """Index of the previous non-blank verse for every verse (-1 if none)."""
+        idx = np.where(self.blank, -1, np.arange(self.n_verses))
+        prev = np.full(self.n_verses, -1, dtype=np.int64)
+        prev[1:] = np.maximum.accumulate(idx)[:-1]
+        return prev
+
+    def next_nonblank(self) -> np.ndarray:
+        """Index of the first non-blank verse at or after each verse (n if none)."""
+        n = self.n_verses
+        idx = np.where(self.blank, n, np.arange(n))
+        return np.minimum.accumulate(idx[::-1])[::-1]
+
+    def word_lengths(self) -> np.ndarray:
+        return np.fromiter((len(w) for w in self.vocab), dtype=np.int32, count=len(self.vocab))
+
+
+def clause_spans(text: str) -> list[tuple[int, int]]:
+    """
+    (start, end) character spans of the non-empty [.!?;:] pieces of one
+    text (the sentence split above), each keeping its closing delimiter and
+    trimmed of surrounding whitespace.
+    """
+    spans = []
+    start = 0
+    for m in [*_SENTENCE_RE.finditer(text), None]:
+        end = m.end() if m else len(text)
+        piece = text[start:end]
+        if piece.strip(" \t\n.!?;:"):
+            lead = len(piece) - len(piece.lstrip())
+            spans.append((start + lead, start + len(piece.rstrip())))
+        start = end
+    return spans
+
+
+def tokenize_corpus(verses: list[dict], field: str = "text") -> TokenizedCorpus:
+    """Tokenize every verse once; IDs are assigned in first-seen order."""
+    vocab_index: dict[str, int] = {}
+    ids: list[int] = []
+    offsets = np.zeros(len(verses) + 1, dtype=np.int64)
+    pieces = np.zeros(len(verses), dtype=np.int32)
+    first_open = np.zeros(len(verses), dtype=bool)
+    last_open = np.zeros(len(verses), dtype=bool)
+    blank = np.zeros(len(verses), dtype=bool)
+
+    lookup = vocab_index.setdefault
+    for i, v in enumerate(verses):
+        text = v.get(field, "")
+        ids.extend(lookup(tok, len(vocab_index)) for tok in _TOKEN_RE.findall(text.lower()))
+        offsets[i + 1] = len(ids)
+
+        parts = _SENTENCE_RE.split(text)
+        pieces[i] = sum(1 for p in parts if p.strip())
+        first_open[i] = bool(parts[0].strip())
+        last_open[i] = bool(parts[-1].strip())
+        blank[i] = len(parts) == 1 and not first_open[i]
+
+    corpus = TokenizedCorpus(
+        vocab=list(vocab_index),
+        token_ids=np.asarray(ids, dtype=np.int32),
+        verse_offsets=offsets,
+        sentence_pieces=pieces,
+        blank=blank,
+        joins_prev=np.zeros(len(verses), dtype=bool),
+    )
+    prev = corpus.prev_nonblank()
+    has_prev = prev >= 0
+    corpus.joins_prev[has_prev] = first_open[has_prev] & last_open[prev[has_prev]]
+    return corpus
+
+
+def _metrics_from_pairs(corpus, group, tok, n_groups, n_sentences) -> dict[str, np.ndarray]:
+    """Reduce flat (group, token) pairs to per-group metric arrays."""
+    n_tokens = np.bincount(group, minlength=n_groups).astype(np.int64)
+    char_total = np.bincount(group, weights=corpus.word_lengths()[tok], minlength=n_groups)
+
+    vocab_size = max(len(corpus.vocab), 1)
+    keys, counts = np.unique(group.astype(np.int64) * vocab_size + tok, return_counts=True)
+    pair_group = keys // vocab_size
+    n_types = np.bincount(pair_group, minlength=n_groups)
+    n_hapax = np.bincount(pair_group, weights=counts == 1, minlength=n_groups)
+    c_log_c = np.bincount(pair_group, weights=counts * np.log2(counts), minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = np.where(n_tokens > 0,
+                           np.log2(np.maximum(n_tokens, 1)) - c_log_c / np.maximum(n_tokens, 1),
+                           0.0)
+        ttr = np.where(n_tokens > 0, n_types / np.maximum(n_tokens, 1), 0.0)
+        hapax_ratio = np.where(n_types > 0, n_hapax / np.maximum(n_types, 1), 0.0)
+        mean_word = np.where(n_tokens > 0, char_total / np.maximum(n_tokens, 1), 0.0)
+        mean_sentence = np.where(n_sentences > 0, n_tokens / np.maximum(n_sentences, 1), 0.0)
+
+    return {
+        "n_tokens": n_tokens,
+        "n_types": n_types,
+        "n_hapax": n_hapax.astype(np.int64),
+        "n_sentences": n_sentences,
+        "shannon_entropy": entropy,
+        "type_token_ratio": ttr,
+        "hapax_ratio": hapax_ratio,
+        "mean_word_length": mean_word,
+        "mean_sentence_length": mean_sentence,
+    }
+
+
+def group_metrics(corpus: TokenizedCorpus, labels, n_groups: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Metrics for a partition of verses: ``labels[i]`` is verse i's group
+    (e.g. book index, chapter index, genre index).  Groups need not be
+    contiguous, but sentences only continue across verses that are
+    adjacent (ignoring blank verses) in the corpus.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(labels.max()) + 1 if len(labels) else 0
+    group = np.repeat(labels, np.diff(corpus.verse_offsets))
+
+    prev = corpus.prev_nonblank()
+    same = (prev >= 0) & (labels == labels[np.maximum(prev, 0)])
+    n_sentences = (np.bincount(labels, weights=corpus.sentence_pieces, minlength=n_groups)
+                   - np.bincount(labels, weights=corpus.joins_prev & same, minlength=n_groups))
+    return _metrics_from_pairs(corpus, group, corpus.token_ids, n_groups,
+                               n_sentences.astype(np.int64))
+
+
+def range_metrics(corpus: TokenizedCorpus, starts, ends) -> dict[str, np.ndarray]:
+    """
+    Metrics for verse ranges [start, end), which may overlap — e.g. the
+    output of window_ranges for rolling profiles.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    tok_start = corpus.verse_offsets[starts]
+    lengths = corpus.verse_offsets[ends] - tok_start
+
+    group = np.repeat(np.arange(len(starts)), lengths)
+    pos = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    tok = corpus.token_ids[pos + np.repeat(tok_start, lengths)]
+
+    piece_prefix = np.concatenate(([0], np.cumsum(corpus.sentence_pieces, dtype=np.int64)))
+    join_prefix = np.concatenate(([0], np.cumsum(corpus.joins_prev, dtype=np.int64)))
+    # The first non-blank verse of a range joins onto text outside it.
+    first = np.append(corpus.next_nonblank(), corpus.n_verses)[starts]
+    first_joins = np.append(corpus.joins_prev, False)[first] & (first < ends)
+    inner_joins = join_prefix[ends] - join_prefix[starts] - first_joins
+    n_sentences = piece_prefix[ends] - piece_prefix[starts] - inner_joins
+    return _metrics_from_pairs(corpus, group, tok, len(starts), n_sentences)
+
+
+def window_ranges(n_verses: int, size: int, step: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """(starts, ends) of sliding windows of ``size`` verses every ``step`` verses."""
+    step = step or size
+    starts = np.arange(0, max(n_verses - size, 0) + 1, step, dtype=np.int64)
+    return starts, np.minimum(starts + size, n_verses)
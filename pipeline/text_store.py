@@ -0,0 +1,198 @@
+"""
+Canonical verse text storage: one UTF-8 blob per translation plus offsets.
+
+Every other artifact (passages.json, sphere.json, ...) refers to verses by
+ID or [start, end) range and resolves text through this store, so the
+scripture text is staged once per translation instead of once per artifact:
+
+  text_<translation>.txt   verse texts concatenated, no separators
+  text_index.bin           little-endian uint32 byte offsets, one section
+                           of n_verses + 1 entries per translation
+  text_meta.json           translations, section table, blob sizes and sha256
+
+Verse i of a translation is blob[offsets[i]:offsets[i + 1]].decode("utf-8").
+The browser reads it the same way with a TextDecoder over a subarray.
+
+    kjv = TextStore.load(Path("data"), "kjv")
+    kjv[0], kjv.range(0, 5)
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import atomic_open, write_json
+from .instrumentation import record_bytes
+
+TEXT_INDEX_FILE = "text_index.bin"
+TEXT_META_FILE = "text_meta.json"
+TEXT_BLOB_FILE = "text_{name}.txt"
+
+# Translations whose text also lives on the verse records (checked by verify);
+# the others are ingested straight into the store by pipeline/translations.py.
+TEXT_FIELDS = {"kjv": "text"}
+
+
+def _encode_column(texts) -> tuple[bytes, np.ndarray]:
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def _write_blob(data_dir: Path, name: str, texts) -> tuple[dict, np.ndarray]:
+    blob, offsets = _encode_column(texts)
+    if offsets[-1] >= 2 ** 32:
+        raise ValueError(f"{name} text exceeds 4 GiB")
+    blob_file = TEXT_BLOB_FILE.format(name=name)
+    with atomic_open(data_dir / blob_file, "wb") as f:
+        f.write(blob)
+    record_bytes(len(blob))
+    entry = {
+        "file": blob_file,
+        "bytes": len(blob),
+        "sha256": hashlib.sha256(blob).hexdigest(),
+        "n_empty": int(np.count_nonzero(np.diff(offsets) == 0)),
+    }
+    return entry, offsets
+
+
+def _write_index(data_dir: Path, entries: dict, offsets: dict, n_verses: int) -> dict:
+    """Rewrite text_index.bin from per-translation offsets, then text_meta.json."""
+    pos = 0
+    with atomic_open(data_dir / TEXT_INDEX_FILE, "wb") as idx:
+        for name, offs in offsets.items():
+            arr = np.ascontiguousarray(offs, dtype="<u4")
+            idx.write(arr.data)
+            entries[name]["offsets"] = {"offset": pos, "dtype": "uint32", "shape": [len(arr)]}
+            pos += arr.nbytes
+    record_bytes(pos)
+    meta = {"n_verses": n_verses, "index": TEXT_INDEX_FILE, "translations": entries}
+    write_json(data_dir / TEXT_META_FILE, meta)
+    return meta
+
+
+def write_stores(data_dir: Path, columns: dict[str, list[str]]) -> dict:
+    """Write one blob per translation and the shared offset index; returns the meta."""
+    lengths = {len(texts) for texts in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"translations have different verse counts: {sorted(lengths)}")
+    entries, offsets = {}, {}
+    for name, texts in columns.items():
+        entries[name], offsets[name] = _write_blob(data_dir, name, texts)
+    return _write_index(data_dir, entries, offsets, lengths.pop() if lengths else 0)
+
+
+def add_translation(data_dir: Path, name: str, texts: list[str]) -> dict:
+    """
+    Add or replace one translation column.  Only its blob is written; the
+    other translations' blobs are untouched and their offsets are copied.
+    """
+    meta_path = data_dir / TEXT_META_FILE
+    entries, offsets = {}, {}
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["translations"] and meta["n_verses"] != len(texts):
+            raise ValueError(f"{name} has {len(texts)} verses, store has {meta['n_verses']}")
+        for other, entry in meta["translations"].items():
+            if other == name:
+                continue
+            sec = entry.pop("offsets")
+            offsets[other] = np.array(np.memmap(data_dir / meta["index"], dtype="<u4", mode="r",
+                                                offset=sec["offset"], shape=tuple(sec["shape"])))
+            entries[other] = entry
+    entries[name], offsets[name] = _write_blob(data_dir, name, texts)
+    return _write_index(data_dir, entries, offsets, len(texts))
+
+
+class TextStore:
+    """Read-only view of one translation; blob and offsets are memory-mapped."""
+
+    def __init__(self, name: str, blob: np.ndarray, offsets: np.ndarray):
+        self.name = name
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, data_dir: Path, name: str) -> "TextStore":
+        with open(data_dir / TEXT_META_FILE) as f:
+            meta = json.load(f)
+        if name not in meta["translations"]:
+            raise KeyError(f"translation {name!r} not in {TEXT_META_FILE}; "
+                           f"available: {sorted(meta['translations'])}")
+        entry = meta["translations"][name]
+        sec = entry["offsets"]
+        offsets = np.memmap(data_dir / meta["index"], dtype="<u4", mode="r",
+                            offset=sec["offset"], shape=tuple(sec["shape"]))
+        blob_path = data_dir / entry["file"]
+        blob = (np.memmap(blob_path, dtype=np.uint8, mode="r") if entry["bytes"]
+                else np.zeros(0, dtype=np.uint8))
+        return cls(name, blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def range(self, start: int, end: int, sep: str = " ") -> str:
+        """Texts of verses [start, end) joined by ``sep``, skipping empty verses."""
+        return sep.join(t for t in (self[i] for i in range(start, end)) if t)
+
+    def column(self) -> list[str]:
+        """All verse texts, decoded in one pass."""
+        data = bytes(self.blob)
+        offs = self.offsets.tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(offs[:-1], offs[1:])]
+
+
+def verify(data_dir: Path, verses: list[dict] | None = None) -> list[str]:
+    """
+    Check blob hashes, offset monotonicity and verse counts; with ``verses``,
+    also compare every stored text against the verse records.
+    Returns a list of problems (empty when the store is consistent).
+    """
+    with open(data_dir / TEXT_META_FILE) as f:
+        meta = json.load(f)
+    problems = []
+    for name, entry in meta["translations"].items():
+        blob = (data_dir / entry["file"]).read_bytes()
+        if hashlib.sha256(blob).hexdigest() != entry["sha256"]:
+            problems.append(f"{name}: sha256 mismatch for {entry['file']}")
+        store = TextStore.load(data_dir, name)
+        offsets = np.asarray(store.offsets, dtype=np.int64)
+        if offsets[0] != 0 or offsets[-1] != len(blob) or np.any(np.diff(offsets) < 0):
+            problems.append(f"{name}: offsets do not tile the blob")
+            continue
+        if len(store) != meta["n_verses"]:
+            problems.append(f"{name}: {len(store)} verses, expected {meta['n_verses']}")
+        field = TEXT_FIELDS.get(name)
+        if verses is None or field is None:
+            continue
+        expected = _encode_column(v.get(field, "") for v in verses)
+        if expected[0] != blob or not np.array_equal(expected[1], offsets):
+            bad = next((i for i, (v, t) in enumerate(zip(verses, store.column()))
+                        if v.get(field, "") != t), None)
+            problems.append(f"{name}: text differs from verse records"
+                            + (f" (first at verse {bad})" if bad is not None else ""))
+    return problems
+
+
+def run(verses: list[dict], data_dir: Path):
+    print("[texts] Writing canonical text stores...")
+    for name, field in TEXT_FIELDS.items():
+        meta = add_translation(data_dir, name, [v.get(field, "") for v in verses])
+        entry = meta["translations"][name]
+        print(f"  {name}: {entry['bytes'] / 1e6:.1f} MB, {entry['n_empty']} empty verses "
+              f"→ {data_dir / entry['file']}")
+
+    problems = verify(data_dir, verses)
+    if problems:
+        raise RuntimeError("text store verification failed:\n  " + "\n  ".join(problems))
+    print(f"  verified {len(meta['translations'])} translations × {meta['n_verses']} verses")
@@ -0,0 +1,178 @@
+"""
+Translation registry and parallel ingestion into the canonical text store.
+
+Every translation is joined onto the canonical verse order (verses.json)
+through integer verse keys, book_num << 16 | chapter << 8 | verse: the
+source's (book, chapter, verse) triples become one int64 array, and a
+single np.searchsorted against the sorted canonical keys gives each source
+verse its verse ID.  The aligned column is written to the text store
+(text_store.add_translation), so adding a translation writes only its own
+blob and never rewrites verses.json.
+
+Sources are scrollmapper/bible_databases JSON:
+    {"books": [{"name", "chapters": [{"chapter", "verses": [{"verse", "text"}]}]}]}
+"""
+
+import json
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .config import BOOK_NAME_TO_META, TRANSLATIONS_ENABLED
+from .text_store import TEXT_FIELDS, add_translation
+
+_SCROLLMAPPER = "https://raw.githubusercontent.com/scrollmapper/bible_databases/master/sources/en"
+
+TRANSLATIONS = {
+    "bsb": {
+        "label": "Berean Standard Bible",
+        "file": "bsb.json",
+        "url": f"{_SCROLLMAPPER}/BSB/BSB.json",
+    },
+    "asv": {
+        "label": "American Standard Version (1901)",
+        "file": "asv.json",
+        "url": f"{_SCROLLMAPPER}/ASV/ASV.json",
+    },
+    "ylt": {
+        "label": "Young's Literal Translation (1898)",
+        "file": "ylt.json",
+        "url": f"{_SCROLLMAPPER}/YLT/YLT.json",
+    },
+    "web": {
+        "label": "World English Bible",
+        "file": "web.json",
+        "url": f"{_SCROLLMAPPER}/WEB/WEB.json",
+    },
+}
+
+# Source book names → our canonical names (pipeline/config.py); None = not in canon
+_BOOK_ALIASES = {
+    "Psalm": "Psalms",
+    "Song of Songs": "Song of Solomon",
+    "Revelation of John": "Revelation",
+    "I Samuel": "1 Samuel",
+    "II Samuel": "2 Samuel",
+    "I Kings": "1 Kings",
+    "II Kings": "2 Kings",
+    "I Chronicles": "1 Chronicles",
+    "II Chronicles": "2 Chronicles",
+    "I Corinthians": "1 Corinthians",
+    "II Corinthians": "2 Corinthians",
+    "I Thessalonians": "1 Thessalonians",
+    "II Thessalonians": "2 Thessalonians",
+    "I Timothy": "1 Timothy",
+    "II Timothy": "2 Timothy",
+    "I Peter": "1 Peter",
+    "II Peter": "2 Peter",
+    "I John": "1 John",
+    "II John": "2 John",
+    "III John": "3 John",
+    "Sirach": None,
+    "Tobit": None,
+    "Judith": None,
+    "Wisdom": None,
+    "Baruch": None,
+    "1 Maccabees": None,
+    "2 Maccabees": None,
+    "Letter of Jeremiah": None,
+    "Prayer of Azariah": None,
+    "Susanna": None,
+    "Bel and the Dragon": None,
+    "1 Esdras": None,
+    "2 Esdras": None,
+    "Prayer of Manasseh": None,
+}
+
+
+def verse_key(book_num, chapter, verse):
+    """Integer verse key; works on ints or numpy arrays."""
+    return (np.asarray(book_num, dtype=np.int64) << 16) \
+        | (np.asarray(chapter, dtype=np.int64) << 8) | np.asarray(verse, dtype=np.int64)
+
+
+def verse_keys(verses: list[dict]) -> np.ndarray:
+    """Canonical key per verse ID; must be strictly increasing."""
+    keys = np.fromiter(
+        ((v["book_num"] << 16) | (v["chapter"] << 8) | v["verse"] for v in verses),
+        dtype=np.int64, count=len(verses))
+    if np.any(keys[1:] <= keys[:-1]):
+        raise ValueError("verses must be in canonical order (strictly increasing keys)")
+    return keys
+
+
+def _book_num(name: str) -> int | None:
+    name = _BOOK_ALIASES.get(name, name)
+    meta = BOOK_NAME_TO_META.get(name) if name else None
+    return meta["num"] if meta else None
+
+
+def _source_path(name: str, data_dir: Path) -> Path:
+    spec = TRANSLATIONS[name]
+    path = data_dir / spec["file"]
+    if not path.exists():
+        print(f"  Downloading {spec['label']}...")
+        urllib.request.urlretrieve(spec["url"], path)
+    return path
+
+
+def _flatten(data: dict):
+    """(keys, texts) for every canonical-book verse in a scrollmapper source."""
+    nums, chapters, verse_nums, texts = [], [], [], []
+    for book in data["books"]:
+        num = _book_num(book["name"])
+        if num is None:
+            continue
+        for chapter in book["chapters"]:
+            for v in chapter["verses"]:
+                nums.append(num)
+                chapters.append(chapter["chapter"])
+                verse_nums.append(v["verse"])
+                texts.append(v["text"].strip())
+    return verse_key(nums, chapters, verse_nums), texts
+
+
+def align(canonical_keys: np.ndarray, source_keys: np.ndarray, source_texts: list[str]):
+    """
+    Map source verses onto verse IDs.  Returns (column, n_matched) where
+    column[i] is the source text for verse i ("" if the source lacks it).
+    """
+    pos = np.searchsorted(canonical_keys, source_keys)
+    pos_clipped = np.minimum(pos, len(canonical_keys) - 1)
+    hit = canonical_keys[pos_clipped] == source_keys
+    column = np.full(len(canonical_keys), "", dtype=object)
+    column[pos_clipped[hit]] = np.asarray(source_texts, dtype=object)[hit]
+    return column.tolist(), int(np.count_nonzero(column != ""))
+
+
+def ingest(name: str, data_dir: Path, canonical_keys: np.ndarray):
+    """Load one translation and align it; runs in a worker process."""
+    with open(_source_path(name, data_dir), encoding="utf-8") as f:
+        data = json.load(f)
+    source_keys, texts = _flatten(data)
+    column, matched = align(canonical_keys, source_keys, texts)
+    return name, column, len(texts), matched
+
+
+def run(verses: list[dict], data_dir: Path, names=TRANSLATIONS_ENABLED,
+        workers: int | None = None):
+    print(f"[translations] Ingesting {', '.join(names)}...")
+    unknown = [n for n in names if n not in TRANSLATIONS]
+    if unknown:
+        raise ValueError(f"Unknown translations {unknown}; available: {sorted(TRANSLATIONS)}")
+    clashes = [n for n in names if n in TEXT_FIELDS]
+    if clashes:
+        raise ValueError(f"{clashes} are stored from the verse records, not ingested")
+
+    keys = verse_keys(verses)
+    workers = workers or min(len(names), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingest, n, data_dir, keys) for n in names]
+        for fut in futures:
+            name, column, n_source, matched = fut.result()
+            entry = add_translation(data_dir, name, column)["translations"][name]
+            print(f"  {name}: {n_source} source verses, {matched} / {len(verses)} matched "
+                  f"({100 * matched / len(verses):.1f}%) → {data_dir / entry['file']}")
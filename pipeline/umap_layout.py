@@ -0,0 +1,195 @@
+"""
+UMAP fitting shared by the 2D map (step 2) and the 3D sphere (step 5).
+
+Two execution modes (config.UMAP_MODE):
+
+  reproducible  random_state=UMAP_RANDOM_STATE; umap-learn then runs its
+                SGD single-threaded, so reruns are bit-identical.
+  fast          no random_state, n_jobs=UMAP_N_JOBS.  Everything before
+                the SGD is made deterministic instead: the kNN graph is
+                computed exactly in row shards (ties broken by index) and
+                the layout starts from a sign-fixed PCA projection, so
+                runs differ only by parallel SGD scheduling.
+
+Fast layouts are not identical between runs, so stability() compares two
+layouts by Procrustes disparity (after optimal translation, scaling and
+rotation) and by how many of each point's low-dimensional neighbours are
+shared.  The CLI fits fresh layouts and checks both figures against the
+config thresholds:
+
+    python -m pipeline.umap_layout --data data --mode fast --components 2
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .centroids import normalize_rows
+from .config import (
+    EMBEDDINGS_FILE, UMAP_FILE, UMAP_METRIC, UMAP_MIN_DIST, UMAP_MODE, UMAP_MODES, UMAP_N_JOBS,
+    UMAP_N_NEIGHBORS, UMAP_RANDOM_STATE,
+    UMAP_STABILITY_MAX_DISPARITY, UMAP_STABILITY_MIN_PRESERVATION,
+)
+from .instrumentation import span
+
+KNN_SHARD_ROWS = 512
+PCA_INIT_SCALE = 10.0  # same spread umap-learn gives its own "pca" init
+STABILITY_SAMPLE = 2000
+
+
+def exact_knn(normed: np.ndarray, k: int, shard_rows: int = KNN_SHARD_ROWS):
+    """
+    Exact cosine kNN of L2-normalised rows, one shard of rows at a time.
+    Each row's own index comes first (distance 0), as umap-learn expects.
+    Returns (indices int32 (n, k), cosine distances float32 (n, k)).
+    """
+    n = len(normed)
+    k = min(k, n)
+    indices = np.empty((n, k), dtype=np.int32)
+    dists = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, shard_rows):
+        end = min(start + shard_rows, n)
+        sims = normed[start:end] @ normed.T
+        rows = np.arange(end - start)
+        sims[rows, rows + start] = np.inf  # self first
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        part.sort(axis=1)  # stable tie order: by index, then similarity
+        order = np.argsort(-np.take_along_axis(sims, part, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(part, order, axis=1)
+        indices[start:end] = top
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        top_sims[:, 0] = 1.0
+        dists[start:end] = np.clip(1.0 - top_sims, 0.0, 2.0)
+    return indices, dists
+
+
+def pca_init(embeddings: np.ndarray, n_components: int) -> np.ndarray:
+    """Deterministic PCA projection, sign-fixed and scaled like umap's pca init."""
+    x = np.asarray(embeddings, dtype=np.float64)
+    x = x - x.mean(axis=0)
+    _, vecs = np.linalg.eigh(x.T @ x)
+    vecs = vecs[:, ::-1][:, :n_components]
+    # Eigenvector signs are arbitrary; make each one's largest entry positive
+    flip = np.sign(vecs[np.abs(vecs).argmax(axis=0), np.arange(n_components)])
+    coords = x @ (vecs * flip)
+    return (coords * (PCA_INIT_SCALE / np.abs(coords).max())).astype(np.float32)
+
+
+def fit_umap(embeddings: np.ndarray, n_components: int, mode: str = UMAP_MODE,
+             n_neighbors: int = UMAP_N_NEIGHBORS, min_dist: float = UMAP_MIN_DIST,
+             n_jobs: int = UMAP_N_JOBS) -> np.ndarray:
+    """Fit UMAP in the given mode; returns (n, n_components) coordinates."""
+    if mode not in UMAP_MODES:
+        raise ValueError(f"Unknown UMAP mode {mode!r}; available: {UMAP_MODES}")
+    import umap
+
+    params = dict(n_components=n_components, n_neighbors=n_neighbors,
+                  min_dist=min_dist, metric=UMAP_METRIC)
+    if mode == "reproducible":
+        reducer = umap.UMAP(**params, random_state=UMAP_RANDOM_STATE)
+    else:
+        with span("knn", items=len(embeddings), k=n_neighbors):
+            knn = exact_knn(normalize_rows(embeddings), n_neighbors)
+        reducer = umap.UMAP(**params, n_jobs=n_jobs, init=pca_init(embeddings, n_components),
+                            precomputed_knn=(*knn, None))
+    with span("umap_fit", items=len(embeddings), n_components=n_components, mode=mode):
+        return reducer.fit_transform(embeddings)
+
+
+def procrustes_disparity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Sum of squared differences after aligning b to a by translation, uniform
+    scaling and rotation/reflection, both scaled to unit norm (0 = same shape,
+    1 = unrelated); matches scipy.spatial.procrustes.
+    """
+    a = np.asarray(a, dtype=np.float64) - np.mean(a, axis=0)
+    b = np.asarray(b, dtype=np.float64) - np.mean(b, axis=0)
+    a /= np.linalg.norm(a)
+    b /= np.linalg.norm(b)
+    s = np.linalg.svd(a.T @ b, compute_uv=False)
+    return float(max(0.0, 1.0 - s.sum() ** 2))
+
+
+def neighbor_preservation(a: np.ndarray, b: np.ndarray, k: int = UMAP_N_NEIGHBORS,
+                          sample: int = STABILITY_SAMPLE, seed: int = 0) -> float:
+    """Mean fraction of each sampled point's k Euclidean neighbours in a also found in b."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    n = len(a)
+    rows = np.random.default_rng(seed).choice(n, size=min(sample, n), replace=False)
+
+    def knn(x):
+        sq = (x * x).sum(axis=1)
+        out = np.empty((len(rows), k), dtype=np.int64)
+        for start in range(0, len(rows), KNN_SHARD_ROWS):
+            r = rows[start:start + KNN_SHARD_ROWS]
+            d = sq[r, None] - 2 * x[r] @ x.T + sq[None, :]
+            d[np.arange(len(r)), r] = np.inf
+            out[start:start + len(r)] = np.argpartition(d, k, axis=1)[:, :k]
+        return out
+
+    na, nb = knn(a), knn(b)
+    shared = [len(np.intersect1d(x, y, assume_unique=True)) for x, y in zip(na, nb)]
+    return float(np.mean(shared) / k)
+
+
+def stability(a: np.ndarray, b: np.ndarray, k: int = UMAP_N_NEIGHBORS) -> dict:
+    return {
+        "procrustes_disparity": round(procrustes_disparity(a, b), 4),
+        "neighbor_preservation": round(neighbor_preservation(a, b, k), 4),
+    }
+
+
+def _reference_layout(data_dir: Path, n_components: int):
+    if n_components == 2 and (data_dir / UMAP_FILE).exists():
+        with open(data_dir / UMAP_FILE) as f:
+            return np.array(json.load(f), dtype=np.float32), UMAP_FILE
+    if n_components == 3 and (data_dir / "umap3d.npy").exists():
+        return np.load(data_dir / "umap3d.npy"), "umap3d.npy"
+    return None, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit UMAP twice and check layout stability")
+    parser.add_argument("--data", type=Path, default=Path("data"))
+    parser.add_argument("--mode", choices=UMAP_MODES, default="fast")
+    parser.add_argument("--components", type=int, choices=(2, 3), default=2)
+    parser.add_argument("--runs", type=int, default=2, help="Fresh fits to compare (>= 2)")
+    parser.add_argument("--max-disparity", type=float, default=UMAP_STABILITY_MAX_DISPARITY)
+    parser.add_argument("--min-preservation", type=float, default=UMAP_STABILITY_MIN_PRESERVATION)
+    args = parser.parse_args(argv)
+
+    embeddings = np.load(args.data / EMBEDDINGS_FILE)
+    print(f"[umap] {args.runs} × {args.mode} {args.components}D fits on {len(embeddings)} points...")
+    layouts = []
+    for i in range(max(args.runs, 2)):
+        t0 = time.perf_counter()
+        layouts.append(fit_umap(embeddings, args.components, args.mode))
+        print(f"  run {i + 1}: {time.perf_counter() - t0:.1f} s")
+
+    pairs = [(f"run 1 vs run {i + 1}", layouts[0], layouts[i]) for i in range(1, len(layouts))]
+    reference, ref_name = _reference_layout(args.data, args.components)
+    if reference is not None and len(reference) == len(embeddings):
+        pairs.append((f"run 1 vs {ref_name}", layouts[0], reference))
+
+    failed = False
+    for label, a, b in pairs:
+        s = stability(a, b)
+        ok = (s["procrustes_disparity"] <= args.max_disparity
+              and s["neighbor_preservation"] >= args.min_preservation)
+        failed |= not ok
+        print(f"  {label}: disparity {s['procrustes_disparity']:.4f}, "
+              f"{UMAP_N_NEIGHBORS}-NN preserved {100 * s['neighbor_preservation']:.1f}%"
+              f"{'' if ok else '  ← unstable'}")
+    if failed:
+        print(f"  [fail] thresholds: disparity <= {args.max_disparity}, "
+              f"preservation >= {args.min_preservation}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
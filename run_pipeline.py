@@ -6,108 +6,104 @@ calculates metrics, builds the homepage sphere, and stages JSON.
 
 Usage:
     python run_pipeline.py            # full pipeline
-    python run_pipeline.py --step 2   # run only step N (1-6)
+    python run_pipeline.py --step 2   # run only step N (see --list)
+    python run_pipeline.py --clauses  # also build clause-level search vectors (step 11)
+    python run_pipeline.py --profile  # also write cProfile/tracemalloc reports per step
+    python run_pipeline.py --list     # list steps (imports nothing heavy)
+    python run_pipeline.py --import-report --step 2   # -X importtime breakdown
+
+Step modules are imported only when their step runs (pipeline/steps.py),
+so staging and metadata commands start without numpy or the models.
+
+Every run writes a span trace (data/trace.jsonl: duration, peak RSS,
+items/sec and artifact bytes per step and sub-phase) and prints a summary.
 """
 
 import argparse
 import json
-import shutil
 from pathlib import Path
 
-from pipeline import (
-    fetch_data, compute_embeddings, extract_entities,
-    compute_metrics, compute_sphere, compute_search, compute_passages,
-    fetch_bsb,
-)
-from pipeline.config import VERSES_FILE
+from pipeline import instrumentation
+from pipeline.config import CLAUSE_SEARCH, UMAP_MODE, UMAP_MODES, VERSES_FILE
+from pipeline.steps import STEP_BY_NUMBER, STEPS, selected
 
 
 DATA_DIR = Path("data")
-SITE_DATA_DIR = Path("site") / "data"
-
-
-def stage_for_site(data_dir: Path, site_dir: Path):
-    """Copy final JSON artifacts into site/data/ for the frontend."""
-    print("[6/6] Staging data for site...")
-    site_dir.mkdir(parents=True, exist_ok=True)
-
-    artifacts = [
-        "verses.json",
-        "umap_coords.json",
-        "neighbors.json",
-        "graph.json",
-        "metrics.json",
-        "heatmap.json",
-        "hapax.json",
-        "sphere.json",
-        "search_embeddings.bin",
-        "search_meta.json",
-        "passages.json",
-        "passage_embeddings.bin",
-        "passage_meta.json",
-        "bsb_verses.json",
-    ]
-
-    for name in artifacts:
-        src = data_dir / name
-        dst = site_dir / name
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"  {src} → {dst}")
-        else:
-            print(f"  [warn] {src} not found, skipping")
-
-    print("Done. Serve site/ with any static server to view the project.")
+TRACE_FILE = DATA_DIR / "trace.jsonl"
+PROFILE_DIR = DATA_DIR / "profile"
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run the Bible Mapped pipeline")
-    parser.add_argument("--step", type=int, default=0,
-                        help="Run only step N (1=fetch, 2=embed, 3=entities, "
-                             "4=metrics, 5=sphere, 6=stage, 7=search, 8=passages, 9=bsb)")
+    parser.add_argument("--step", type=int, default=0, metavar="N",
+                        choices=[0, *sorted(STEP_BY_NUMBER)],
+                        help="Run only step N (" + ", ".join(
+                            f"{s.number}={s.name}" for s in sorted(STEPS, key=lambda s: s.number))
+                        + ")")
+    parser.add_argument("--list", action="store_true", help="List the steps and exit")
+    parser.add_argument("--import-report", action="store_true",
+                        help="Print an -X importtime breakdown of the selected steps' modules and exit")
+    parser.add_argument("--trace", type=Path, default=TRACE_FILE,
+                        help=f"JSONL span trace (default {TRACE_FILE})")
+    parser.add_argument("--profile", nargs="?", type=Path, const=PROFILE_DIR, default=None,
+                        metavar="DIR",
+                        help=f"Write cProfile/tracemalloc reports per step (default dir {PROFILE_DIR})")
+    parser.add_argument("--umap-mode", choices=UMAP_MODES, default=UMAP_MODE,
+                        help="fast = parallel, non-deterministic UMAP for development builds")
+    parser.add_argument("--clauses", action="store_true", default=CLAUSE_SEARCH,
+                        help="Build clause-level search vectors (step 11; implied by --step 11)")
     args = parser.parse_args()
 
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-    def load_verses():
-        vpath = DATA_DIR / VERSES_FILE
-        if vpath.exists():
-            with open(vpath) as f:
-                return json.load(f)
-        return None
-
-    if args.step == 0 or args.step == 1:
-        verses = fetch_data.run(DATA_DIR)
-    else:
-        verses = load_verses()
-
-    if verses is None:
-        print("No verse data found. Run step 1 first: python run_pipeline.py --step 1")
+    steps = selected(args.step)
+    if args.list:
+        for s in STEPS:
+            print(f"  {s.number:>2}  {s.name:<13} {s.description}")
+        return
+    if args.import_report:
+        instrumentation.print_import_report([s.module for s in steps])
         return
 
-    if args.step == 0 or args.step == 2:
-        compute_embeddings.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 3:
-        extract_entities.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 4:
-        compute_metrics.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 9:
-        verses = fetch_bsb.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 5:
-        compute_sphere.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 7:
-        compute_search.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 8:
-        compute_passages.run(verses, DATA_DIR)
-
-    if args.step == 0 or args.step == 6:
-        stage_for_site(DATA_DIR, SITE_DATA_DIR)
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    instrumentation.start(args.trace, args.profile)
+    try:
+        _run_steps(steps, {"umap_mode": args.umap_mode,
+                           "clauses": args.clauses or args.step == 11})
+    finally:
+        tracer = instrumentation.stop()
+        tracer.print_summary()
+        print(f"  trace → {args.trace}" + (f", profiles → {args.profile}" if args.profile else ""))
+
+
+def _load_verses():
+    vpath = DATA_DIR / VERSES_FILE
+    if vpath.exists():
+        with open(vpath) as f:
+            return json.load(f)
+    return None
+
+
+def _run_steps(steps, options: dict):
+    verses = None
+    for step in steps:
+        if step.needs_verses and verses is None:
+            verses = _load_verses()
+            if verses is None:
+                print("No verse data found. Run step 1 first: python run_pipeline.py --step 1")
+                return
+
+        with instrumentation.span(step.name) as s:
+            with instrumentation.span("import", module=step.module) as imp:
+                fn, _seconds, loaded = step.load()
+                imp.attrs["modules_loaded"] = loaded
+            kwargs = {k: options[k] for k in step.options}
+            if step.needs_verses:
+                s.items = len(verses)
+                fn(verses, DATA_DIR, **kwargs)
+            else:
+                result = fn(DATA_DIR, **kwargs)
+                if step.provides_verses:
+                    verses = result
+                    s.items = len(verses)
 
 
 if __name__ == "__main__":
@@ -4,10 +4,55 @@
 
 const DATA_BASE = 'data/';
 
-async function loadJSON(filename) {
-  const resp = await fetch(DATA_BASE + filename);
+// asset_manifest.json (pipeline/stage_site.py) maps each staged artifact to
+// a content-hashed copy that can be cached forever, with its SRI hash.
+// Artifacts missing from the manifest (or no manifest at all) are fetched
+// by their plain name, query string included.
+let assetManifestPromise = null;
+async function fetchAsset(filename) {
+  assetManifestPromise = assetManifestPromise || fetch(DATA_BASE + 'asset_manifest.json')
+    .then(r => (r.ok ? r.json() : null)).catch(() => null);
+  const manifest = await assetManifestPromise;
+  const entry = manifest && manifest.assets[filename.split('?')[0]];
+  const resp = entry
+    ? await fetch(DATA_BASE + entry.url, { integrity: entry.integrity })
+    : await fetch(DATA_BASE + filename);
   if (!resp.ok) throw new Error(`Failed to load ${filename}: ${resp.status}`);
-  return resp.json();
+  return resp;
+}
+
+async function loadJSON(filename) {
+  return (await fetchAsset(filename)).json();
+}
+
+async function loadBuffer(filename) {
+  return (await fetchAsset(filename)).arrayBuffer();
+}
+
+// Canonical verse text (pipeline/text_store.py): one UTF-8 blob per
+// translation plus uint32 byte offsets. Resolves to one string per verse.
+// Data built before the text store has no text_meta.json: KJV text is then
+// inline in sphere.json points and passages.json records (resolves to null)
+// and BSB comes from the old bsb_verses.json array.
+const LEGACY_TEXT_FILES = { bsb: 'bsb_verses.json' };
+let textMetaPromise = null;
+let textIndexPromise = null;
+async function loadTexts(name) {
+  textMetaPromise = textMetaPromise || loadJSON('text_meta.json').catch(() => null);
+  const meta = await textMetaPromise;
+  if (!meta) return LEGACY_TEXT_FILES[name] ? loadJSON(LEGACY_TEXT_FILES[name]) : null;
+  const entry = meta.translations[name];
+  if (!entry) throw new Error(`Translation ${name} not available`);
+  textIndexPromise = textIndexPromise || loadBuffer(meta.index);
+  const [blob, index] = await Promise.all([loadBuffer(entry.file), textIndexPromise]);
+  const offsets = new Uint32Array(index, entry.offsets.offset, entry.offsets.shape[0]);
+  const bytes = new Uint8Array(blob);
+  const decoder = new TextDecoder();
+  const texts = new Array(offsets.length - 1);
+  for (let i = 0; i < texts.length; i++) {
+    texts[i] = decoder.decode(bytes.subarray(offsets[i], offsets[i + 1]));
+  }
+  return texts;
 }
 
 function setLoading(containerId, loading) {
@@ -8,18 +8,21 @@
 
 (async function () {
   const isMobileDevice = window.innerWidth <= 800;
-  const data = await loadJSON('sphere.json?v=' + Date.now());
+  const [data, kjvTexts] = await Promise.all([
+    loadJSON('sphere.json?v=' + Date.now()), loadTexts('kjv'),
+  ]);
   const pts = data.points;
+  if (kjvTexts) pts.forEach((p, i) => { p.text = kjvTexts[i]; });
   const stats = data.stats;
 
-  // BSB translations loaded lazily (separate file to keep sphere.json lean)
+  // BSB translations loaded lazily from the shared text store
   let bsbVerses = null;
   let bsbLoading = false;
   async function loadBsb() {
     if (bsbVerses) return bsbVerses;
     if (bsbLoading) { while (!bsbVerses) await new Promise(r => setTimeout(r, 50)); return bsbVerses; }
     bsbLoading = true;
-    try { bsbVerses = await loadJSON('bsb_verses.json?v=' + Date.now()); }
+    try { bsbVerses = await loadTexts('bsb'); }
     catch (e) { console.warn('BSB translations not available', e); bsbVerses = []; }
     return bsbVerses;
   }
@@ -510,6 +513,7 @@
   let verseEmbU8 = null;
   let passageEmbU8 = null;
   let passageData = null;
+  let passageGraph = null;
   let searchPipeline = null;
   let searchReady = false;
   let searchLoading = false;
@@ -555,17 +559,14 @@
     showSearchLoading();
 
     try {
-      const embResp = fetch('data/search_embeddings.bin').then(r => {
-        if (!r.ok) throw new Error('search_embeddings.bin: ' + r.status);
-        return r.arrayBuffer();
-      });
-      const passEmbResp = fetch('data/passage_embeddings.bin').then(r => {
-        if (!r.ok) throw new Error('passage_embeddings.bin: ' + r.status);
-        return r.arrayBuffer();
-      });
-      const passJsonResp = fetch('data/passages.json').then(r => {
-        if (!r.ok) throw new Error('passages.json: ' + r.status);
-        return r.json();
+      const embResp = loadBuffer('search_embeddings.bin');
+      const passEmbResp = loadBuffer('passage_embeddings.bin');
+      const passJsonResp = loadJSON('passages.json');
+
+      // Precomputed passage neighbour graph (optional: related passages only)
+      const graphResp = loadPassageGraph().catch(err => {
+        console.warn('Passage graph unavailable:', err);
+        return null;
       });
 
       const [embBuf, passEmbBuf, passJson, bsbJson, transformers] = await Promise.all([
@@ -575,6 +576,18 @@
       verseEmbU8 = new Uint8Array(embBuf);
       passageEmbU8 = new Uint8Array(passEmbBuf);
       passageData = passJson;
+      // Passage records carry verse IDs only; join their text from the stores
+      // (older passages.json files still have it inline)
+      for (const psg of passageData) {
+        if (psg.text === undefined) {
+          psg.text = psg.verse_ids.map(vi => pts[vi] ? pts[vi].text : '').filter(Boolean).join(' ');
+        }
+        if (psg.text_bsb === undefined) {
+          const bsbJoined = psg.verse_ids.map(vi => bsbJson[vi] || '').filter(Boolean).join(' ');
+          if (bsbJoined) psg.text_bsb = bsbJoined;
+        }
+      }
+      passageGraph = await graphResp;
 
       transformers.env.allowLocalModels = true;
       transformers.env.allowRemoteModels = false;
@@ -600,6 +613,36 @@
     }
   }
 
+  // Sections of passage_graph.bin are described in passage_meta.json
+  async function loadPassageGraph() {
+    const meta = await loadJSON('passage_meta.json');
+    if (!meta.graph) return null;
+    const buf = await loadBuffer(meta.graph.file);
+    const sec = meta.graph.sections;
+    const view = (name, Type) => new Type(buf, sec[name].offset,
+      sec[name].shape.reduce((a, b) => a * b, 1));
+    return {
+      k: meta.graph.k,
+      missing: meta.graph.missing_id ?? 0xFFFFFFFF,
+      ids: view('neighbor_ids', Uint32Array),
+      sims: view('neighbor_sims', Uint8Array),
+    };
+  }
+
+  // Related passages: a row lookup in the precomputed k-NN table
+  function relatedPassages(pid, n) {
+    if (!passageGraph || pid == null || !passageData) return [];
+    const { k, missing, ids, sims } = passageGraph;
+    const out = [];
+    for (let j = 0; j < Math.min(n, k); j++) {
+      // Rows with fewer than k candidates are padded at the end
+      if (ids[pid * k + j] === missing) break;
+      const psg = passageData[ids[pid * k + j]];
+      if (psg) out.push({ psg, score: sims[pid * k + j] / 127.5 - 1.0 });
+    }
+    return out;
+  }
+
   // Encode query → normalised float32 embedding
   async function embedQuery(text) {
     const output = await searchPipeline(text, { pooling: 'mean', normalize: true });
@@ -706,7 +749,7 @@
         const kjvFull = psg.text.replace(/"/g, '&quot;');
         const rawPreview = activeTrans === 'bsb' && psg.text_bsb ? psg.text_bsb : psg.text;
         const preview = rawPreview.length > 200 ? rawPreview.slice(0, 200) + '\u2026' : rawPreview;
-        return `<div class="sr-item" data-verse-ids='${vids}' data-ref="${psg.ref}" data-title="${psg.title.replace(/"/g, '&quot;')}" data-passage-kjv="${kjvFull}" data-passage-bsb="${bsbFull}" data-mode="passage" style="cursor:pointer;animation-delay:${i * 0.04}s;">` +
+        return `<div class="sr-item" data-verse-ids='${vids}' data-ref="${psg.ref}" data-title="${psg.title.replace(/"/g, '&quot;')}" data-passage-id="${psg.id}" data-passage-kjv="${kjvFull}" data-passage-bsb="${bsbFull}" data-mode="passage" style="cursor:pointer;animation-delay:${i * 0.04}s;">` +
           `<span class="sr-ref">${i + 1}. ${psg.ref}</span><span class="sr-score" title="Cosine similarity">${m.score.toFixed(3)}</span>` +
           `<span class="sr-title">${psg.title}</span>` +
           `<span class="sr-passage-text">${preview}</span>` +
@@ -779,6 +822,7 @@
   const modalTitle = document.getElementById('passage-modal-title');
   const modalBody = document.getElementById('passage-modal-body');
   const modalBodyBsb = document.getElementById('passage-modal-body-bsb');
+  const modalRelated = document.getElementById('pm-related');
   const pmKjvBtn = document.getElementById('pm-kjv');
   const pmBsbBtn = document.getElementById('pm-bsb');
   let pmTrans = 'kjv';
@@ -826,6 +870,13 @@
     currentModalBookNum = passageBookNum;
     currentModalRefs = passageRefs;
 
+    const related = relatedPassages(item.dataset.passageId ? Number(item.dataset.passageId) : null, 5);
+    modalRelated.innerHTML = related.length
+      ? '<div class="pm-related-label">Related passages</div>' + related.map(r =>
+          `<span class="pm-related-item" data-passage-id="${r.psg.id}" title="Cosine similarity ${r.score.toFixed(3)}">` +
+          `<span class="pm-related-ref">${r.psg.ref}</span>${r.psg.title}</span>`).join('')
+      : '';
+
     pmTrans = activeTrans;
     pmKjvBtn.classList.toggle('active', pmTrans === 'kjv');
     pmBsbBtn.classList.toggle('active', pmTrans === 'bsb');
@@ -835,6 +886,15 @@
     modalOverlay.classList.add('open');
   }
 
+  modalRelated.addEventListener('click', (e) => {
+    const el = e.target.closest('.pm-related-item');
+    if (!el) return;
+    const psg = passageData[Number(el.dataset.passageId)];
+    openPassageModal({ dataset: {
+      verseIds: JSON.stringify(psg.verse_ids), ref: psg.ref, title: psg.title, passageId: String(psg.id),
+    } });
+  });
+
   document.getElementById('passage-modal-close').addEventListener('click', () => {
     modalOverlay.classList.remove('open');
   });
@@ -2244,14 +2304,10 @@
     const resp = await fetch(WORKER_URL, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ messages: msgs, temperature: 0.7 }),
+      body: JSON.stringify({ messages: msgs, temperature: 0.7, stream: true }),
     });
-    const text = await resp.text();
-    if (!resp.ok) throw new Error('Worker ' + resp.status + ': ' + text);
-    let data;
-    try { data = JSON.parse(text); } catch (e) { throw new Error('Invalid JSON: ' + text.slice(0, 200)); }
-    const content = data.choices?.[0]?.message?.content || '';
-    if (content) onDelta(content);
+    if (!resp.ok) throw new Error('Worker ' + resp.status + ': ' + await resp.text());
+    await readSSE(resp, onDelta);
   }
 
   async function streamOpenAI(msgs, key, onDelta) {
@@ -2261,6 +2317,10 @@
       body: JSON.stringify({ model: 'gpt-4o-mini', messages: msgs, stream: true }),
     });
     if (!resp.ok) throw new Error(await resp.text());
+    await readSSE(resp, onDelta);
+  }
+
+  async function readSSE(resp, onDelta) {
     const reader = resp.body.getReader();
     const decoder = new TextDecoder();
     let buf = '';
@@ -2905,6 +2965,8 @@
     const ntList = document.getElementById('rv-nt-list');
     if (otList && ntList) {
       for (const rv of data.representative_verses) {
+        // Text resolved by verse ID like the points (older sphere.json has it inline)
+        if (rv.text === undefined) rv.text = pts[rv.verse_id] ? pts[rv.verse_id].text : '';
         const card = document.createElement('div');
         card.className = 'rv-card';
         card.dataset.book = rv.book.toLowerCase();
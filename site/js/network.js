@@ -1,5 +1,8 @@
 /**
  * Entity Network — D3 force-directed graph with interactive filters.
+ * Node positions are precomputed by the pipeline (graph.json x/y), so the
+ * graph renders immediately; the live simulation only runs once the user
+ * changes the repulsion strength.
  */
 
 (async function () {
@@ -15,8 +18,10 @@
   const container = document.getElementById('graph-container');
   const tooltip = document.getElementById('graph-tooltip');
   let width, height;
-  let simulation, svg, g, linkGroup, nodeGroup, labelGroup;
+  let simulation, svg, g, linkGroup, nodeGroup, labelGroup, ticked;
   let currentNodes = [], currentLinks = [];
+  // Precomputed layout until the user asks for a live simulation
+  let live = !graphData.nodes.every(n => n.x != null && n.y != null);
 
   function initSVG() {
     container.innerHTML = '';
@@ -132,24 +137,49 @@
       .attr('dy', d => -radiusScale(d.count) - 4)
       .attr('pointer-events', 'none');
 
+    ticked = () => {
+      allLinks
+        .attr('x1', d => d.source.x)
+        .attr('y1', d => d.source.y)
+        .attr('x2', d => d.target.x)
+        .attr('y2', d => d.target.y);
+      allNodes
+        .attr('cx', d => d.x)
+        .attr('cy', d => d.y);
+      allLabels
+        .attr('x', d => d.x)
+        .attr('y', d => d.y);
+    };
+
+    if (!live) {
+      placePrecomputed(nodes, links);
+      simulation = null;
+      ticked();
+      return;
+    }
+
     simulation = d3.forceSimulation(nodes)
       .force('link', d3.forceLink(links).id(d => d.id).distance(80))
       .force('charge', d3.forceManyBody().strength(charge))
       .force('center', d3.forceCenter(width / 2, height / 2))
       .force('collision', d3.forceCollide().radius(d => radiusScale(d.count) + 2))
-      .on('tick', () => {
-        allLinks
-          .attr('x1', d => d.source.x)
-          .attr('y1', d => d.source.y)
-          .attr('x2', d => d.target.x)
-          .attr('y2', d => d.target.y);
-        allNodes
-          .attr('cx', d => d.x)
-          .attr('cy', d => d.y);
-        allLabels
-          .attr('x', d => d.x)
-          .attr('y', d => d.y);
-      });
+      .on('tick', ticked);
+  }
+
+  // Fit the pipeline's layout coordinates to the viewport and resolve link ends
+  function placePrecomputed(nodes, links) {
+    const pad = 40;
+    const [x0, x1] = d3.extent(nodes, d => d.x);
+    const [y0, y1] = d3.extent(nodes, d => d.y);
+    const scale = Math.min((width - 2 * pad) / ((x1 - x0) || 1),
+                           (height - 2 * pad) / ((y1 - y0) || 1));
+    const ox = (width - (x1 - x0) * scale) / 2, oy = (height - (y1 - y0) * scale) / 2;
+    nodes.forEach(d => {
+      d.x = ox + (d.x - x0) * scale;
+      d.y = oy + (d.y - y0) * scale;
+    });
+    const byId = new Map(nodes.map(d => [d.id, d]));
+    links.forEach(l => { l.source = byId.get(l.source); l.target = byId.get(l.target); });
   }
 
   function highlightConnections(d) {
@@ -202,6 +232,11 @@
         <span class="mono">${d.count}</span> mentions across
         <span class="mono">${d.books.length}</span> books
       </div>
+      ${d.pagerank != null ? `<div class="small dim" style="margin-bottom:0.75rem;">
+        Degree <span class="mono">${d.degree}</span> ·
+        PageRank <span class="mono">${(d.pagerank * 100).toFixed(2)}%</span> ·
+        Betweenness <span class="mono">${d.betweenness.toFixed(3)}</span>
+      </div>` : ''}
       <div class="small dim" style="margin-bottom:1rem;">
         Books: ${d.books.slice(0, 12).join(', ')}${d.books.length > 12 ? '…' : ''}
       </div>
@@ -216,15 +251,23 @@
   }
 
   function dragStart(event, d) {
+    if (!simulation) return;
     if (!event.active) simulation.alphaTarget(0.3).restart();
     d.fx = d.x;
     d.fy = d.y;
   }
   function dragging(event, d) {
+    if (!simulation) {
+      d.x = event.x;
+      d.y = event.y;
+      ticked();
+      return;
+    }
     d.fx = event.x;
     d.fy = event.y;
   }
   function dragEnd(event, d) {
+    if (!simulation) return;
     if (!event.active) simulation.alphaTarget(0);
     d.fx = null;
     d.fy = null;
@@ -242,7 +285,10 @@
     render();
   });
   document.getElementById('type-filter').addEventListener('change', render);
-  document.getElementById('charge-strength').addEventListener('input', render);
+  document.getElementById('charge-strength').addEventListener('input', () => {
+    live = true;
+    render();
+  });
 
   initSVG();
   render();
@@ -0,0 +1,82 @@
+// Checks the chat worker against worker/fake_upstream.mjs, no API key needed:
+//
+//   node test_worker.mjs
+//
+// Two identical streaming requests go through the worker's fetch handler:
+// the first must be a MISS whose SSE bytes match the upstream's exactly,
+// the second a HIT that never reaches the upstream and replays the same answer.
+import assert from 'node:assert/strict';
+import { spawn } from 'node:child_process';
+import fs from 'node:fs';
+import net from 'node:net';
+
+const ORIGIN = 'https://gregory-kyro.github.io';
+
+// worker/index.js is an ES module in a CommonJS package; load it from source
+const source = fs.readFileSync(new URL('./worker/index.js', import.meta.url), 'utf8');
+const worker = (await import('data:text/javascript,' + encodeURIComponent(source))).default;
+
+function freePort() {
+  return new Promise((resolve, reject) => {
+    const srv = net.createServer().listen(0, '127.0.0.1', () => {
+      const { port } = srv.address();
+      srv.close(() => resolve(port));
+    }).on('error', reject);
+  });
+}
+
+async function startUpstream() {
+  const port = await freePort();
+  const proc = spawn(process.execPath, [new URL('./worker/fake_upstream.mjs', import.meta.url).pathname, String(port)]);
+  await new Promise((resolve, reject) => {
+    proc.stdout.on('data', d => { if (String(d).includes('fake upstream on')) resolve(); });
+    proc.on('exit', code => reject(new Error(`fake upstream exited with ${code}`)));
+  });
+  return { proc, url: `http://127.0.0.1:${port}` };
+}
+
+function sseContent(text) {
+  return text.split('\n')
+    .filter(line => line.startsWith('data: ') && line.slice(6).trim() !== '[DONE]')
+    .map(line => JSON.parse(line.slice(6)).choices[0].delta.content || '')
+    .join('');
+}
+
+const upstream = await startUpstream();
+try {
+  const env = { UPSTREAM_URL: upstream.url, GROQ_API_KEY: 'test' };
+  const payload = JSON.stringify({
+    messages: [{ role: 'user', content: 'Who wrote the book of Acts?' }],
+    temperature: 0.2,
+    stream: true,
+  });
+  const ask = () => worker.fetch(new Request('http://worker.test/', {
+    method: 'POST',
+    headers: { Origin: ORIGIN, 'Content-Type': 'application/json' },
+    body: payload,
+  }), env);
+  const upstreamRequests = async () => (await (await fetch(upstream.url + '/stats')).json()).requests;
+
+  // Reference stream straight from the upstream
+  const direct = await (await fetch(upstream.url, { method: 'POST', body: payload })).text();
+
+  const first = await ask();
+  assert.equal(first.status, 200);
+  assert.equal(first.headers.get('X-Cache'), 'MISS');
+  assert.equal(first.headers.get('Content-Type'), 'text/event-stream');
+  const firstBody = await first.text();  // the cache is filled once the stream completes
+  assert.equal(firstBody, direct, 'SSE chunks must pass through unchanged');
+  assert.equal(await upstreamRequests(), 2);
+
+  const second = await ask();
+  assert.equal(second.status, 200);
+  assert.equal(second.headers.get('X-Cache'), 'HIT');
+  const secondBody = await second.text();
+  assert.equal(await upstreamRequests(), 2, 'a cache hit must not reach the upstream');
+  assert.equal(sseContent(secondBody), sseContent(firstBody));
+  assert.ok(secondBody.endsWith('data: [DONE]\n\n'));
+
+  console.log('worker ok: MISS passes SSE through unchanged, repeat request is a HIT');
+} finally {
+  upstream.proc.kill();
+}
@@ -0,0 +1,109 @@
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from pipeline import fetch_data
+from pipeline.config import BOOKS, RAW_DATA_FILE
+
+LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Serves a one-verse book per file; failures are scripted per filename."""
+
+    protocol_version = "HTTP/1.1"
+    requests: list = []
+    fail_once: set = set()
+    missing: set = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fname = self.path.rsplit("/", 1)[-1]
+        etag = f'"v1-{fname}"'
+        with self.lock:
+            self.requests.append((fname, dict(self.headers)))
+            transient = fname in self.fail_once
+            self.fail_once.discard(fname)
+        if transient:
+            return self._reply(503)
+        if fname in self.missing:
+            return self._reply(404)
+        if self.headers.get("If-None-Match") == etag:
+            return self._reply(304, headers={"ETag": etag})
+        body = json.dumps({"book": fname, "chapters": [
+            {"chapter": "1", "verses": [{"verse": "1", "text": f" In {fname}  "}]},
+        ]}).encode("utf-8")
+        self._reply(200, body, {"Content-Type": "application/json", "ETag": etag,
+                                "Last-Modified": LAST_MODIFIED})
+
+
+class FetchKjvTest(unittest.TestCase):
+    def setUp(self):
+        _Upstream.requests = []
+        _Upstream.fail_once = set()
+        _Upstream.missing = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}/kjv"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp.name)
+        patcher = mock.patch.object(fetch_data, "FETCH_BACKOFF", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _fetch(self):
+        return fetch_data.fetch_kjv(self.data_dir, self.base, workers=4)
+
+    def _requests_for(self, fname):
+        return [headers for name, headers in _Upstream.requests if name == fname]
+
+    def test_transient_error_is_retried(self):
+        _Upstream.fail_once = {"Genesis.json"}
+        verses = self._fetch()
+        self.assertEqual(len(verses), len(BOOKS))
+        self.assertEqual(len(self._requests_for("Genesis.json")), 2)
+        self.assertEqual(verses[0]["book"], "Genesis")
+        self.assertEqual(fetch_data._connections.open_count(), 0)
+
+    def test_cached_books_are_revalidated(self):
+        first = self._fetch()
+        (self.data_dir / RAW_DATA_FILE).unlink()
+        _Upstream.requests = []
+        second = self._fetch()
+        self.assertEqual(first, second)
+        self.assertEqual(len(_Upstream.requests), len(BOOKS))
+        for fname, headers in _Upstream.requests:
+            self.assertEqual(headers.get("If-None-Match"), f'"v1-{fname}"')
+            self.assertEqual(headers.get("If-Modified-Since"), LAST_MODIFIED)
+
+    def test_incomplete_corpus_is_refused(self):
+        _Upstream.missing = {"Ruth.json"}
+        with self.assertRaisesRegex(RuntimeError, "1 of 66 books failed"):
+            self._fetch()
+        self.assertFalse((self.data_dir / RAW_DATA_FILE).exists())
+        self.assertEqual(len(self._requests_for("Ruth.json")), 1)  # 404 is not retried
+        self.assertEqual(fetch_data._connections.open_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
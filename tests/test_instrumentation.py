@@ -0,0 +1,79 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import instrumentation
+from pipeline.instrumentation import propagate, record_bytes, span, submit
+
+WORKERS = 4
+
+
+class ThreadedSpanTest(unittest.TestCase):
+    def setUp(self):
+        self.tracer = instrumentation.start()
+        # Every worker waits here, so WORKERS tasks are open at once on distinct threads
+        self.barrier = threading.Barrier(WORKERS, timeout=10)
+
+    def tearDown(self):
+        instrumentation.stop()
+
+    def _write(self, i, wait=False):
+        with span("json_dump", file=f"{i}.json"):
+            if wait:
+                self.barrier.wait()
+            record_bytes(100)
+        return threading.get_ident()
+
+    def _write_together(self, i):
+        return self._write(i, wait=True)
+
+    def test_pool_spans_nest_under_submitting_span(self):
+        n = 66
+        with span("fetch"):
+            with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+                idents = set(pool.map(propagate(self._write_together), range(WORKERS)))
+                list(pool.map(propagate(self._write), range(WORKERS, n)))
+                submit(pool, self._write, n).result()
+        self.assertEqual(len(idents), WORKERS)
+
+        paths = [r["span"] for r in self.tracer.records]
+        self.assertEqual(paths.count("fetch/json_dump"), n + 1)
+        self.assertEqual(set(paths), {"fetch", "fetch/json_dump"})
+        for rec in self.tracer.records:
+            if rec["name"] == "json_dump":
+                self.assertEqual(rec["bytes"], 100)
+        fetch = next(r for r in self.tracer.records if r["span"] == "fetch")
+        self.assertEqual(fetch["bytes"], 100 * (n + 1))
+
+    def test_concurrent_spans_see_only_their_own_stack(self):
+        seen = {}
+
+        def worker(i):
+            with span(f"w{i}") as s:
+                self.barrier.wait()  # all WORKERS spans are open at this point
+                seen[i] = instrumentation._current.get() is s
+                self.barrier.wait()
+
+        with span("main") as main:
+            threads = [threading.Thread(target=propagate(worker), args=(i,)) for i in range(WORKERS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertIs(instrumentation._current.get(), main)
+        self.assertEqual(seen, {i: True for i in range(WORKERS)})
+        paths = {r["span"] for r in self.tracer.records}
+        self.assertEqual(paths, {"main"} | {f"main/w{i}" for i in range(WORKERS)})
+
+    def test_unpropagated_thread_does_not_touch_main_stack(self):
+        with span("main") as main:
+            with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+                list(pool.map(self._write, range(8)))  # no open span in the workers
+            record_bytes(7)
+        self.assertEqual(main.bytes, 7)
+        paths = {r["span"] for r in self.tracer.records}
+        self.assertEqual(paths, {"main", "json_dump"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+// Local stand-in for the Groq chat completions endpoint, for exercising the
+// worker's streaming and cache paths without an API key:
+//
+//   node worker/fake_upstream.mjs 8788
+//   npx wrangler dev --var UPSTREAM_URL:http://localhost:8788
+//
+// test_worker.mjs (repo root) runs it automatically against the worker.
+//
+// Replies echo the last user message word by word, one SSE chunk every
+// DELAY_MS, and count requests so cache hits are visible at /stats.
+import http from 'node:http';
+
+const PORT = Number(process.argv[2] || 8788);
+const DELAY_MS = 50;
+let requests = 0;
+
+const sleep = ms => new Promise(r => setTimeout(r, ms));
+
+http.createServer(async (req, res) => {
+  if (req.method === 'GET' && req.url === '/stats') {
+    res.writeHead(200, { 'Content-Type': 'application/json' });
+    return res.end(JSON.stringify({ requests }));
+  }
+  let raw = '';
+  for await (const chunk of req) raw += chunk;
+  requests++;
+  const body = JSON.parse(raw || '{}');
+  const last = (body.messages || []).at(-1)?.content || '';
+  const words = ('You asked: ' + last).split(' ');
+
+  if (!body.stream) {
+    await sleep(DELAY_MS * words.length);
+    res.writeHead(200, { 'Content-Type': 'application/json' });
+    return res.end(JSON.stringify({
+      object: 'chat.completion', model: body.model,
+      choices: [{ index: 0, message: { role: 'assistant', content: words.join(' ') }, finish_reason: 'stop' }],
+    }));
+  }
+
+  res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+  for (let i = 0; i < words.length; i++) {
+    const content = (i ? ' ' : '') + words[i];
+    res.write('data: ' + JSON.stringify({ choices: [{ index: 0, delta: { content } }] }) + '\n\n');
+    await sleep(DELAY_MS);
+  }
+  res.end('data: [DONE]\n\n');
+}).listen(PORT, () => console.log(`fake upstream on http://localhost:${PORT}`));
@@ -6,6 +6,81 @@ const ALLOWED_ORIGINS = [
   'https://gregory-kyro.github.io',
 ];
 
+// Completed responses, keyed by SHA-256 of (messages, temperature).
+// Lives for the lifetime of the isolate; insertion order doubles as LRU order.
+const CACHE_TTL_MS = 6 * 60 * 60 * 1000;
+const CACHE_MAX_ENTRIES = 500;
+const responseCache = new Map();
+
+function cacheGet(key) {
+  const entry = responseCache.get(key);
+  if (!entry) return null;
+  if (entry.expires < Date.now()) {
+    responseCache.delete(key);
+    return null;
+  }
+  responseCache.delete(key);
+  responseCache.set(key, entry);
+  return entry.content;
+}
+
+function cachePut(key, content) {
+  responseCache.delete(key);
+  responseCache.set(key, { content, expires: Date.now() + CACHE_TTL_MS });
+  while (responseCache.size > CACHE_MAX_ENTRIES) {
+    responseCache.delete(responseCache.keys().next().value);
+  }
+}
+
+async function cacheKey(messages, temperature) {
+  const bytes = new TextEncoder().encode(JSON.stringify([MODEL, temperature, messages]));
+  const digest = await crypto.subtle.digest('SHA-256', bytes);
+  return [...new Uint8Array(digest)].map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function sseEvent(data) {
+  return 'data: ' + (typeof data === 'string' ? data : JSON.stringify(data)) + '\n\n';
+}
+
+// Replays a cached answer in the same SSE shape as the upstream stream.
+function cachedStream(content) {
+  return sseEvent({ object: 'chat.completion.chunk', model: MODEL,
+    choices: [{ index: 0, delta: { role: 'assistant', content }, finish_reason: 'stop' }] })
+    + sseEvent('[DONE]');
+}
+
+// Passes upstream SSE bytes through untouched while collecting the deltas,
+// so the full answer can be cached once the stream completes with [DONE].
+function teeContent(onComplete) {
+  const decoder = new TextDecoder();
+  let buf = '';
+  let content = '';
+  let done = false;
+  const scan = (text) => {
+    buf += text;
+    const lines = buf.split('\n');
+    buf = lines.pop();
+    for (const line of lines) {
+      if (!line.startsWith('data: ')) continue;
+      const d = line.slice(6).trim();
+      if (d === '[DONE]') { done = true; continue; }
+      try {
+        content += JSON.parse(d).choices[0].delta.content || '';
+      } catch (_) {}
+    }
+  };
+  return new TransformStream({
+    transform(chunk, controller) {
+      controller.enqueue(chunk);
+      scan(decoder.decode(chunk, { stream: true }));
+    },
+    flush() {
+      scan(decoder.decode() + '\n');
+      if (done && content) onComplete(content);
+    },
+  });
+}
+
 export default {
   async fetch(request, env) {
     const origin = request.headers.get('Origin') || '';
@@ -15,6 +90,7 @@ export default {
       'Access-Control-Allow-Origin': matchedOrigin,
       'Access-Control-Allow-Methods': 'POST, OPTIONS',
       'Access-Control-Allow-Headers': 'Content-Type',
+      'Access-Control-Expose-Headers': 'X-Cache',
     };
 
     if (request.method === 'OPTIONS') {
@@ -31,8 +107,27 @@ export default {
 
     try {
       const body = await request.json();
+      const messages = body.messages || [];
+      const temperature = body.temperature ?? 0.7;
+      const stream = body.stream === true;
+      const key = await cacheKey(messages, temperature);
+
+      const cached = cacheGet(key);
+      if (cached !== null) {
+        const hitHeaders = { ...corsHeaders, 'X-Cache': 'HIT' };
+        if (stream) {
+          return new Response(cachedStream(cached), {
+            headers: { 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', ...hitHeaders },
+          });
+        }
+        return new Response(JSON.stringify({
+          object: 'chat.completion', model: MODEL,
+          choices: [{ index: 0, message: { role: 'assistant', content: cached }, finish_reason: 'stop' }],
+        }), { headers: { 'Content-Type': 'application/json', ...hitHeaders } });
+      }
 
-      const groqResp = await fetch(GROQ_URL, {
+      // UPSTREAM_URL lets `wrangler dev` point at a local fake (see fake_upstream.mjs).
+      const groqResp = await fetch(env.UPSTREAM_URL || GROQ_URL, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -40,17 +135,35 @@ export default {
         },
         body: JSON.stringify({
           model: MODEL,
-          messages: body.messages || [],
-          temperature: body.temperature ?? 0.7,
-          stream: false,
+          messages,
+          temperature,
+          stream,
         }),
       });
 
+      if (stream && groqResp.ok && groqResp.body) {
+        const body = groqResp.body.pipeThrough(teeContent(content => cachePut(key, content)));
+        return new Response(body, {
+          headers: {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Cache': 'MISS',
+            ...corsHeaders,
+          },
+        });
+      }
+
       const data = await groqResp.text();
+      if (!stream && groqResp.ok) {
+        try {
+          const content = JSON.parse(data).choices?.[0]?.message?.content;
+          if (content) cachePut(key, content);
+        } catch (_) {}
+      }
 
       return new Response(data, {
         status: groqResp.status,
-        headers: { 'Content-Type': 'application/json', ...corsHeaders },
+        headers: { 'Content-Type': 'application/json', 'X-Cache': 'MISS', ...corsHeaders },
       });
     } catch (err) {
       return new Response(JSON.stringify({ error: 'Internal error' }), {